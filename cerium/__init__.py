@@ -19,10 +19,15 @@ import sys
 import warnings
 
 from .androiddriver import AndroidDriver
+from .asyncdriver import AsyncAndroidDriver
 from .by import By
 from .exceptions import *
 from .intent import Actions, Category
 from .keys import Keys
+from .locator import Locator
+from .pool import DevicePool, PoolResult
+from .wait import (ActivityFocused, DriverWait, ElementGone, ElementPresent,
+                   ElementVisible, ImagePresent)
 
 
 # Meta information
@@ -42,8 +47,18 @@ if sys.platform != 'win32':
 
 __all__ = [
     'AndroidDriver',
+    'AsyncAndroidDriver',
     'By',
+    'DevicePool',
+    'PoolResult',
     'Keys',
+    'Locator',
     'Actions',
-    'Category,'
+    'Category',
+    'DriverWait',
+    'ElementPresent',
+    'ElementVisible',
+    'ElementGone',
+    'ActivityFocused',
+    'ImagePresent',
 ]
@@ -0,0 +1,376 @@
+# Licensed to the White Turing under one or more
+# contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The SFC licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""The adb host-protocol client implementation.
+
+Talks to the adb server over its smart socket (``localhost:5037`` by default)
+instead of spawning the adb executable for every request.
+"""
+
+import asyncio
+import socket
+import struct
+from typing import Set, Tuple, Union
+
+from .exceptions import AdbProtocolException, ServiceUnavailableException
+
+# Shell protocol v2 packet ids.
+SHELL_STDIN = 0
+SHELL_STDOUT = 1
+SHELL_STDERR = 2
+SHELL_EXIT = 3
+SHELL_CLOSE_STDIN = 4
+
+_SHELL_HEADER = struct.Struct('<BI')
+
+
+class AdbConnection(object):
+    '''A single socket connection to the adb server.'''
+
+    def __init__(self, sock: socket.socket) -> None:
+        self._sock = sock
+
+    def __enter__(self) -> 'AdbConnection':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def socket(self) -> socket.socket:
+        '''The underlying socket.'''
+        return self._sock
+
+    def close(self) -> None:
+        '''Close the connection.'''
+        self._sock.close()
+
+    def send(self, data: bytes) -> None:
+        '''Send raw bytes.'''
+        self._sock.sendall(data)
+
+    def send_request(self, request: Union[str, bytes]) -> None:
+        '''Send a length-prefixed request and check the server accepted it.'''
+        if isinstance(request, str):
+            request = request.encode('utf-8')
+        self.send(b'%04x' % len(request) + request)
+        self.read_status()
+
+    def read_status(self) -> None:
+        '''Read an OKAY/FAIL status.'''
+        status = self.read_exactly(4)
+        if status == b'OKAY':
+            return
+        if status == b'FAIL':
+            raise AdbProtocolException(self.read_string())
+        raise AdbProtocolException(f'Unexpected status {status!r}.')
+
+    def read_exactly(self, size: int) -> bytes:
+        '''Read exactly size bytes.'''
+        chunks = []
+        while size > 0:
+            chunk = self._sock.recv(min(size, 65536))
+            if not chunk:
+                raise AdbProtocolException('Connection closed by the adb server.')
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def read_string(self) -> str:
+        '''Read a hex length-prefixed string.'''
+        size = int(self.read_exactly(4), 16)
+        return self.read_exactly(size).decode('utf-8', 'replace')
+
+    def read_all(self) -> bytes:
+        '''Read until the server closes the connection.'''
+        chunks = []
+        while True:
+            chunk = self._sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+
+class AdbClient(object):
+    '''Speaks the adb smart-socket protocol to the adb server directly.'''
+
+    def __init__(self, host: str = 'localhost', port: Union[int, str] = 5037, timeout: float = None) -> None:
+        '''Creates a new instance of the AdbClient.
+
+        Args:
+            host: Host the adb server is running on.
+            port: Port the adb server is listening on.
+            timeout: Socket timeout in seconds, None blocks forever.
+        '''
+
+        self.host = host
+        self.port = int(port)
+        self.timeout = timeout
+        self._features = {}
+
+    def __repr__(self):
+        return '<{0.__module__}.{0.__name__} (server="{1}:{2}")>'.format(type(self), self.host, self.port)
+
+    def connect(self) -> AdbConnection:
+        '''Open a new connection to the adb server.'''
+        try:
+            sock = socket.create_connection((self.host, self.port), self.timeout)
+        except OSError as e:
+            raise ServiceUnavailableException(f'Cannot reach the adb server: {e}') from e
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return AdbConnection(sock)
+
+    def host_command(self, request: str) -> str:
+        '''Run a host service which replies with a length-prefixed string, e.g. host:version.'''
+        with self.connect() as conn:
+            try:
+                conn.send_request(request)
+                return conn.read_string()
+            except (OSError, AdbProtocolException) as e:
+                raise ServiceUnavailableException(str(e)) from e
+
+    def version(self) -> int:
+        '''Internal version number of the adb server.'''
+        return int(self.host_command('host:version'), 16)
+
+    def devices(self) -> list:
+        '''List connected devices.'''
+        output = self.host_command('host:devices')
+        return [line.split()[0] for line in output.splitlines() if line.strip()]
+
+    def get_state(self, serial: str) -> str:
+        '''offline | bootloader | device'''
+        return self.host_command(f'host-serial:{serial}:get-state')
+
+    def features(self, serial: str) -> Set[str]:
+        '''Features supported by both the device and the adb server.'''
+        if serial not in self._features:
+            output = self.host_command(f'host-serial:{serial}:features')
+            self._features[serial] = set(output.split(','))
+        return self._features[serial]
+
+    def supports_shell_v2(self, serial: str) -> bool:
+        '''Whether the device separates stdout, stderr and exit code.'''
+        return 'shell_v2' in self.features(serial)
+
+    def open_service(self, serial: str, service: str) -> AdbConnection:
+        '''Switch a new connection to the device transport and open a service on it.'''
+        conn = self.connect()
+        try:
+            conn.send_request(f'host:transport:{serial}')
+            conn.send_request(service)
+        except BaseException as e:
+            conn.close()
+            if isinstance(e, (OSError, AdbProtocolException)):
+                raise ServiceUnavailableException(str(e)) from e
+            raise
+        return conn
+
+    def shell(self, serial: str, command: str) -> Tuple[bytes, bytes, int]:
+        '''Run a shell command on the device.
+
+        Returns:
+            A tuple of (stdout, stderr, exit_code). Devices without shell
+            protocol v2 merge stderr into stdout and report exit code None.
+        '''
+        if not self.supports_shell_v2(serial):
+            with self.open_service(serial, f'shell:{command}') as conn:
+                return conn.read_all(), b'', None
+        with self.open_service(serial, f'shell,v2,raw:{command}') as conn:
+            return read_shell_v2(conn)
+
+    def exec_out(self, serial: str, command: str) -> bytes:
+        '''Run a command on the device and return its raw binary stdout.'''
+        with self.open_service(serial, f'exec:{command}') as conn:
+            return conn.read_all()
+
+
+def read_shell_packet(conn: AdbConnection) -> Tuple[int, bytes]:
+    '''Read a single shell protocol v2 packet.'''
+    packet_id, size = _SHELL_HEADER.unpack(conn.read_exactly(_SHELL_HEADER.size))
+    return packet_id, conn.read_exactly(size)
+
+
+def write_shell_packet(conn: AdbConnection, packet_id: int, data: bytes = b'') -> None:
+    '''Write a single shell protocol v2 packet.'''
+    conn.send(_SHELL_HEADER.pack(packet_id, len(data)) + data)
+
+
+class _ShellOutput(object):
+    '''Sorts shell protocol v2 packets into stdout, stderr and the exit code.
+
+    Shared by the blocking and the asyncio readers, which only differ in how
+    they read a packet.
+    '''
+
+    def __init__(self) -> None:
+        self.stdout = []
+        self.stderr = []
+        self.exit_code = None
+
+    def feed(self, packet_id: int, data: bytes) -> bool:
+        '''Take one packet, returns True once the exit code has arrived.'''
+        if packet_id == SHELL_STDOUT:
+            self.stdout.append(data)
+        elif packet_id == SHELL_STDERR:
+            self.stderr.append(data)
+        elif packet_id == SHELL_EXIT:
+            self.exit_code = data[0] if data else 0
+            return True
+        return False
+
+    def result(self) -> Tuple[bytes, bytes, int]:
+        return b''.join(self.stdout), b''.join(self.stderr), self.exit_code
+
+
+def read_shell_v2(conn: AdbConnection) -> Tuple[bytes, bytes, int]:
+    '''Collect stdout, stderr and exit code of a shell protocol v2 stream.'''
+    output = _ShellOutput()
+    while not output.feed(*read_shell_packet(conn)):
+        pass
+    return output.result()
+
+
+class AsyncAdbConnection(object):
+    '''A single asyncio stream connection to the adb server.'''
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._reader = reader
+        self._writer = writer
+
+    async def __aenter__(self) -> 'AsyncAdbConnection':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        '''Close the connection.'''
+        self._writer.close()
+
+    async def send(self, data: bytes) -> None:
+        '''Send raw bytes.'''
+        self._writer.write(data)
+        await self._writer.drain()
+
+    async def send_request(self, request: Union[str, bytes]) -> None:
+        '''Send a length-prefixed request and check the server accepted it.'''
+        if isinstance(request, str):
+            request = request.encode('utf-8')
+        await self.send(b'%04x' % len(request) + request)
+        await self.read_status()
+
+    async def read_status(self) -> None:
+        '''Read an OKAY/FAIL status.'''
+        status = await self.read_exactly(4)
+        if status == b'OKAY':
+            return
+        if status == b'FAIL':
+            raise AdbProtocolException(await self.read_string())
+        raise AdbProtocolException(f'Unexpected status {status!r}.')
+
+    async def read_exactly(self, size: int) -> bytes:
+        '''Read exactly size bytes.'''
+        try:
+            return await self._reader.readexactly(size)
+        except asyncio.IncompleteReadError:
+            raise AdbProtocolException('Connection closed by the adb server.') from None
+
+    async def read_string(self) -> str:
+        '''Read a hex length-prefixed string.'''
+        size = int(await self.read_exactly(4), 16)
+        return (await self.read_exactly(size)).decode('utf-8', 'replace')
+
+    async def read_all(self) -> bytes:
+        '''Read until the server closes the connection.'''
+        return await self._reader.read()
+
+
+class AsyncAdbClient(object):
+    '''Speaks the adb smart-socket protocol to the adb server from an event loop.'''
+
+    def __init__(self, host: str = 'localhost', port: Union[int, str] = 5037) -> None:
+        self.host = host
+        self.port = int(port)
+        self._features = {}
+
+    def __repr__(self):
+        return '<{0.__module__}.{0.__name__} (server="{1}:{2}")>'.format(type(self), self.host, self.port)
+
+    async def connect(self) -> AsyncAdbConnection:
+        '''Open a new connection to the adb server.'''
+        try:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        except OSError as e:
+            raise ServiceUnavailableException(f'Cannot reach the adb server: {e}') from e
+        return AsyncAdbConnection(reader, writer)
+
+    async def host_command(self, request: str) -> str:
+        '''Run a host service which replies with a length-prefixed string, e.g. host:version.'''
+        async with await self.connect() as conn:
+            try:
+                await conn.send_request(request)
+                return await conn.read_string()
+            except (OSError, AdbProtocolException) as e:
+                raise ServiceUnavailableException(str(e)) from e
+
+    async def devices(self) -> list:
+        '''List connected devices.'''
+        output = await self.host_command('host:devices')
+        return [line.split()[0] for line in output.splitlines() if line.strip()]
+
+    async def get_state(self, serial: str) -> str:
+        '''offline | bootloader | device'''
+        return await self.host_command(f'host-serial:{serial}:get-state')
+
+    async def features(self, serial: str) -> Set[str]:
+        '''Features supported by both the device and the adb server.'''
+        if serial not in self._features:
+            output = await self.host_command(f'host-serial:{serial}:features')
+            self._features[serial] = set(output.split(','))
+        return self._features[serial]
+
+    async def open_service(self, serial: str, service: str) -> AsyncAdbConnection:
+        '''Switch a new connection to the device transport and open a service on it.'''
+        conn = await self.connect()
+        try:
+            await conn.send_request(f'host:transport:{serial}')
+            await conn.send_request(service)
+        except BaseException as e:
+            conn.close()
+            if isinstance(e, (OSError, AdbProtocolException)):
+                raise ServiceUnavailableException(str(e)) from e
+            raise
+        return conn
+
+    async def shell(self, serial: str, command: str) -> Tuple[bytes, bytes, int]:
+        '''Run a shell command on the device, see AdbClient.shell.'''
+        if 'shell_v2' not in await self.features(serial):
+            async with await self.open_service(serial, f'shell:{command}') as conn:
+                return await conn.read_all(), b'', None
+        async with await self.open_service(serial, f'shell,v2,raw:{command}') as conn:
+            output = _ShellOutput()
+            while True:
+                packet_id, size = _SHELL_HEADER.unpack(await conn.read_exactly(_SHELL_HEADER.size))
+                if output.feed(packet_id, await conn.read_exactly(size)):
+                    return output.result()
+
+    async def exec_out(self, serial: str, command: str) -> bytes:
+        '''Run a command on the device and return its raw binary stdout.'''
+        async with await self.open_service(serial, f'exec:{command}') as conn:
+            return await conn.read_all()
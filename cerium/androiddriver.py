@@ -18,31 +18,107 @@
 '''The AndroidDriver implementation.'''
 
 
+import io
 import os
+import posixpath
 import re
-import tempfile
-
-from lxml import html
-
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, Union
+
+from .adb import AdbClient
+from .batch import ActionBatch
 from .by import By
+from .apk import ApkInfo, apk_info
+from .cache import DisplayInfo, PackageIndex, PackageInfo, PropertyCache
 from .elements import Elements
-from .exceptions import (ApplicationsException, CharactersException,
-                         DeviceConnectionException, NoSuchElementException,
-                         NoSuchPackageException)
+from .exceptions import (AdbProtocolException, ApplicationsException,
+                         CharactersException, DeviceConnectionException,
+                         FileTransferException, NoSuchElementException,
+                         NoSuchPackageException, ServiceUnavailableException)
+from .hierarchy import Hierarchy
+from .image import load_template, match_template
 from .intent import Actions, Category
+from .locator import Locator
 from .keys import Keys
+from .parsers import BatteryInfo, CpuInfo, FocusState, LineParser, MemInfo
+from .screen import FrameRing, header_matches, read_frame, read_rows
 from .service import _PATH, Service
+from .shell import ShellSession, quote
+from .sync import (Manifest, Progress, SyncConnection, SyncResult,
+                   TransferStats, iter_chunks, parse_remote_stat,
+                   remote_batch_command, remote_stat_command, source_size)
 from .utils import merge_dict
+from .wait import DriverWait
+
+_SECTION = '__cerium_section__:'
+_PROPERTY_COMMANDS = {
+    'wm.size': 'wm size',
+    'wm.density': 'wm density',
+    'android_id': 'settings get secure android_id',
+}
+
+
+def screen_state_command(skip: int = 0) -> str:
+    '''Shell command that prints the focus lines of dumpsys window and an md5 of the raw frame after skip bytes.'''
+    capture = f'screencap | tail -c +{skip + 1}' if skip else 'screencap'
+    return f"dumpsys window windows | grep -E 'mCurrentFocus|mFocusedApp' ; {capture} | md5sum"
+
+
+# Focused window plus a digest of the frame buffer, hashed on the device so only a few bytes travel.
+SCREEN_STATE_COMMAND = screen_state_command()
+_DIGEST = re.compile(r'^[0-9a-f]{32}\b', re.M)
+
+
+def uidump_command(remote: _PATH) -> str:
+    '''Shell command that dumps the interface layout to stdout, via a scratch file on the device.'''
+    return f'uiautomator dump --compressed {remote} >/dev/null && cat {remote} ; rm -f {remote}'
+
+
+def dumpsys_command(service: str, *args: str, select: Union[str, Iterable[str]] = None) -> str:
+    '''Shell command that runs dumpsys and keeps only the selected lines, on the device.
+
+    Args:
+        service: The system service, e.g. window.
+        args: Arguments of the service, usually a section such as windows.
+        select: An extended regular expression, or several of them, that lines must match.
+    '''
+    command = ' '.join(['dumpsys', service, *args])
+    if select is None:
+        return command
+    if not isinstance(select, str):
+        select = '|'.join(select)
+    return f'{command} | grep -E {quote(select)}'
+
+
+def _decode(data: bytes) -> str:
+    '''Decode output the way a text-mode pipe would.'''
+    return data.decode('utf-8', 'replace').replace('\r\n', '\n').replace('\r', '\n')
 
 
 class BaseAndroidDriver(Service):
     '''Controls Android Debug Bridge and allows you to drive the android device.'''
 
     _element_cls = Elements
-    _temp = os.path.join(tempfile.gettempdir(), 'uidump.xml')
-    _nodes = None
-
-    def __init__(self, executable_path: _PATH = 'default', device_sn: str = None, wireless: bool = False, host: str = '192.168.0.3', port: str or int = 5555, service_port: str or int =5037, env: dict = None, service_args: list or tuple = None, dev: bool = False) -> None:
+    _hierarchy = None
+    _client = None
+    _session = None
+    _batch = None
+    _display = None
+    _screen_state = None
+    _dump_flight = None
+    _refreshed_at = float('-inf')
+    _frame_header = None
+    capture = None
+    auto_update = True
+    # Height in dp of the top band left out of the screen fingerprint, covers
+    # the status bar, also on devices with a display cutout.
+    status_bar_height = 48
+
+    def __init__(self, executable_path: _PATH = 'default', device_sn: str = None, wireless: bool = False, host: str = '192.168.0.3', port: str or int = 5555, service_port: str or int =5037, env: dict = None, service_args: list or tuple = None, dev: bool = False, native: bool = True, auto_update: bool = True) -> None:
         '''Creates a new instance of the android driver.
 
         Starts the service and then creates new instance of android driver.
@@ -57,12 +133,23 @@ class BaseAndroidDriver(Service):
                                          if left as 0, a free port will be found.
             env: Environment variables.
             service_args: List of args to pass to the androiddriver service.
+            dev: Print debug information for every command.
+            native: Talk to the adb server over its socket directly where possible,
+                    instead of spawning the executable for every command.
+            auto_update: Before reusing the last interface layout, check whether the
+                         screen has changed and dump it again only if it has.
         '''
 
         self._dev = dev
+        self.auto_update = auto_update
+        self._uidump_remote = f'/data/local/tmp/uidump-{uuid.uuid4().hex[:8]}.xml'
+        self.properties = PropertyCache(self._load_properties)
+        self.packages = PackageIndex(self._load_packages)
+        self._flight_lock = threading.Lock()
         super(BaseAndroidDriver, self).__init__(executable_path=executable_path,
                                                 port=service_port, env=env, service_args=service_args)
         self.start()
+        self._client = AdbClient(port=self.port) if native else None
         self.device_sn = device_sn
 
         if wireless:
@@ -83,12 +170,45 @@ class BaseAndroidDriver(Service):
         elif not self.device_sn and devices_num > 1:
             raise DeviceConnectionException(
                 f"Multiple devices detected: {' | '.join(self.devices_list)}, please specify device serial number or host.")
-        else:
+        elif not self.device_sn:
             self.device_sn = self.devices_list[0]
         if self.get_state() == 'offline':
             raise DeviceConnectionException(
                 'The device is offline. Please reconnect.')
 
+    def devices(self) -> list:
+        '''List connected devices.'''
+        if self._client:
+            try:
+                return self._client.devices()
+            except (OSError, AdbProtocolException):
+                pass
+        return super(BaseAndroidDriver, self).devices()
+
+    def get_state(self) -> str:
+        '''offline | bootloader | device, of this driver's device.'''
+        if self._client:
+            try:
+                return self._client.get_state(self.device_sn)
+            except (OSError, AdbProtocolException):
+                pass
+        return super(BaseAndroidDriver, self).get_state()
+
+    def connect(self, host: str = '192.168.0.3', port: Union[int, str] = 5555) -> None:
+        '''Connect to a device via TCP/IP directly.'''
+        self._invalidate_caches()
+        super(BaseAndroidDriver, self).connect(host, port)
+
+    def disconnect(self, host: str = '192.168.0.3', port: Union[int, str] = 5555) -> None:
+        '''Disconnect from given TCP/IP device [default port=5555].'''
+        self._invalidate_caches()
+        super(BaseAndroidDriver, self).disconnect(host, port)
+
+    def disconnect_all(self) -> None:
+        '''Disconnect all.'''
+        self._invalidate_caches()
+        super(BaseAndroidDriver, self).disconnect_all()
+
     def start_server(self) -> None:
         '''Start server.'''
         self.start()
@@ -103,11 +223,22 @@ class BaseAndroidDriver(Service):
 
     def _execute(self, *args: str, **kwargs) -> tuple:
         '''Execute command.'''
-        process = self.execute(
-            args=args, options=merge_dict(self.options, kwargs))
-        command = ' '.join(process.args)
+        result = None
+        if self._client and not kwargs.get('shell'):
+            try:
+                result = self._execute_native(args)
+                command = 'native: ' + ' '.join(args)
+            except ServiceUnavailableException:
+                # Nothing reached the device, any later failure is raised
+                # as is so that the command never runs twice.
+                result = None
+        if result is None:
+            process = self.execute(
+                args=args, options=merge_dict(self.options, kwargs))
+            command = ' '.join(process.args)
+            result = process.communicate()
         if self._dev:
-            output, error = process.communicate()
+            output, error = result
             print(
                 "Debug Information",
                 "Command: {!r}".format(command),
@@ -115,7 +246,93 @@ class BaseAndroidDriver(Service):
                 "Error: {!r}".format(error.encode('utf-8')),
                 sep='\n', end='\n{}\n'.format('=' * 80)
             )
-        return process.communicate()
+        return result
+
+    def _exec_out(self, command: str) -> bytes:
+        '''Execute command on the device and return its raw binary output.'''
+        if self._client:
+            try:
+                return self._client.exec_out(self.device_sn, command)
+            except ServiceUnavailableException:
+                pass
+        process = self.execute(args=('-s', self.device_sn, 'exec-out', command),
+                               options=merge_dict(self.options, {'encoding': None}))
+        output, _ = process.communicate()
+        return output
+
+    @contextmanager
+    def _exec_out_stream(self, command: str) -> Iterator[BinaryIO]:
+        '''Execute command on the device and stream its raw binary output.
+
+        Leaving the context early stops the transfer.
+        '''
+        conn = None
+        if self._client:
+            try:
+                conn = self._client.open_service(self.device_sn, f'exec:{command}')
+            except ServiceUnavailableException:
+                conn = None
+        if conn:
+            with conn, conn.socket.makefile('rb') as stream:
+                yield stream
+            return
+        process = self.execute(args=('-s', self.device_sn, 'exec-out', command),
+                               options=merge_dict(self.options, {'encoding': None}))
+        try:
+            yield process.stdout
+        finally:
+            process.kill()
+            process.communicate()
+
+    def _execute_native(self, args: tuple) -> tuple:
+        '''Execute command through the adb server socket.
+
+        Returns:
+            A tuple of (output, error), or None if the command has to go through the executable.
+        '''
+        if len(args) < 3 or args[0] != '-s' or args[2] not in ('shell', 'exec-out'):
+            return None
+        serial, command = args[1], ' '.join(args[3:])
+        if args[2] == 'exec-out':
+            return _decode(self._client.exec_out(serial, command)), ''
+        if self._session and serial == self.device_sn:
+            try:
+                output, error, _ = self._session.run(command)
+            except (OSError, AdbProtocolException):
+                self._session = None
+                raise
+        else:
+            output, error, _ = self._client.shell(serial, command)
+        return _decode(output), _decode(error)
+
+    @property
+    def shell_session(self) -> ShellSession:
+        '''The open persistent shell session of the device, or None, see open_shell_session.'''
+        return self._session
+
+    def open_shell_session(self) -> ShellSession:
+        '''Open the persistent shell session of the device, if it is not open yet.
+
+        Once opened, every shell command of the driver runs over this single
+        channel instead of setting up a new one, until close_shell_session.
+
+        Usage:
+            driver.open_shell_session()
+        '''
+        if not self._client:
+            raise AdbProtocolException(
+                'A shell session requires the native adb client.')
+        if not self._session:
+            session = ShellSession(self._client, self.device_sn)
+            session.open()
+            self._session = session
+        return self._session
+
+    def close_shell_session(self) -> None:
+        '''Close the persistent shell session.'''
+        if self._session:
+            self._session.close()
+            self._session = None
 
     # Android Device Information
     @property
@@ -128,17 +345,39 @@ class BaseAndroidDriver(Service):
         """Returns a device matcher for the given serial."""
         return lambda device: device.serial_number == serial
 
+    def _load_properties(self) -> dict:
+        '''Read getprop, wm size, wm density and the Android ID in one round trip.'''
+        sections = ('wm.size', 'wm.density', 'android_id')
+        command = ['getprop']
+        for section in sections:
+            command.append(f'echo {_SECTION}{section}')
+            command.append(_PROPERTY_COMMANDS[section])
+        output, _ = self._execute(
+            '-s', self.device_sn, 'shell', ' ; '.join(command))
+        parts = re.split(rf'^{_SECTION}(\S+)\n', output, flags=re.M)
+        properties = dict(re.findall(
+            r'^\[(.+?)\]: \[(.*?)\]$', parts[0], flags=re.M))
+        for section, text in zip(parts[1::2], parts[2::2]):
+            if section == 'android_id':
+                properties[section] = text.strip()
+            elif text.split()[2:3]:
+                properties[section] = text.split()[2]
+        return properties
+
     def get_device_model(self) -> str:
         '''Show device model.'''
-        output, _ = self._execute(
-            '-s', self.device_sn, 'shell', 'getprop', 'ro.product.model')
-        return output.strip()
+        return self.properties.get('ro.product.model', '')
+
+    def _parse_output(self, parser: type, command: str) -> LineParser:
+        '''Feed the output of command to a parser line by line as it arrives.'''
+        with self._exec_out_stream(command) as stream:
+            return parser.parse(io.TextIOWrapper(stream, encoding='utf-8', errors='replace'))
 
-    def get_battery_info(self) -> dict:
+    def get_battery_info(self) -> BatteryInfo:
         '''Show device battery information.
 
         Returns:
-            A dict. For example:
+            A BatteryInfo, readable as the dict of raw values. For example:
 
                 {'AC powered': 'false',
                 'Charge counter': '0',
@@ -154,22 +393,40 @@ class BaseAndroidDriver(Service):
                 'technology': 'Li-poly',
                 'temperature': '310',
                 'voltage': '3965'}
+
+            with typed properties such as level (67) and temperature (31.0).
         '''
-        output, _ = self._execute(
-            '-s', self.device_sn, 'shell', 'dumpsys', 'battery')
-        battery_status = re.split('\n  |: ', output[33:].strip())
-        return dict(zip(battery_status[::2], battery_status[1::2]))
+        return self.dumpsys('battery', parser=BatteryInfo)
 
     def get_resolution(self) -> list:
         '''Show device resolution.'''
-        output, _ = self._execute('-s', self.device_sn, 'shell', 'wm', 'size')
-        return output.split()[2].split('x')
+        return self.properties['wm.size'].split('x')
 
     def get_screen_density(self) -> str:
         '''Show device screen density (PPI).'''
-        output, _ = self._execute(
-            '-s', self.device_sn, 'shell', 'wm', 'density')
-        return output.split()[2]
+        return self.properties['wm.density']
+
+    @property
+    def display(self) -> DisplayInfo:
+        '''Display size, density and rotation, read once and cached.
+
+        The cache refreshes when a hierarchy dump or a screen capture reports
+        another orientation.
+        '''
+        if self._display is None:
+            self._display = DisplayInfo.parse(
+                self.dumpsys('window', 'displays', select=('init=', 'Rotation=')))
+        if self._display is None:
+            width, height = map(int, self.get_resolution())
+            self._display = DisplayInfo(
+                width, height, int(self.get_screen_density()))
+        return self._display
+
+    def _invalidate_caches(self) -> None:
+        '''Drop the cached device state, e.g. after a reboot or reconnect.'''
+        self.properties.invalidate()
+        self._display = None
+        self._frame_header = None
 
     def get_displays_params(self) -> str:
         '''Show displays parameters.'''
@@ -179,15 +436,11 @@ class BaseAndroidDriver(Service):
 
     def get_android_id(self) -> str:
         '''Show Android ID.'''
-        output, _ = self._execute(
-            '-s', self.device_sn, 'shell', 'settings', 'get', 'secure', 'android_id')
-        return output.strip()
+        return self.properties.get('android_id', '')
 
     def get_android_version(self) -> str:
         '''Show Android version.'''
-        output, _ = self._execute(
-            '-s', self.device_sn, 'shell', 'getprop', 'ro.build.version.release')
-        return output.strip()
+        return self.properties.get('ro.build.version.release', '')
 
     def get_device_mac(self) -> str:
         '''Show device MAC.'''
@@ -195,26 +448,21 @@ class BaseAndroidDriver(Service):
             '-s', self.device_sn, 'shell', 'cat', '/sys/class/net/wlan0/address')
         return output.strip()
 
-    def get_cpu_info(self) -> str:
-        '''Show device CPU information.'''
-        output, _ = self._execute(
-            '-s', self.device_sn, 'shell', 'cat', '/proc/cpuinfo')
-        return output
+    def get_cpu_info(self) -> CpuInfo:
+        '''Show device CPU information, parsed from /proc/cpuinfo.'''
+        return self._parse_output(CpuInfo, 'cat /proc/cpuinfo')
 
-    def get_memory_info(self) -> str:
-        '''Show device memory information.'''
-        output, _ = self._execute(
-            '-s', self.device_sn, 'shell', 'cat', '/proc/meminfo')
-        return output
+    def get_memory_info(self) -> MemInfo:
+        '''Show device memory information, a mapping of /proc/meminfo field to kB.'''
+        return self._parse_output(MemInfo, 'cat /proc/meminfo')
 
     def get_sdk_version(self) -> str:
         '''Show Android SDK version.'''
-        output, _ = self._execute(
-            '-s', self.device_sn, 'shell', 'getprop', 'ro.build.version.sdk')
-        return output.strip()
+        return self.properties.get('ro.build.version.sdk', '')
 
     def root(self) -> None:
         '''Restart adbd with root permissions.'''
+        self._invalidate_caches()
         output, _ = self._execute('-s', self.device_sn, 'root')
         if not output:
             raise PermissionError(
@@ -222,10 +470,12 @@ class BaseAndroidDriver(Service):
 
     def unroot(self) -> None:
         '''Restart adbd without root permissions.'''
+        self._invalidate_caches()
         self._execute('-s', self.device_sn, 'unroot')
 
     def tcpip(self, port: int or str = 5555) -> None:
         '''Restart adb server listening on TCP on PORT.'''
+        self._invalidate_caches()
         self._execute('-s', self.device_sn, 'tcpip', str(port))
 
     def get_ip_addr(self) -> str:
@@ -246,30 +496,162 @@ class BaseAndroidDriver(Service):
         self.connect(host, port)
         print('Now you can unplug the USB cable, and control your device via WLAN.')
 
-    def push(self, local: _PATH = 'LICENSE', remote: _PATH = '/sdcard/LICENSE') -> None:
-        '''Copy local files/directories to device.'''
-        if not os.path.exists(local):
+    def _sync(self) -> SyncConnection:
+        '''Open a file sync session on the device.'''
+        return SyncConnection(self._client.open_service(self.device_sn, 'sync:'))
+
+    def _open_sync(self) -> SyncConnection:
+        '''Open a file sync session, or None if the server or the sync service cannot be reached.'''
+        if not self._client:
+            return None
+        try:
+            return self._sync()
+        except (OSError, AdbProtocolException):
+            return None
+
+    def _push(self, local, remote: _PATH, progress: Progress, newer_only: bool) -> TransferStats:
+        '''Push over the sync protocol, or with the executable if the server cannot be reached.'''
+        path = isinstance(local, (str, os.PathLike))
+        if path and not os.path.exists(local):
             raise FileNotFoundError(f'Local {local!r} does not exist.')
-        self._execute('-s', self.device_sn, 'push', local, remote)
+        sync = self._open_sync()
+        if sync:
+            with sync:
+                return sync.push(local, remote, progress, newer_only)
+        if not path:
+            # The executable only pushes files, stream the content through the shell instead.
+            process = self.execute(args=('-s', self.device_sn, 'shell', f'cat > {quote(str(remote))}'),
+                                   options=merge_dict(self.options, {'encoding': None}))
+            _, error = process.communicate(local.read() if hasattr(local, 'read') else bytes(local))
+            if process.returncode or error:
+                raise FileTransferException(f'{remote}: {_decode(error).strip() or "push failed"}')
+            return None
+        _, error = self._execute('-s', self.device_sn, 'push', *(['--sync'] if newer_only else []), local, remote)
+        if 'error' in error:
+            raise FileTransferException(error.strip())
+
+    def push(self, local: _PATH = 'LICENSE', remote: _PATH = '/sdcard/LICENSE', progress: Progress = None) -> TransferStats:
+        '''Copy local files/directories to device.
 
-    def push_sync(self, local: _PATH = 'LICENSE', remote: _PATH = '/sdcard/LICENSE') -> None:
-        '''Only push files that are newer on the host than the device.'''
-        if not os.path.exists(local):
-            raise FileNotFoundError(f'Local {local!r} does not exist.')
-        self._execute('-s', self.device_sn, 'push', '--sync', local, remote)
+        Args:
+            local: A file or directory, or the content itself as bytes or a binary file object.
+            remote: The remote path, local is copied into it if it is a directory.
+            progress: Called with (bytes sent, total bytes) after every chunk.
+
+        Returns:
+            The TransferStats, None if the executable had to be used.
+        '''
+        return self._push(local, remote, progress, False)
 
-    def pull(self, remote: _PATH, local: _PATH) -> None:
-        '''Copy files/directories from device.'''
-        output, _ = self._execute('-s', self.device_sn, 'pull', remote, local)
-        if 'error' in output:
+    def push_sync(self, local: _PATH = 'LICENSE', remote: _PATH = '/sdcard/LICENSE', progress: Progress = None) -> TransferStats:
+        '''Only push files that are newer on the host than the device.'''
+        return self._push(local, remote, progress, True)
+
+    def _pull(self, remote: _PATH, local: _PATH, progress: Progress, preserve: bool) -> TransferStats:
+        '''Pull over the sync protocol, or with the executable if the server cannot be reached.'''
+        sync = self._open_sync()
+        if sync:
+            with sync:
+                return sync.pull(remote, local, progress, preserve)
+        output, error = self._execute(
+            '-s', self.device_sn, 'pull', *(['-a'] if preserve else []), remote, local)
+        if 'does not exist' in error or 'No such file' in error:
             raise FileNotFoundError(f'Remote {remote!r} does not exist.')
+        if 'error' in error:
+            raise FileTransferException(error.strip())
 
-    def pull_a(self, remote: _PATH, local: _PATH) -> None:
+    def pull(self, remote: _PATH, local: _PATH, progress: Progress = None) -> TransferStats:
+        '''Copy files/directories from device.
+
+        Args:
+            remote: The remote file or directory.
+            local: The local path, remote is copied into it if it is a directory.
+            progress: Called with (bytes received, total bytes) after every chunk.
+
+        Returns:
+            The TransferStats, None if the executable had to be used.
+        '''
+        return self._pull(remote, local, progress, False)
+
+    def pull_a(self, remote: _PATH, local: _PATH, progress: Progress = None) -> TransferStats:
         '''Copy files/directories from device, and preserve file timestamp and mode.'''
-        output, _ = self._execute(
-            '-s', self.device_sn, 'pull', '-a', remote, local)
-        if 'error' in output:
-            raise FileNotFoundError(f'Remote {remote!r} does not exist.')
+        return self._pull(remote, local, progress, True)
+
+    def sync_dir(self, local: _PATH, remote: _PATH, delete: bool = False, workers: int = 4, manifest: _PATH = None, progress: Progress = None) -> SyncResult:
+        '''Make a remote directory match a local one, sending only what changed.
+
+        Files are compared by md5. Local hashes are cached in a per-device
+        manifest, the device is asked for the size and mtime of all its files
+        in one query, and hashes only the files it cannot rule out that way.
+
+        Args:
+            local: The local directory.
+            remote: The remote directory, created if missing. The root is refused.
+            delete: Also remove remote files that are not in local.
+            workers: The number of parallel transfer streams.
+            manifest: Where to keep the manifest, see Manifest.default_path.
+            progress: Called with (bytes sent, total bytes) after every chunk.
+        '''
+        if not os.path.isdir(local):
+            raise FileNotFoundError(f'Local {local!r} is not a directory.')
+        remote = posixpath.normpath(remote).rstrip('/') or '/'
+        if remote == '/':
+            raise ValueError('Refusing to sync into the root directory of the device.')
+        manifest = Manifest(manifest or Manifest.default_path(self.device_sn, remote))
+        files = manifest.scan(local)
+        output, _ = self._execute('-s', self.device_sn, 'shell', remote_stat_command(remote))
+        states = parse_remote_stat(output)
+        changed, unsure, unchanged = [], [], []
+        for name, file in sorted(files.items()):
+            state, known = states.get(name), manifest.entries.get(name)
+            if state is None or state[0] != file.size:
+                changed.append(name)
+            elif known and known['md5'] == file.md5 and tuple(known['remote']) == state:
+                unchanged.append(name)
+            else:
+                unsure.append(name)
+        for i in range(0, len(unsure), 200):
+            group = unsure[i:i + 200]
+            output, _ = self._execute('-s', self.device_sn, 'shell', remote_batch_command(remote, 'md5sum', group))
+            hashes = {line[34:]: line[:32] for line in output.splitlines() if len(line) > 34}
+            for name in group:
+                (unchanged if hashes.get(name) == files[name].md5 else changed).append(name)
+        deleted = sorted(set(states) - set(files)) if delete else []
+        for i in range(0, len(deleted), 200):
+            self._execute('-s', self.device_sn, 'shell', remote_batch_command(remote, 'rm -f', deleted[i:i + 200]))
+        stats = self._send_parallel([(files[name].path, posixpath.join(remote, name), os.stat(files[name].path))
+                                     for name in changed], workers, progress)
+        manifest.entries = {}
+        for name in unchanged:
+            manifest.record(name, files[name], states[name])
+        for name in changed:
+            manifest.record(name, files[name], (files[name].size, files[name].mtime_ns // 10 ** 9))
+        manifest.save()
+        return SyncResult(sorted(changed), deleted, len(unchanged), stats)
+
+    def _send_parallel(self, files: list, workers: int, progress: Progress = None) -> TransferStats:
+        '''Send (local, remote, os.stat_result) triples over several sync connections at once.'''
+        started = time.perf_counter()
+        if not self._client:
+            for path, target, _ in files:
+                self._push(path, target, None, False)
+            return TransferStats(len(files), sum(file[2].st_size for file in files), time.perf_counter() - started)
+        files = sorted(files, key=lambda file: file[2].st_size, reverse=True)
+        groups = [files[i::workers] for i in range(workers) if files[i::workers]]
+        total, sent, lock = sum(file[2].st_size for file in files), {}, threading.Lock()
+
+        def send(group):
+            def report(done, _):
+                with lock:
+                    sent[id(group)] = done
+                    progress(sum(sent.values()), total)
+            with self._sync() as sync:
+                return sync.send_many(group, progress and report)
+
+        with ThreadPoolExecutor(max_workers=max(len(groups), 1)) as executor:
+            results = list(executor.map(send, groups))
+        return TransferStats(sum(r.files for r in results), sum(r.size for r in results),
+                             time.perf_counter() - started)
 
     def sync(self, option: str = 'all') -> None:
         '''Sync a local build from $ANDROID_PRODUCT_OUT to the device (default all).
@@ -294,10 +676,16 @@ class BaseAndroidDriver(Service):
             raise ValueError('There is no option named: {!r}.'.format(option))
 
     # Application Management
-    def install(self, package: str, option: str = '-r') -> None:
+    def install(self, package: str, option: str = '-r', skip_identical: bool = False) -> bool:
         '''Push package to the device and install it.
 
+        The APK is streamed straight into pm install, nothing is staged on the device.
+
         Args:
+            package: The path of the APK, or its content as bytes or a binary file object.
+            skip_identical: Do nothing if the device already has this exact build,
+                            same package, versionCode and APK contents. File
+                            objects are read into memory to compare them.
             option:
                 -l: forward lock application
                 -r: replace existing application
@@ -305,13 +693,87 @@ class BaseAndroidDriver(Service):
                 -s: install application on sdcard
                 -d: allow version code downgrade (debuggable packages only)
                 -g: grant all runtime permissions
+
+        Returns:
+            False if the install was skipped.
         '''
-        if not os.path.isfile(package):
+        path = isinstance(package, (str, os.PathLike))
+        if path and not os.path.isfile(package):
             raise FileNotFoundError(f'{package!r} does not exist.')
         for i in option:
             if i not in '-lrtsdg':
                 raise ValueError(f'There is no option named: {option!r}.')
-        self._execute('-s', self.device_sn, 'install', option, package)
+        info = None
+        if path or skip_identical:
+            if not path and not isinstance(package, (bytes, bytearray, memoryview)):
+                # Comparing builds needs the whole APK before it is streamed.
+                package = package.read()
+            # Files are parsed once, their package name keeps the index up to date in place.
+            try:
+                info = apk_info(package)
+            except ApplicationsException:
+                if skip_identical:
+                    raise
+        if skip_identical and self.has_build(info):
+            return False
+        if not path:
+            output = self._install_stream(package, option)
+        else:
+            output = None
+            if self._client:
+                try:
+                    with open(package, 'rb') as f:
+                        output = self._install_stream(f, option)
+                except ServiceUnavailableException:
+                    pass
+            if output is None:
+                output, _ = self._execute('-s', self.device_sn, 'install', option, package)
+        self._installed(info, output)
+        return True
+
+    def _install_stream(self, source, option: str) -> str:
+        '''Stream an APK from a bytes-like or binary file object into pm install, returns its output.'''
+        size = source_size(source)
+        if size is None:
+            source = source.read()
+            size = len(source)
+        command = f'pm install {option} -S {size}'
+        if not self._client:
+            process = self.execute(args=('-s', self.device_sn, 'shell', command),
+                                   options=merge_dict(self.options, {'encoding': None}))
+            output, error = process.communicate(source.read() if hasattr(source, 'read') else bytes(source))
+            return _decode(output + error)
+        with self._client.open_service(self.device_sn, f'exec:{command}') as conn:
+            try:
+                for chunk in iter_chunks(source):
+                    conn.send(chunk)
+            except OSError:
+                # pm stopped reading, its output says why.
+                pass
+            return _decode(conn.read_all())
+
+    def has_build(self, apk) -> bool:
+        '''Whether the device has this exact build of an APK installed.
+
+        Args:
+            apk: The path of an APK, or its ApkInfo.
+        '''
+        info = apk if isinstance(apk, ApkInfo) else apk_info(apk)
+        installed = self.packages.get(info.package)
+        if installed is None:
+            return False
+        if installed.version_code is not None and installed.version_code != info.version_code:
+            return False
+        path = quote(installed.path) if installed.path else f'"$(pm path {quote(info.package)} | head -n 1 | cut -d: -f2)"'
+        output, _ = self._execute('-s', self.device_sn, 'shell', f'md5sum {path}')
+        return output[:32] == info.md5
+
+    def _installed(self, info: ApkInfo, output: str) -> None:
+        '''Update the package index after an install.'''
+        if info and 'Success' in output:
+            self.packages.add(PackageInfo(info.package, '', info.version_code))
+        else:
+            self.packages.invalidate()
 
     def install_multiple(self, *packages, option: str = '-r') -> None:
         '''Push packages to the device and install them.
@@ -334,20 +796,34 @@ class BaseAndroidDriver(Service):
                 raise ValueError(f'There is no option named: {option!r}.')
         self._execute('-s', self.device_sn,
                       'install-multiple', option, *packages)
+        self.packages.invalidate()
 
-    def uninstall(self, package: str) -> None:
-        '''Remove this app package from the device.'''
-        if package not in self.view_packgets_list():
+    def _load_packages(self) -> Dict[str, PackageInfo]:
+        '''Read every installed package with its APK path and version code in one round trip.'''
+        output, _ = self._execute(
+            '-s', self.device_sn, 'shell', 'pm list packages -f --show-versioncode 2>/dev/null || pm list packages -f')
+        return PackageInfo.parse_list(output)
+
+    def _check_package(self, package: str) -> None:
+        '''Raise NoSuchPackageException unless package is installed, refreshing the index on a miss.'''
+        if package in self.packages:
+            return
+        self.packages.refresh()
+        if package not in self.packages:
             raise NoSuchPackageException(
                 f'There is no such package {package!r}.')
+
+    def uninstall(self, package: str) -> None:
+        '''Remove this app package from the device.'''
+        self._check_package(package)
         self._execute('-s', self.device_sn, 'uninstall', package)
+        self.packages.discard(package)
 
     def uninstall_k(self, package: str) -> None:
         '''Remove this app package from the device, and keep the data and cache directories.'''
-        if package not in self.view_packgets_list():
-            raise NoSuchPackageException(
-                f'There is no such package {package!r}.')
+        self._check_package(package)
         self._execute('-s', self.device_sn, 'uninstall', '-k', package)
+        self.packages.discard(package)
 
     def view_packgets_list(self, option: str = '-e', keyword: str = '') -> list:
         '''Show all packages.
@@ -371,25 +847,54 @@ class BaseAndroidDriver(Service):
 
     def view_package_path(self, package: str) -> _PATH:
         '''Print the path to the APK of the given.'''
-        if package not in self.view_packgets_list():
-            raise NoSuchPackageException(
-                f'There is no such package {package!r}.')
+        self._check_package(package)
+        if self.packages[package].path:
+            return self.packages[package].path
         output, _ = self._execute(
             '-s', self.device_sn, 'shell', 'pm', 'path', package)
         return output[8:-1]
 
     def clear_app_data(self, package: str) -> None:
         '''Deletes all data associated with a package.'''
-        if package not in self.view_packgets_list():
-            raise NoSuchPackageException(
-                f'There is no such package {package!r}.')
+        self._check_package(package)
         self._execute('-s', self.device_sn, 'shell', 'pm', 'clear', package)
 
+    def dumpsys(self, service: str, *args: str, select: Union[str, Iterable[str]] = None, parser: type = None):
+        '''Run dumpsys, filtering its output on the device.
+
+        Only the selected lines cross the wire, which matters for services
+        like window or activity whose full dump runs to hundreds of KB.
+
+        Args:
+            service: The system service, e.g. window.
+            args: Arguments of the service, usually a section such as windows.
+            select: An extended regular expression, or several of them, that lines must match.
+            parser: A LineParser class fed the lines as they arrive.
+
+        Returns:
+            The output, or the parser result if parser is given.
+
+        Usage:
+            driver.dumpsys('window', 'windows', select=('mCurrentFocus', 'mFocusedApp'))
+            driver.dumpsys('battery', parser=BatteryInfo)
+        '''
+        command = dumpsys_command(service, *args, select=select)
+        if parser is not None:
+            return self._parse_output(parser, command)
+        output, _ = self._execute('-s', self.device_sn, 'shell', command)
+        return output
+
+    def get_focus_state(self) -> FocusState:
+        '''The focused window and activity, from the focus lines of dumpsys window.'''
+        return self.dumpsys('window', 'windows', select=('mCurrentFocus', 'mFocusedApp'), parser=FocusState)
+
     def view_focused_activity(self) -> str:
-        '''View focused activity.'''
-        output, _ = self._execute(
-            '-s', self.device_sn, 'shell', 'dumpsys', 'activity', 'activities')
-        return re.findall(r'mFocusedActivity: .+(com[a-zA-Z0-9\.]+/.[a-zA-Z0-9\.]+)', output)[0]
+        '''View focused activity, e.g. com.example/.MainActivity, empty if there is none.'''
+        return self.get_focus_state().activity
+
+    def view_focused_window(self) -> str:
+        '''View focused window, e.g. com.example/.MainActivity, empty if there is none.'''
+        return self.get_focus_state().window
 
     def view_running_services(self, package: str='') -> str:
         '''View running services.'''
@@ -405,14 +910,11 @@ class BaseAndroidDriver(Service):
 
     def view_current_app_behavior(self) -> str:
         '''View application behavior in the current window.'''
-        output, _ = self._execute(
-            '-s', self.device_sn, 'shell', 'dumpsys', 'window', 'windows')
-        return re.findall(r'mCurrentFocus=.+(com[a-zA-Z0-9\.]+/.[a-zA-Z0-9\.]+)', output)[0]
+        return self.dumpsys('window', 'windows', select='mCurrentFocus', parser=FocusState).window
 
-    def view_surface_app_activity(self) -> str:
+    def view_surface_app_activity(self) -> list:
         '''Get package with activity of applications that are running in the foreground.'''
-        output, error = self._execute(
-            '-s', self.device_sn, 'shell', 'dumpsys', 'window', 'w')
+        output = self.dumpsys('window', 'w', select=r'name=[a-zA-Z0-9.]+/')
         return re.findall(r"name=([a-zA-Z0-9\.]+/.[a-zA-Z0-9\.]+)", output)
 
     # Interact with Applications
@@ -497,8 +999,68 @@ class BaseAndroidDriver(Service):
 
     def screencap_exec(self, filename: _PATH = 'screencap.png') -> None:
         '''Taking a screenshot of a device display, then copy it to your computer.'''
-        self._execute('-s', self.device_sn, 'exec-out',
-                      'screencap', '-p', '>', filename, shell=True)
+        data = self._exec_out('screencap -p')
+        with open(filename, 'wb') as f:
+            f.write(data)
+
+    def screenshot_array(self, region: tuple = None):
+        '''Take a screenshot as a numpy array, without a PNG round trip.
+
+        The raw frame buffer is read over a binary channel straight into the
+        array, pixels are in the device pixel format, usually RGBA.
+
+        Args:
+            region: (left, top, right, bottom) to keep. Once the frame layout is
+                    known, rows outside it are dropped on the device before the
+                    transfer, columns are cut as a view. The header is sent
+                    along and a full capture is taken instead if the layout
+                    changed, e.g. after a rotation.
+
+        Returns:
+            A (height, width, channels) uint8 array.
+        '''
+        header = self._frame_header
+        if region is None or header is None:
+            with self._exec_out_stream('screencap') as stream:
+                self._frame_header, frame = read_frame(stream)
+            display = self._display
+            if display and (frame.shape[1] > frame.shape[0]) != (display.size[0] > display.size[1]):
+                self._display = None
+            if region is None:
+                return frame
+            left, top, right, bottom = region
+            return frame[top:bottom, left:right]
+        left, top, right, bottom = region
+        top, bottom = max(top, 0), min(bottom, header.height)
+        skip, count = top * header.row_bytes, (bottom - top) * header.row_bytes
+        # dd reads the header byte by byte, so tail starts right after it.
+        command = (f'screencap | {{ dd bs=1 count={header.size} 2>/dev/null ; '
+                   f'tail -c +{skip + 1} | head -c {count} ; }}')
+        with self._exec_out_stream(command) as stream:
+            frame = read_rows(stream, header, bottom - top) if header_matches(stream, header) else None
+        if frame is None:
+            self._frame_header = None
+            return self.screenshot_array(region)
+        return frame[:, left:right]
+
+    def start_capture(self, fps: float = 10.0, size: int = 8) -> FrameRing:
+        '''Keep capturing raw frames in the background, replacing any running capture.
+
+        Args:
+            fps: The target frame rate.
+            size: The number of frames kept in the ring.
+
+        Returns:
+            The FrameRing, also available as driver.capture.
+        '''
+        self.stop_capture()
+        self.capture = FrameRing(lambda: self._exec_out_stream('screencap'), size, fps).start()
+        return self.capture
+
+    def stop_capture(self) -> None:
+        '''Stop the background capture.'''
+        if self.capture:
+            self.capture.stop()
 
     def screenrecord(self, bit_rate: int = 5000000, time_limit: int = 180, filename: _PATH = '/sdcard/demo.mp4') -> None:
         '''Recording the display of devices running Android 4.4 (API level 19) and higher.
@@ -520,21 +1082,49 @@ class BaseAndroidDriver(Service):
         self.screenrecord(bit_rate, time_limit, filename=remote)
         self.pull(remote, local)
 
+    @contextmanager
+    def batch(self) -> Iterator[ActionBatch]:
+        '''Collect clicks, swipes, keyevents and text, then send them in one round trip.
+
+        Consecutive keyevents are merged into a single multi-keycode keyevent.
+        Nested batches join the outermost one.
+
+        Usage:
+            with driver.batch():
+                driver.click(500, 250)
+                driver.send_keys('cerium')
+        '''
+        if self._batch is not None:
+            yield self._batch
+            return
+        self._batch = ActionBatch()
+        try:
+            yield self._batch
+            command = self._batch.command()
+        finally:
+            self._batch = None
+        if command:
+            self._execute('-s', self.device_sn, 'shell', command)
+
+    def _input(self, *args: str) -> None:
+        '''Send an input command, or queue it while batching.'''
+        if self._batch is not None:
+            self._batch.add(*args)
+        else:
+            self._execute('-s', self.device_sn, 'shell', 'input', *args)
+
     def click(self, x: int, y: int) -> None:
         '''Simulate finger click.'''
-        self._execute('-s', self.device_sn, 'shell',
-                      'input', 'tap', str(x), str(y))
+        self._input('tap', str(x), str(y))
 
     def swipe(self, x1: int, y1: int, x2: int, y2: int, duration: int = 100) -> None:
         '''Simulate finger swipe. (1000ms = 1s)'''
-        self._execute('-s', self.device_sn, 'shell',
-                      'input', 'swipe', str(x1), str(y1), str(x2), str(y2), str(duration))
+        self._input('swipe', str(x1), str(y1), str(x2), str(y2), str(duration))
 
     def long_press(self, x: int, y: int, duration: int = 1000) -> None:
         '''Simulate finger long press somewhere. (1000ms = 1s)'''
-        self._execute('-s', self.device_sn, 'shell',
-                      'input', 'swipe', str(x), str(y), str(x), str(y), str(duration))
-                
+        self._input('swipe', str(x), str(y), str(x), str(y), str(duration))
+
     def send_keys(self, text: str = 'cerium') -> None:
         '''Simulates typing keys.'''
         for char in text:
@@ -542,18 +1132,15 @@ class BaseAndroidDriver(Service):
                 raise CharactersException(
                     f'Text cannot contain non-English characters, such as {char!r}.')
         text = re.escape(text)
-        self._execute('-s', self.device_sn, 'shell',
-                      'input', 'text', text)
+        self._input('text', text)
 
     def send_keyevents(self, keyevent: int) -> None:
         '''Simulates typing keyevents.'''
-        self._execute('-s', self.device_sn, 'shell',
-                      'input', 'keyevent', str(keyevent))
+        self._input('keyevent', str(keyevent))
 
     def send_keyevents_long_press(self, keyevent: int) -> None:
         '''Simulates typing keyevents long press.'''
-        self._execute('-s', self.device_sn, 'shell',
-                      'input', 'keyevent', '--longpress', str(keyevent))
+        self._input('keyevent', '--longpress', str(keyevent))
 
     def send_monkey(self, *args) -> None:
         '''Generate pseudo-random user events to simulate clicks, touches, gestures, etc.'''
@@ -561,55 +1148,199 @@ class BaseAndroidDriver(Service):
 
     def reboot(self) -> None:
         '''Reboot the device.'''
+        self._invalidate_caches()
         self._execute('-s', self.device_sn, 'reboot')
 
     def recovery(self) -> None:
         '''Reboot to recovery mode.'''
+        self._invalidate_caches()
         self._execute('-s', self.device_sn, 'reboot', 'recovery')
 
     def fastboot(self) -> None:
         '''Reboot to bootloader mode.'''
+        self._invalidate_caches()
         self._execute('-s', self.device_sn, 'reboot', 'bootloader')
 
-    def uidump(self, local: _PATH = None) -> None:
-        '''Get the current interface layout file.'''
-        local = local if local else self._temp
-        self._execute('-s', self.device_sn, 'shell', 'uiautomator',
-                      'dump', '--compressed', '/data/local/tmp/uidump.xml')
-        self.pull('/data/local/tmp/uidump.xml', local)
-        ui = html.fromstring(open(local, 'rb').read())
-        self._nodes = ui.iter(tag="node")
-
-    def find_element(self, value, by=By.ID, update=False) -> Elements:
-        '''Find a element or the first element.'''
-        if update or not self._nodes:
+    def _fingerprint_skip(self) -> int:
+        '''Bytes of raw frame in front of the content: the header and the status bar.'''
+        if not self.status_bar_height:
+            return 0
+        try:
+            display = self.display
+        except (KeyError, ValueError, IndexError):
+            # No display metrics, hash the whole frame.
+            return 0
+        # The exact pixel format does not matter, the offset only has to be stable.
+        rows = -(-self.status_bar_height * display.density // 160)
+        return 16 + rows * display.size[0] * 4
+
+    def screen_state(self) -> str:
+        '''A cheap fingerprint of what is on the screen.
+
+        The status bar, with its clock and notification icons, is left out.
+        Anything else that moves still changes it, e.g. a blinking text
+        cursor or an animation, and then costs a dump on the next lookup.
+        Changes confined to the status_bar_height band at the top of the
+        content are only seen if the focused window changes too.
+
+        Returns:
+            The focused window and a digest of the frame buffer, or None if the
+            device cannot produce the digest.
+        '''
+        output, _ = self._execute(
+            '-s', self.device_sn, 'shell', screen_state_command(self._fingerprint_skip()))
+        if not _DIGEST.search(output):
+            return None
+        return ' '.join(output.split())
+
+    def _current_hierarchy(self, update: bool = False) -> Hierarchy:
+        '''The interface layout, dumped again if forced, missing or stale.'''
+        if update or self._hierarchy is None:
             self.uidump()
-        for node in self._nodes:
-            if node.attrib[by] == value:
-                bounds = node.attrib['bounds']
-                coord = list(map(int, re.findall(r'\d+', bounds)))
-                click_point = (coord[0] + coord[2]) / \
-                    2, (coord[1] + coord[3]) / 2
-                return self._element_cls(self, node.attrib, by, value, coord, click_point)
+        elif self.auto_update and self._screen_state is not None:
+            if self.screen_state() != self._screen_state:
+                self.uidump()
+        return self._hierarchy
+
+    def _refresh_hierarchy(self, max_age: float = 0.0) -> Hierarchy:
+        '''Bring the interface layout up to date, sharing a refresh already in flight.
+
+        A refresh finished less than max_age seconds ago is reused as well, so
+        concurrent waits on the same driver cost one dump per poll, not one each.
+        '''
+        with self._flight_lock:
+            if self._dump_flight is None and time.monotonic() - self._refreshed_at <= max_age:
+                return self._hierarchy
+            flight, leader = self._dump_flight, self._dump_flight is None
+            if leader:
+                flight = self._dump_flight = Future()
+        if not leader:
+            return flight.result()
+        try:
+            update = not self.auto_update or self._screen_state is None
+            flight.set_result(self._current_hierarchy(update))
+            self._refreshed_at = time.monotonic()
+        except Exception as e:
+            flight.set_exception(e)
+        finally:
+            with self._flight_lock:
+                self._dump_flight = None
+        return flight.result()
+
+    def wait_until(self, condition: Callable, timeout: float = 10.0, poll: float = 0.2, message: str = '') -> Any:
+        '''Wait until condition is met and return its value.
+
+        Args:
+            condition: Called with the driver, see the conditions in cerium.wait.
+            timeout: Seconds to wait before raising TimeoutException.
+            poll: Seconds between the first polls, the interval backs off while nothing changes.
+            message: The message of the TimeoutException.
+
+        Usage:
+            driver.wait_until(ElementVisible('com.example:id/login')).click()
+        '''
+        return DriverWait(self, timeout, poll).until(condition, message)
+
+    def uidump(self, local: _PATH = None) -> Hierarchy:
+        '''Get the current interface layout.
+
+        The layout is streamed straight into memory, and only written to disk if local is given.
+        '''
+        # Probe first: a change during the dump then triggers another one next time.
+        state = self.screen_state() if self.auto_update else None
+        data = self._exec_out(uidump_command(self._uidump_remote))
+        hierarchy = Hierarchy.from_bytes(data)
+        if local:
+            with open(local, 'wb') as f:
+                f.write(data)
+        if self._display and hierarchy.rotation != self._display.rotation:
+            self._display = self._frame_header = None
+        previous, self._hierarchy, self._screen_state = self._hierarchy, hierarchy, state
+        if previous is not None:
+            previous.release()
+        return hierarchy
+
+    def find_element(self, value, by=By.ID, update=False, stream=False) -> Elements:
+        '''Find a element or the first element.
+
+        Args:
+            value: The attribute value, an XPath expression with By.XPATH, or a Locator.
+            by: The attribute to match, see By.
+            update: Dump the interface layout again. Not needed with auto_update,
+                    which dumps it again when the screen has changed.
+            stream: Take a fresh dump and parse it incrementally, stopping at the
+                    first match. For one-shot lookups in huge layouts, the cached
+                    hierarchy is left untouched.
+        '''
+        if isinstance(value, Locator):
+            by, value = By.XPATH, value.xpath
+        if stream and by != By.XPATH:
+            with self._exec_out_stream(uidump_command(self._uidump_remote)) as output:
+                match = Hierarchy.stream_find(output, by, value)
+            if match is None:
+                raise NoSuchElementException(f'No such element: {by}={value!r}.')
+            return self._element_cls(self, match, 0, by, value)
+        hierarchy = self._current_hierarchy(update)
+        for i in hierarchy.find(by, value):
+            return self._element_cls(self, hierarchy, i, by, value)
         raise NoSuchElementException(f'No such element: {by}={value!r}.')
 
     def find_elements(self, value, by=By.ID, update=False) -> Elements:
         '''Find all elements.'''
-        elements = []
-        if update or not self._nodes:
-            self.uidump()
-        for node in nodes:
-            if node.attrib[by] == value:
-                bounds = node.attrib['bounds']
-                coord = list(map(int, re.findall(r'\d+', bounds)))
-                click_point = (coord[0] + coord[2]) / \
-                    2, (coord[1] + coord[3]) / 2
-                elements.append(self._element_cls(
-                    self, node.attrib, by, value, coord, click_point))
+        if isinstance(value, Locator):
+            by, value = By.XPATH, value.xpath
+        hierarchy = self._current_hierarchy(update)
+        elements = [self._element_cls(self, hierarchy, i, by, value)
+                    for i in hierarchy.find(by, value)]
         if elements:
             return elements
         raise NoSuchElementException(f'No such element: {by}={value!r}.')
 
+    def find_many(self, locators: Dict[str, tuple], update=False) -> Dict[str, Elements]:
+        '''Find many elements in one walk over the interface layout.
+
+        Args:
+            locators: A dict of name to (by, value), or to a Locator.
+            update: Dump the interface layout again, see find_element.
+
+        Returns:
+            A dict of name to the first matching element, or None if it wasn't found.
+
+        Usage:
+            page = driver.find_many({'user': (By.ID, 'com.example:id/user'), 'login': (By.TEXT, 'Login')})
+        '''
+        hierarchy = self._current_hierarchy(update)
+        locators = {name: (By.XPATH, locator.xpath) if isinstance(locator, Locator) else locator
+                    for name, locator in locators.items()}
+        found = hierarchy.find_many(locators)
+        return {name: None if i is None else self._element_cls(self, hierarchy, i, *locators[name])
+                for name, i in found.items()}
+
+    def find_element_by_image(self, template, threshold: float = 0.9, scales: tuple = (1.0,), region: tuple = None) -> Elements:
+        '''Finds an element by how it looks, for screens the layout dump does not describe.
+
+        Args:
+            template: The image to look for, an array cut from screenshot_array,
+                      or the path of a .npy file or an image file Pillow can read.
+            threshold: The lowest match score accepted, from 0 to 1.
+            scales: Template sizes to try, relative to its own, e.g. (0.8, 1.0, 1.25).
+            region: (left, top, right, bottom) of the screen to search.
+
+        Returns:
+            An element with the matched bounds, element.click() taps its center.
+        '''
+        if isinstance(template, (str, os.PathLike)):
+            template = load_template(template)
+        match = match_template(self.screenshot_array(region), template, threshold, scales)
+        if match is None:
+            raise NoSuchElementException(
+                f'No such element: {By.IMAGE} with threshold {threshold}.')
+        left, top = (max(region[0], 0), max(region[1], 0)) if region else (0, 0)
+        hierarchy = Hierarchy()
+        hierarchy.append({By.BOUNDS: '[{},{}][{},{}]'.format(
+            match.left + left, match.top + top, match.right + left, match.bottom + top)})
+        return self._element_cls(self, hierarchy, 0, By.IMAGE, f'{match.score:.3f}')
+
     def find_element_by_id(self, id_, update=False) -> Elements:
         '''Finds an element by id.
 
@@ -682,6 +1413,42 @@ class BaseAndroidDriver(Service):
         '''
         return self.find_elements(by=By.NAME, value=name, update=update)
 
+    def find_element_by_xpath(self, xpath, update=False) -> Elements:
+        '''Finds an element by xpath.
+
+        Args:
+            xpath: The XPath expression or Locator of the element to be found.
+            update: If the interface has changed, this option should be True.
+
+        Returns:
+            The element if it was found.
+
+        Raises:
+            NoSuchElementException - If the element wasn't found.
+
+        Usage:
+            element = driver.find_element_by_xpath('//node[@text="OK" and @clickable="true"]')
+        '''
+        return self.find_element(by=By.XPATH, value=str(xpath), update=update)
+
+    def find_elements_by_xpath(self, xpath, update=False) -> Elements:
+        '''Finds multiple elements by xpath.
+
+        Args:
+            xpath: The XPath expression or Locator of the elements to be found.
+            update: If the interface has changed, this option should be True.
+
+        Returns:
+            A list with elements if any was found. An empty list if not.
+
+        Raises:
+            NoSuchElementException - If the element wasn't found.
+
+        Usage:
+            elements = driver.find_elements_by_xpath('//node[contains(@text, "foo")]')
+        '''
+        return self.find_elements(by=By.XPATH, value=str(xpath), update=update)
+
     def find_element_by_class(self, class_, update=False) -> Elements:
         '''Finds an element by class.
 
@@ -756,11 +1523,12 @@ class AndroidDriver(BaseAndroidDriver):
         '''Lock screen.'''
         self.send_keyevents(Keys.LOCK)
 
-    def unlock(self, password, width=1080, length=1920) -> None:
+    def unlock(self, password, width=None, length=None) -> None:
         '''Unlock screen.'''
-        self.wake()
-        self.swipe_up(width, length)
-        self.send_keys(str(password))
+        with self.batch():
+            self.wake()
+            self.swipe_up(width, length)
+            self.send_keys(str(password))
 
     def power(self) -> None:
         '''Power button.'''
@@ -818,18 +1586,26 @@ class AndroidDriver(BaseAndroidDriver):
         '''End the current call.'''
         self.send_keyevents(Keys.ENDCALL)
 
-    def swipe_left(self, width: int = 1080, length: int = 1920) -> None:
-        '''Swipe left.'''
+    def swipe_left(self, width: int = None, length: int = None) -> None:
+        '''Swipe left. The size defaults to the current display size.'''
+        if not (width and length):
+            width, length = self.display.size
         self.swipe(0.8*width, 0.5*length, 0.2*width, 0.5*length)
 
-    def swipe_right(self, width: int = 1080, length: int = 1920) -> None:
-        '''Swipe right.'''
+    def swipe_right(self, width: int = None, length: int = None) -> None:
+        '''Swipe right. The size defaults to the current display size.'''
+        if not (width and length):
+            width, length = self.display.size
         self.swipe(0.2*width, 0.5*length, 0.8*width, 0.5*length)
 
-    def swipe_up(self, width: int = 1080, length: int = 1920) -> None:
-        '''Swipe up.'''
+    def swipe_up(self, width: int = None, length: int = None) -> None:
+        '''Swipe up. The size defaults to the current display size.'''
+        if not (width and length):
+            width, length = self.display.size
         self.swipe(0.5*width, 0.8*length, 0.5*width, 0.2*length)
 
-    def swipe_down(self, width: int = 1080, length: int = 1920) -> None:
-        '''Swipe down.'''
+    def swipe_down(self, width: int = None, length: int = None) -> None:
+        '''Swipe down. The size defaults to the current display size.'''
+        if not (width and length):
+            width, length = self.display.size
         self.swipe(0.5*width, 0.2*length, 0.5*width, 0.8*length)
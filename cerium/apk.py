@@ -0,0 +1,146 @@
+# Licensed to the White Turing under one or more
+# contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The SFC licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+'''Reads the package name and version of an APK without the Android SDK.'''
+
+import hashlib
+import io
+import os
+import struct
+import threading
+import zipfile
+from typing import List, NamedTuple, Tuple
+
+from .exceptions import ApplicationsException
+
+# Chunk types of the binary XML format.
+_STRING_POOL = 0x0001
+_RESOURCE_MAP = 0x0180
+_START_ELEMENT = 0x0102
+_UTF8_FLAG = 0x100
+# Typed value types.
+_TYPE_STRING = 0x03
+_TYPE_INT_DEC = 0x10
+_TYPE_INT_HEX = 0x11
+# android:versionCode and android:versionName, for manifests with stripped attribute names.
+_VERSION_CODE = 0x0101021b
+_VERSION_NAME = 0x0101021c
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+class ApkInfo(NamedTuple):
+    '''What identifies a build of a package.'''
+
+    package: str
+    version_code: int
+    version_name: str
+    md5: str
+    size: int
+
+
+def _read_strings(data: bytes, offset: int) -> List[str]:
+    '''Decode a string pool chunk.'''
+    count, _, flags, strings_start = struct.unpack_from('<IIII', data, offset + 8)
+    utf8 = flags & _UTF8_FLAG
+    offsets = struct.unpack_from(f'<{count}I', data, offset + 28)
+    strings = []
+    for start in offsets:
+        position = offset + strings_start + start
+        if utf8:
+            # Length in characters, then in bytes, each one or two bytes long.
+            position += 2 if data[position] & 0x80 else 1
+            length = data[position]
+            if length & 0x80:
+                length = (length & 0x7f) << 8 | data[position + 1]
+                position += 1
+            position += 1
+            strings.append(data[position:position + length].decode('utf-8', 'replace'))
+        else:
+            length, = struct.unpack_from('<H', data, position)
+            position += 2
+            if length & 0x8000:
+                length = (length & 0x7fff) << 16 | struct.unpack_from('<H', data, position)[0]
+                position += 2
+            strings.append(data[position:position + 2 * length].decode('utf-16-le', 'replace'))
+    return strings
+
+
+def read_manifest(data: bytes) -> Tuple[str, int, str]:
+    '''The package, versionCode and versionName of a binary AndroidManifest.xml.'''
+    strings, resource_ids = [], ()
+    offset = struct.unpack_from('<H', data, 2)[0]
+    while offset + 8 <= len(data):
+        chunk_type, header_size, size = struct.unpack_from('<HHI', data, offset)
+        if not size:
+            break
+        if chunk_type == _STRING_POOL:
+            strings = _read_strings(data, offset)
+        elif chunk_type == _RESOURCE_MAP:
+            resource_ids = struct.unpack_from(f'<{(size - header_size) // 4}I', data, offset + header_size)
+        elif chunk_type == _START_ELEMENT:
+            _, name, attribute_start, attribute_size, count = struct.unpack_from('<IIHHH', data, offset + header_size)
+            if strings[name] == 'manifest':
+                attributes = {}
+                for i in range(count):
+                    position = offset + header_size + attribute_start + i * attribute_size
+                    _, key, raw, _, _, value_type, value = struct.unpack_from('<IIIHBBI', data, position)
+                    if key < len(resource_ids) and resource_ids[key] in (_VERSION_CODE, _VERSION_NAME):
+                        key = 'versionCode' if resource_ids[key] == _VERSION_CODE else 'versionName'
+                    else:
+                        key = strings[key]
+                    if raw != 0xffffffff:
+                        attributes[key] = strings[raw]
+                    elif value_type == _TYPE_STRING:
+                        attributes[key] = strings[value]
+                    elif value_type in (_TYPE_INT_DEC, _TYPE_INT_HEX):
+                        attributes[key] = value
+                return attributes.get('package'), int(attributes.get('versionCode', 0)), attributes.get('versionName', '')
+        offset += size
+    raise ApplicationsException('AndroidManifest.xml has no manifest element.')
+
+
+def _parse(source) -> ApkInfo:
+    '''Hash an APK and read its manifest.'''
+    digest, size = hashlib.md5(), 0
+    with open(source, 'rb') if isinstance(source, (str, os.PathLike)) else io.BytesIO(source) as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+            size += len(chunk)
+        try:
+            with zipfile.ZipFile(f) as apk:
+                manifest = apk.read('AndroidManifest.xml')
+        except (zipfile.BadZipFile, KeyError):
+            raise ApplicationsException(f'{source!r} is not an APK.' if isinstance(source, str) else 'Not an APK.') from None
+    return ApkInfo(*read_manifest(manifest), digest.hexdigest(), size)
+
+
+def apk_info(source) -> ApkInfo:
+    '''The package, version and md5 of an APK file or of APK bytes.
+
+    Files are parsed once per size and modification time, even across drivers
+    installing the same build in parallel.
+    '''
+    if not isinstance(source, (str, os.PathLike)):
+        return _parse(bytes(source))
+    info = os.stat(source)
+    key = os.path.abspath(source), info.st_size, info.st_mtime_ns
+    with _cache_lock:
+        if key not in _cache:
+            _cache[key] = _parse(source)
+        return _cache[key]
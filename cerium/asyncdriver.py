@@ -0,0 +1,338 @@
+# Licensed to the White Turing under one or more
+# contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The SFC licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+'''The AsyncAndroidDriver implementation.'''
+
+import asyncio
+import os
+import re
+import uuid
+from subprocess import PIPE
+from typing import Iterable, List, Union
+
+from .adb import AsyncAdbClient
+from .androiddriver import (_DIGEST, SCREEN_STATE_COMMAND, _decode,
+                            dumpsys_command, uidump_command)
+from .by import By
+from .elements import Elements
+from .exceptions import (AdbProtocolException, CharactersException,
+                         DeviceConnectionException, NoSuchElementException,
+                         ServiceUnavailableException)
+from .hierarchy import Hierarchy
+from .keys import Keys
+from .locator import Locator
+from .parsers import BatteryInfo, CpuInfo, MemInfo
+from .service import _PATH, Service
+
+
+class AsyncElements(Elements):
+    '''Represents a element of an AsyncAndroidDriver.'''
+
+    __slots__ = ()
+
+    async def clear(self) -> None:
+        """Clears the text if it's a text entry element."""
+        await self.click()
+        await self._parent.send_keyevents(*[Keys.DEL] * len(self.text))
+
+    async def send_keys(self, text: str = 'cerium') -> None:
+        '''Simulates typing keys.'''
+        await self.click()
+        await self._parent.send_keys(text)
+
+
+class AsyncAndroidDriver(object):
+    '''Drives the android device from an asyncio event loop.
+
+    Mirrors the AndroidDriver interface as coroutines, so a single event loop
+    can drive many devices at once without a thread per device.
+
+    Usage:
+        async with AsyncAndroidDriver('emulator-5554') as driver:
+            await driver.click(500, 250)
+    '''
+
+    _element_cls = AsyncElements
+    _hierarchy = None
+    _screen_state = None
+
+    def __init__(self, device_sn: str = None, executable_path: _PATH = 'default', service_port: str or int = 5037, env: dict = None, native: bool = True, auto_update: bool = True) -> None:
+        '''Creates a new instance of the async android driver.
+
+        The adb server must already be running, the device is detected by open().
+
+        Args:
+            device_sn: Device serial number.
+            executable_path: Path to the executable. The default uses its own executable.
+            service_port: Port the adb server is running on.
+            env: Environment variables.
+            native: Talk to the adb server over its socket directly where possible.
+            auto_update: Dump the interface layout again only when the screen has changed.
+        '''
+
+        self._service = Service(executable_path, port=service_port, env=env)
+        self._client = AsyncAdbClient(port=self._service.port) if native else None
+        self.device_sn = device_sn
+        self.auto_update = auto_update
+        self._uidump_remote = f'/data/local/tmp/uidump-{uuid.uuid4().hex[:8]}.xml'
+
+    async def __aenter__(self) -> 'AsyncAndroidDriver':
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+    def __repr__(self):
+        return '<{0.__module__}.{0.__name__} (device="{1}")>'.format(type(self), self.device_sn)
+
+    async def open(self) -> None:
+        '''Detect whether devices connected.'''
+        devices_list = await self.devices()
+        if not devices_list:
+            raise DeviceConnectionException(
+                'No devices are connected. Please connect the device with USB or via WLAN and turn on the USB debugging option.')
+        if not self.device_sn:
+            if len(devices_list) > 1:
+                raise DeviceConnectionException(
+                    f"Multiple devices detected: {' | '.join(devices_list)}, please specify device serial number or host.")
+            self.device_sn = devices_list[0]
+        if await self.get_state() == 'offline':
+            raise DeviceConnectionException(
+                'The device is offline. Please reconnect.')
+
+    async def _spawn(self, *args: str) -> tuple:
+        '''Execute command with the executable, returns raw (output, error).'''
+        process = await asyncio.create_subprocess_exec(
+            *self._service._build_cmd(args), stdin=PIPE, stdout=PIPE, stderr=PIPE, env=self._service.options.get('env'))
+        return await process.communicate()
+
+    async def _execute(self, *args: str) -> tuple:
+        '''Execute command.'''
+        if self._client and len(args) > 2 and args[0] == '-s' and args[2] == 'shell':
+            try:
+                output, error, _ = await self._client.shell(args[1], ' '.join(args[3:]))
+                return _decode(output), _decode(error)
+            except ServiceUnavailableException:
+                pass
+        output, error = await self._spawn(*args)
+        return _decode(output), _decode(error)
+
+    async def _exec_out(self, command: str) -> bytes:
+        '''Execute command on the device and return its raw binary output.'''
+        if self._client:
+            try:
+                return await self._client.exec_out(self.device_sn, command)
+            except ServiceUnavailableException:
+                pass
+        output, _ = await self._spawn('-s', self.device_sn, 'exec-out', command)
+        return output
+
+    async def _shell(self, *args: str) -> str:
+        '''Execute a shell command on the device and return its output.'''
+        output, _ = await self._execute('-s', self.device_sn, 'shell', *args)
+        return output
+
+    async def devices(self) -> list:
+        '''List connected devices.'''
+        if self._client:
+            try:
+                return await self._client.devices()
+            except (OSError, AdbProtocolException):
+                pass
+        output, _ = await self._execute('devices')
+        return output.split()[4::2]
+
+    async def get_state(self) -> str:
+        '''offline | bootloader | device'''
+        if self._client:
+            try:
+                return await self._client.get_state(self.device_sn)
+            except (OSError, AdbProtocolException):
+                pass
+        output, error = await self._execute('-s', self.device_sn, 'get-state')
+        if error:
+            raise DeviceConnectionException(error.split(':', 1)[-1].strip())
+        return output.strip()
+
+    # Android Device Information
+    @property
+    def serial_number(self) -> str:
+        '''Show device serial number.'''
+        return self.device_sn
+
+    async def get_device_model(self) -> str:
+        '''Show device model.'''
+        return (await self._shell('getprop', 'ro.product.model')).strip()
+
+    async def dumpsys(self, service: str, *args: str, select: Union[str, Iterable[str]] = None, parser: type = None):
+        '''Run dumpsys, keeping only the lines matching select on the device.'''
+        output = await self._shell(dumpsys_command(service, *args, select=select))
+        return parser.parse(output) if parser is not None else output
+
+    async def get_battery_info(self) -> BatteryInfo:
+        '''Show device battery information.'''
+        return await self.dumpsys('battery', parser=BatteryInfo)
+
+    async def get_resolution(self) -> list:
+        '''Show device resolution.'''
+        return (await self._shell('wm', 'size')).split()[2].split('x')
+
+    async def get_screen_density(self) -> str:
+        '''Show device screen density (PPI).'''
+        return (await self._shell('wm', 'density')).split()[2]
+
+    async def get_android_id(self) -> str:
+        '''Show Android ID.'''
+        return (await self._shell('settings', 'get', 'secure', 'android_id')).strip()
+
+    async def get_android_version(self) -> str:
+        '''Show Android version.'''
+        return (await self._shell('getprop', 'ro.build.version.release')).strip()
+
+    async def get_sdk_version(self) -> str:
+        '''Show Android SDK version.'''
+        return (await self._shell('getprop', 'ro.build.version.sdk')).strip()
+
+    async def get_device_mac(self) -> str:
+        '''Show device MAC.'''
+        return (await self._shell('cat', '/sys/class/net/wlan0/address')).strip()
+
+    async def get_cpu_info(self) -> CpuInfo:
+        '''Show device CPU information.'''
+        return CpuInfo.parse(await self._shell('cat', '/proc/cpuinfo'))
+
+    async def get_memory_info(self) -> MemInfo:
+        '''Show device memory information.'''
+        return MemInfo.parse(await self._shell('cat', '/proc/meminfo'))
+
+    async def push(self, local: _PATH, remote: _PATH) -> None:
+        '''Copy local files/directories to device.'''
+        if not os.path.exists(local):
+            raise FileNotFoundError(f'Local {local!r} does not exist.')
+        await self._execute('-s', self.device_sn, 'push', local, remote)
+
+    async def pull(self, remote: _PATH, local: _PATH) -> None:
+        '''Copy files/directories from device.'''
+        output, _ = await self._execute('-s', self.device_sn, 'pull', remote, local)
+        if 'error' in output:
+            raise FileNotFoundError(f'Remote {remote!r} does not exist.')
+
+    # Interact with the device
+    async def click(self, x: int, y: int) -> None:
+        '''Simulate finger click.'''
+        await self._shell('input', 'tap', str(x), str(y))
+
+    async def swipe(self, x1: int, y1: int, x2: int, y2: int, duration: int = 100) -> None:
+        '''Simulate finger swipe. (1000ms = 1s)'''
+        await self._shell('input', 'swipe', str(x1), str(y1), str(x2), str(y2), str(duration))
+
+    async def long_press(self, x: int, y: int, duration: int = 1000) -> None:
+        '''Simulate finger long press somewhere. (1000ms = 1s)'''
+        await self.swipe(x, y, x, y, duration)
+
+    async def send_keys(self, text: str = 'cerium') -> None:
+        '''Simulates typing keys.'''
+        for char in text:
+            if '\u4e00' <= char <= '\u9fff':
+                raise CharactersException(
+                    f'Text cannot contain non-English characters, such as {char!r}.')
+        await self._shell('input', 'text', re.escape(text))
+
+    async def send_keyevents(self, *keyevents: int) -> None:
+        '''Simulates typing one or more keyevents.'''
+        await self._shell('input', 'keyevent', *map(str, keyevents))
+
+    async def home(self) -> None:
+        '''Home button. Go back to Home screen.'''
+        await self.send_keyevents(Keys.HOME)
+
+    async def back(self) -> None:
+        '''Back button.'''
+        await self.send_keyevents(Keys.BACK)
+
+    async def wake(self) -> None:
+        '''Wake up screen.'''
+        await self.send_keyevents(Keys.WAKE)
+
+    async def lock(self) -> None:
+        '''Lock screen.'''
+        await self.send_keyevents(Keys.LOCK)
+
+    async def screen_state(self) -> str:
+        '''A cheap fingerprint of what is on the screen, or None.'''
+        output = await self._shell(SCREEN_STATE_COMMAND)
+        if not _DIGEST.search(output):
+            return None
+        return ' '.join(output.split())
+
+    async def _current_hierarchy(self, update: bool = False) -> Hierarchy:
+        '''The interface layout, dumped again if forced, missing or stale.'''
+        if update or self._hierarchy is None:
+            await self.uidump()
+        elif self.auto_update and self._screen_state is not None:
+            if await self.screen_state() != self._screen_state:
+                await self.uidump()
+        return self._hierarchy
+
+    async def uidump(self, local: _PATH = None) -> Hierarchy:
+        '''Get the current interface layout.'''
+        state = await self.screen_state() if self.auto_update else None
+        data = await self._exec_out(uidump_command(self._uidump_remote))
+        previous, self._hierarchy, self._screen_state = self._hierarchy, Hierarchy.from_bytes(data), state
+        if previous is not None:
+            previous.release()
+        if local:
+            with open(local, 'wb') as f:
+                f.write(data)
+        return self._hierarchy
+
+    async def find_element(self, value, by=By.ID, update=False) -> Elements:
+        '''Find a element or the first element.'''
+        if isinstance(value, Locator):
+            by, value = By.XPATH, value.xpath
+        hierarchy = await self._current_hierarchy(update)
+        for i in hierarchy.find(by, value):
+            return self._element_cls(self, hierarchy, i, by, value)
+        raise NoSuchElementException(f'No such element: {by}={value!r}.')
+
+    async def find_elements(self, value, by=By.ID, update=False) -> List[Elements]:
+        '''Find all elements.'''
+        if isinstance(value, Locator):
+            by, value = By.XPATH, value.xpath
+        hierarchy = await self._current_hierarchy(update)
+        elements = [self._element_cls(self, hierarchy, i, by, value)
+                    for i in hierarchy.find(by, value)]
+        if elements:
+            return elements
+        raise NoSuchElementException(f'No such element: {by}={value!r}.')
+
+    async def find_element_by_id(self, id_, update=False) -> Elements:
+        '''Finds an element by id.'''
+        return await self.find_element(id_, By.ID, update)
+
+    async def find_element_by_class(self, class_, update=False) -> Elements:
+        '''Finds an element by class.'''
+        return await self.find_element(class_, By.CLASS, update)
+
+    async def find_element_by_text(self, text, update=False) -> Elements:
+        '''Finds an element by text.'''
+        return await self.find_element(text, By.TEXT, update)
+
+    async def find_element_by_xpath(self, xpath, update=False) -> Elements:
+        '''Finds an element by xpath.'''
+        return await self.find_element(str(xpath), By.XPATH, update)
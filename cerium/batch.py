@@ -0,0 +1,57 @@
+# Licensed to the White Turing under one or more
+# contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The SFC licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""The ActionBatch implementation."""
+
+from typing import List
+
+
+class ActionBatch(object):
+    '''Collects input events and sends them as one compound shell command.'''
+
+    def __init__(self) -> None:
+        self._actions = []
+
+    def __len__(self) -> int:
+        return len(self._actions)
+
+    def __repr__(self):
+        return '<{0.__module__}.{0.__name__} (actions={1})>'.format(type(self), len(self))
+
+    def add(self, *args: str) -> None:
+        '''Queue the arguments of one input command, e.g. ('tap', '500', '250').'''
+        self._actions.append(args)
+
+    def commands(self) -> List[str]:
+        '''The queued input commands, with consecutive keyevents merged.'''
+        commands = []
+        keyevents = []
+        for args in self._actions:
+            if args[0] == 'keyevent' and len(args) == 2:
+                keyevents.append(args[1])
+                continue
+            if keyevents:
+                commands.append('input keyevent ' + ' '.join(keyevents))
+                keyevents = []
+            commands.append('input ' + ' '.join(args))
+        if keyevents:
+            commands.append('input keyevent ' + ' '.join(keyevents))
+        return commands
+
+    def command(self) -> str:
+        '''The queued input commands as one shell command line.'''
+        return ' ; '.join(self.commands())
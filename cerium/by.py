@@ -23,6 +23,7 @@ class By(object):
 
     ID = "resource-id"
     TEXT = "text"
+    NAME = "text"
     CLASS = "class"
     CONTENT_DESC = "content-desc"
     PACKAGE_NAME = 'package'
@@ -31,8 +32,11 @@ class By(object):
     CLICKABLE = 'clickable'
     ENABLED = 'enabled'
     FOCUSABLE = 'focusable'
+    FOCUSED = 'focused'
     SCROLLABLE = 'scrollable'
     LONG_CLICKABLE = 'long-clickable'
     PASSWORD = 'password'
     SELECTED = 'selected'
     BOUNDS = 'bounds'
+    XPATH = 'xpath'
+    IMAGE = 'image'
@@ -0,0 +1,211 @@
+# Licensed to the White Turing under one or more
+# contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The SFC licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Caches of device state that rarely changes."""
+
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterator, NamedTuple, Tuple
+
+
+class PropertyCache(object):
+    '''Device properties loaded in one round trip and served from memory.
+
+    The whole snapshot is reloaded once it is older than ttl seconds, or on
+    the first access after invalidate().
+    '''
+
+    def __init__(self, loader: Callable[[], Dict[str, str]], ttl: float = 300.0) -> None:
+        '''Creates a new instance of the PropertyCache.
+
+        Args:
+            loader: Reads all the properties from the device.
+            ttl: Seconds a snapshot stays valid, None never expires.
+        '''
+
+        self.ttl = ttl
+        self._loader = loader
+        self._values = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key: str) -> str:
+        return self.snapshot()[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.snapshot()
+
+    def __repr__(self):
+        return '<{0.__module__}.{0.__name__} (ttl={1}, stale={2})>'.format(type(self), self.ttl, self.stale)
+
+    @property
+    def stale(self) -> bool:
+        '''Whether the next access reloads the snapshot.'''
+        if self._values is None:
+            return True
+        return self.ttl is not None and time.monotonic() - self._loaded_at > self.ttl
+
+    def get(self, key: str, default: str = None) -> str:
+        '''The property value, or default if the device does not have it.'''
+        return self.snapshot().get(key, default)
+
+    def snapshot(self) -> Dict[str, str]:
+        '''All the properties, reloaded if stale.'''
+        with self._lock:
+            if self.stale:
+                self._values = self._loader()
+                self._loaded_at = time.monotonic()
+            return self._values
+
+    def invalidate(self) -> None:
+        '''Drop the snapshot, e.g. after a reboot or reconnect.'''
+        with self._lock:
+            self._values = None
+
+
+class PackageInfo(NamedTuple):
+    '''An installed package.'''
+
+    name: str
+    path: str = ''
+    version_code: int = None
+
+    @classmethod
+    def parse_list(cls, output: str) -> Dict[str, 'PackageInfo']:
+        '''Parse the output of pm list packages -f [--show-versioncode].'''
+        packages = {}
+        for match in re.finditer(r'^package:(?:(.*)=)?(\S+?)(?: versionCode:(\d+))?\s*$', output, flags=re.M):
+            path, name, version_code = match.groups()
+            packages[name] = cls(name, path or '', int(version_code) if version_code else None)
+        return packages
+
+
+class PackageIndex(object):
+    '''The installed packages of a device, loaded once and then kept up to date in place.
+
+    The driver adds and removes entries as it installs and uninstalls, anything
+    installed behind its back shows up after refresh() or invalidate().
+    '''
+
+    def __init__(self, loader: Callable[[], Dict[str, PackageInfo]]) -> None:
+        '''Creates a new instance of the PackageIndex.
+
+        Args:
+            loader: Reads all the installed packages from the device.
+        '''
+
+        self._loader = loader
+        self._packages = None
+        self._lock = threading.Lock()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._snapshot()
+
+    def __getitem__(self, name: str) -> PackageInfo:
+        return self._snapshot()[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._snapshot()))
+
+    def __len__(self) -> int:
+        return len(self._snapshot())
+
+    def __repr__(self):
+        return '<{0.__module__}.{0.__name__} (loaded={1})>'.format(type(self), self.loaded)
+
+    @property
+    def loaded(self) -> bool:
+        return self._packages is not None
+
+    def _snapshot(self) -> Dict[str, PackageInfo]:
+        with self._lock:
+            if self._packages is None:
+                self._packages = self._loader()
+            return self._packages
+
+    def get(self, name: str, default: PackageInfo = None) -> PackageInfo:
+        '''The package, or default if it is not installed.'''
+        return self._snapshot().get(name, default)
+
+    def refresh(self) -> None:
+        '''Reload the index now.'''
+        packages = self._loader()
+        with self._lock:
+            self._packages = packages
+
+    def invalidate(self) -> None:
+        '''Reload the index on the next access.'''
+        with self._lock:
+            self._packages = None
+
+    def add(self, info: PackageInfo) -> None:
+        '''Record an installed package, a no-op until the index is loaded.'''
+        with self._lock:
+            if self._packages is not None:
+                self._packages[info.name] = info
+
+    def discard(self, name: str) -> None:
+        '''Forget an uninstalled package.'''
+        with self._lock:
+            if self._packages is not None:
+                self._packages.pop(name, None)
+
+
+class DisplayInfo(NamedTuple):
+    '''Display metrics of the device.
+
+    width and height are the natural (rotation 0) size in pixels.
+    '''
+
+    width: int
+    height: int
+    density: int
+    rotation: int = 0
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        '''The current (width, height), taking rotation into account.'''
+        if self.rotation % 2:
+            return self.height, self.width
+        return self.width, self.height
+
+    @classmethod
+    def parse(cls, output: str) -> 'DisplayInfo':
+        '''Parse the output of dumpsys window displays.
+
+        Returns:
+            The display metrics, or None if output has none.
+        '''
+        init = re.search(r'init=(\d+)x(\d+) (\d+)dpi', output)
+        if not init:
+            return None
+        width, height, density = map(int, init.groups())
+        rotation = cls.parse_rotation(output)
+        if rotation is None:
+            cur = re.search(r'cur=(\d+)x(\d+)', output)
+            rotation = int(bool(cur) and int(cur.group(1)) != width)
+        return cls(width, height, density, rotation)
+
+    @staticmethod
+    def parse_rotation(output: str) -> int:
+        '''The rotation in the output of dumpsys window displays, or None.'''
+        rotation = re.search(r'\bm(?:Current)?Rotation=(?:ROTATION_)?(\d+)', output)
+        if not rotation:
+            return None
+        rotation = int(rotation.group(1))
+        return rotation // 90 if rotation >= 90 else rotation
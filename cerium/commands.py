@@ -60,5 +60,5 @@ class Commands(object):
         '''Execute command.'''
         cmd = self._build_cmd(args)
         process = subprocess.Popen(cmd, stdout=PIPE, stderr=PIPE, stdin=PIPE,
-                                   encoding='utf-8', shell=options.get('shell', False), env=options.get('env'))
+                                   encoding=options.get('encoding', 'utf-8'), shell=options.get('shell', False), env=options.get('env'))
         return process
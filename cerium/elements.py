@@ -17,113 +17,126 @@
 
 from typing import List, Tuple
 
+from .by import By
+from .hierarchy import Hierarchy
 from .keys import Keys
 
 
 class Elements(object):
-    '''Represents a element.'''
+    '''Represents a element.
 
-    def __init__(self, parent, node: dict, key: Keys, value: str, coord: List[int], click_point: Tuple[int]) -> None:
+    A lightweight view of one node in the Hierarchy it was found in.
+    '''
+
+    __slots__ = ('_parent', '_hierarchy', '_position', '_key', '_value')
+
+    def __init__(self, parent, hierarchy: Hierarchy, position: int, key: str, value: str) -> None:
         self._parent = parent
-        self._node = node
+        self._hierarchy = hierarchy
+        self._position = position
         self._key = key
         self._value = value
-        self._coord = coord
-        self._click_point = click_point
 
     def __repr__(self):
-        return '<{0.__module__}.{0.__name__} (element="{2}: {3}", coord="{4}")>'.format(type(self), self._key, self._value, self._coord)
+        return '<{0.__module__}.{0.__name__} (element="{1}: {2}", coord="{3}")>'.format(type(self), self._key, self._value, self.coord)
 
     @property
     def text(self) -> str:
         """The text of the element."""
-        return self._node['text']
+        return self._hierarchy.get(self._position, By.TEXT)
 
     @property
     def resource_id(self) -> str:
         """The resource-id of the element."""
-        return self._node['resource-id']
+        return self._hierarchy.get(self._position, By.ID)
 
     @property
     def class_(self) -> str:
         """The class of the element."""
-        return self._node['class']
+        return self._hierarchy.get(self._position, By.CLASS)
 
     @property
     def package(self) -> str:
         """The package of the element."""
-        return self._node['package']
+        return self._hierarchy.get(self._position, By.PACKAGE_NAME)
 
     @property
     def content_desc(self) -> str:
         """The content-desc of the element."""
-        return self._node['content-desc']
+        return self._hierarchy.get(self._position, By.CONTENT_DESC)
 
     @property
     def checkable(self) -> bool:
         """The checkable of the element."""
-        return self._node['checkable']
+        return self._hierarchy.flag(self._position, By.CHECKABLE)
 
     @property
     def bounds(self) -> List[int]:
         """The bounds of the element."""
-        return self._coord
+        return self._hierarchy.coord(self._position)
 
     @property
     def coord(self) -> List[int]:
         """The coord of the element."""
-        return self._coord
+        return self._hierarchy.coord(self._position)
+
+    @property
+    def click_point(self) -> Tuple[float, float]:
+        """The center of the element."""
+        return self._hierarchy.click_point(self._position)
 
     def click(self) -> None:
         """Clicks the element."""
-        self._parent.click(*self._click_point)
+        return self._parent.click(*self.click_point)
 
     def clear(self) -> None:
         """Clears the text if it's a text entry element."""
-        self.click()
-        for i in self.text:
-            self._parent.send_keyevents(Keys.DEL)
+        with self._parent.batch():
+            self.click()
+            for i in self.text:
+                self._parent.send_keyevents(Keys.DEL)
 
     def send_keys(self, text: str = 'cerium') -> None:
         '''Simulates typing keys.'''
-        self.click()
-        self._parent.send_keys(text)
+        with self._parent.batch():
+            self.click()
+            self._parent.send_keys(text)
 
     def is_selected(self) -> bool:
         """Returns whether the element is selected.
 
         Can be used to check if a checkbox or radio button is selected.
         """
-        return self._node['selected']
+        return self._hierarchy.flag(self._position, By.SELECTED)
 
     def is_enabled(self) -> bool:
         """Returns whether the element is enabled."""
-        return self._node['enabled']
+        return self._hierarchy.flag(self._position, By.ENABLED)
 
     def is_checked(self) -> bool:
         """Returns whether the element is checked."""
-        return self._node['checked']
+        return self._hierarchy.flag(self._position, By.CHECKED)
 
     def is_clickable(self) -> bool:
         """Returns whether the element is clickable."""
-        return self._node['clickable']
+        return self._hierarchy.flag(self._position, By.CLICKABLE)
 
     def is_focusable(self) -> bool:
         """Returns whether the element is focusable."""
-        return self._node['focusable']
+        return self._hierarchy.flag(self._position, By.FOCUSABLE)
 
     def is_focused(self) -> bool:
         """Returns whether the element is focused."""
-        return self._node['focused']
+        return self._hierarchy.flag(self._position, By.FOCUSED)
 
     def is_scrollable(self) -> bool:
         """Returns whether the element is scrollable."""
-        return self._node['scrollable']
+        return self._hierarchy.flag(self._position, By.SCROLLABLE)
 
     def is_long_clickable(self) -> bool:
         """Returns whether the element is long-clickable."""
-        return self._node['long-clickable']
+        return self._hierarchy.flag(self._position, By.LONG_CLICKABLE)
 
     def is_password(self) -> bool:
         """Returns whether the element is password."""
-        return self._node['password']
+        return self._hierarchy.flag(self._position, By.PASSWORD)
@@ -23,6 +23,11 @@ class AndroidDriverException(Exception):
     pass
 
 
+class AdbProtocolException(AndroidDriverException):
+    """Thrown when the adb server refuses a request or breaks the protocol."""
+    pass
+
+
 class ApplicationsException(AndroidDriverException):
     """Thrown when using the wrong command to run the application."""
     pass
@@ -38,6 +43,11 @@ class DeviceConnectionException(AndroidDriverException):
     pass
 
 
+class FileTransferException(AndroidDriverException):
+    """Thrown when the device refuses a file transfer."""
+    pass
+
+
 class NoSuchElementException(AndroidDriverException):
     """Thrown when the element could not be found."""
     pass
@@ -46,3 +56,13 @@ class NoSuchElementException(AndroidDriverException):
 class NoSuchPackageException(AndroidDriverException):
     """Thrown when the package does not exist."""
     pass
+
+
+class ServiceUnavailableException(AdbProtocolException):
+    """Thrown when the adb server or a device service cannot be opened, nothing ran on the device."""
+    pass
+
+
+class TimeoutException(AndroidDriverException):
+    """Thrown when a condition is not met in time."""
+    pass
@@ -0,0 +1,242 @@
+# Licensed to the White Turing under one or more
+# contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The SFC licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""The Hierarchy implementation."""
+
+import hashlib
+import re
+import sys
+from array import array
+from typing import Any, BinaryIO, Callable, Dict, List, Tuple
+
+from lxml import etree
+
+from .by import By
+from .exceptions import AndroidDriverException
+from .locator import Locator, compile_xpath
+
+# String attributes, stored as one column of interned strings each.
+COLUMNS = (By.ID, By.TEXT, By.CLASS, By.CONTENT_DESC, By.PACKAGE_NAME)
+# Boolean attributes, packed into one bit each.
+FLAGS = (By.CHECKABLE, By.CHECKED, By.CLICKABLE, By.ENABLED, By.FOCUSABLE,
+         By.FOCUSED, By.SCROLLABLE, By.LONG_CLICKABLE, By.PASSWORD, By.SELECTED)
+# Attributes with a hash index, built once per dump.
+INDEXED = COLUMNS
+
+_BITS = {flag: 1 << i for i, flag in enumerate(FLAGS)}
+_BOUNDS = re.compile(r'-?\d+')
+
+
+class Hierarchy(object):
+    '''A parsed interface layout, reusable across any number of lookups.
+
+    Nodes are stored as a compact table in document order: one column of
+    interned strings per attribute, bounds in an integer array and the
+    boolean attributes packed into bit flags. Lookups by resource-id, text,
+    class, content-desc and package are dictionary hits, other attributes
+    fall back to a scan.
+    '''
+
+    def __init__(self, root: etree._Element = None, source: bytes = None) -> None:
+        '''Creates a new instance of the Hierarchy.
+
+        Args:
+            root: The parsed dump, None starts an empty table.
+            source: The raw dump, kept for XPath queries until release().
+        '''
+
+        self.source = source
+        self.digest = hashlib.md5(source).hexdigest() if source is not None else None
+        self.rotation = int(root.get('rotation', 0)) if root is not None else 0
+        self.columns = {key: [] for key in COLUMNS}
+        self.bounds = array('i')
+        self.flags = array('H')
+        self.parents = array('i')
+        self._indexes = None
+        self._tree = None
+        positions = {}
+        for node in root.iter(tag='node') if root is not None else ():
+            self.append(node.attrib, positions.get(node.getparent(), -1))
+            positions[node] = len(self.parents) - 1
+
+    def __len__(self) -> int:
+        return len(self.parents)
+
+    def __repr__(self):
+        return '<{0.__module__}.{0.__name__} (nodes={1})>'.format(type(self), len(self))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Hierarchy':
+        '''Parse a uiautomator dump.'''
+        if not data.lstrip().startswith(b'<'):
+            raise AndroidDriverException(
+                f'Failed to dump the interface layout: {data.decode("utf-8", "replace").strip()}')
+        return cls(etree.fromstring(data), data)
+
+    @classmethod
+    def stream_find(cls, stream: BinaryIO, by: str, value: str) -> 'Hierarchy':
+        '''Parse a uiautomator dump incrementally and stop at the first match.
+
+        Processed nodes are cleared as the parser goes, so time and memory
+        track the position of the match rather than the size of the dump.
+
+        Returns:
+            A single node hierarchy holding the match, or None.
+        '''
+        try:
+            for event, node in etree.iterparse(stream, events=('start', 'end'), tag='node'):
+                if event == 'start':
+                    if node.get(by) == value:
+                        match = cls()
+                        match.append(node.attrib)
+                        return match
+                    continue
+                node.clear(keep_tail=True)
+                while node.getprevious() is not None:
+                    del node.getparent()[0]
+        except etree.XMLSyntaxError as e:
+            raise AndroidDriverException(
+                f'Failed to dump the interface layout: {e}') from None
+        return None
+
+    def release(self) -> None:
+        '''Drop the raw dump and the XPath tree, keeping only the compact table.
+
+        The driver releases a hierarchy once a newer dump replaces it, so
+        snapshots held on to by elements cost no more than their table.
+        '''
+        self.source = None
+        self._tree = None
+
+    def append(self, attrib: Dict[str, str], parent: int = -1) -> int:
+        '''Add a node to the table, returns its position.'''
+        for key, column in self.columns.items():
+            column.append(sys.intern(attrib.get(key, '')))
+        coord = list(map(int, _BOUNDS.findall(attrib.get(By.BOUNDS, ''))))
+        self.bounds.extend((coord + [0, 0, 0, 0])[:4])
+        flags = 0
+        for flag, bit in _BITS.items():
+            if attrib.get(flag) == 'true':
+                flags |= bit
+        self.flags.append(flags)
+        self.parents.append(parent)
+        self._indexes = None
+        return len(self.parents) - 1
+
+    @property
+    def indexes(self) -> Dict[str, Dict[str, List[int]]]:
+        '''Positions by value, for every indexed attribute.'''
+        if self._indexes is None:
+            self._indexes = {}
+            for key in INDEXED:
+                index = self._indexes[key] = {}
+                for i, value in enumerate(self.columns[key]):
+                    index.setdefault(value, []).append(i)
+        return self._indexes
+
+    def get(self, position: int, key: str) -> str:
+        '''The attribute of the node at position, as it appears in the dump.'''
+        if key in self.columns:
+            return self.columns[key][position]
+        if key in _BITS:
+            return 'true' if self.flags[position] & _BITS[key] else 'false'
+        if key == By.BOUNDS:
+            return '[{},{}][{},{}]'.format(*self.coord(position))
+        return None
+
+    def flag(self, position: int, key: str) -> bool:
+        '''A boolean attribute of the node at position.'''
+        return bool(self.flags[position] & _BITS[key])
+
+    def coord(self, position: int) -> List[int]:
+        '''The bounds of the node at position, as [left, top, right, bottom].'''
+        return self.bounds[4 * position:4 * position + 4].tolist()
+
+    def click_point(self, position: int) -> Tuple[float, float]:
+        '''The center of the node at position.'''
+        left, top, right, bottom = self.coord(position)
+        return (left + right) / 2, (top + bottom) / 2
+
+    def select(self, expression: str) -> List[int]:
+        '''Positions of the nodes selected by an XPath expression or Locator, in document order.'''
+        # Local references, release() may run in another thread meanwhile.
+        tree, source = self._tree, self.source
+        if tree is None:
+            if source is None:
+                raise AndroidDriverException(
+                    'XPath needs the raw dump, this hierarchy was built or released without it.')
+            root = etree.fromstring(source)
+            tree = root, {node: i for i, node in enumerate(root.iter(tag='node'))}
+            if self.source is not None:
+                self._tree = tree
+        root, positions = tree
+        result = compile_xpath(str(expression))(root)
+        if not isinstance(result, list):
+            raise ValueError(f'{expression!r} does not select nodes.')
+        return [positions[node] for node in result if node in positions]
+
+    def find(self, by: str, value: str) -> List[int]:
+        '''Positions of the nodes whose attribute by equals value, in document order.
+
+        With By.XPATH, or a Locator as value, the nodes selected by the expression.
+        '''
+        if by == By.XPATH or isinstance(value, Locator):
+            return self.select(value)
+        if by in INDEXED:
+            return self.indexes[by].get(value, [])
+        return [i for i in range(len(self)) if self.get(i, by) == value]
+
+    def _matcher(self, by: str, value: str) -> Callable[[int], bool]:
+        '''A test of one node position against an attribute value.'''
+        if by in self.columns:
+            column = self.columns[by]
+            return lambda i: column[i] == value
+        if by in _BITS:
+            bit, expected = _BITS[by], value == 'true'
+            return lambda i: bool(self.flags[i] & bit) == expected
+        return lambda i: self.get(i, by) == value
+
+    def find_many(self, locators: Dict[Any, Tuple[str, str]]) -> Dict[Any, int]:
+        '''Resolve many locators against one dump.
+
+        Indexed attributes are dictionary hits and XPath expressions go to the
+        XPath engine, the remaining locators share a single walk over the nodes.
+
+        Args:
+            locators: A dict of name to (by, value). XPath expressions and
+                      Locators are evaluated by the XPath engine instead.
+
+        Returns:
+            A dict of name to the position of the first match, or None.
+        '''
+        found = dict.fromkeys(locators)
+        pending = []
+        for name, (by, value) in locators.items():
+            if by == By.XPATH or isinstance(value, Locator):
+                found[name] = next(iter(self.select(value)), None)
+            elif by in INDEXED:
+                found[name] = next(iter(self.indexes[by].get(value, ())), None)
+            else:
+                pending.append((name, self._matcher(by, value)))
+        for i in range(len(self)):
+            if not pending:
+                break
+            matched = [item for item in pending if item[1](i)]
+            for item in matched:
+                found[item[0]] = i
+                pending.remove(item)
+        return found
@@ -0,0 +1,164 @@
+# Licensed to the White Turing under one or more
+# contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The SFC licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+'''Template matching on screenshots.'''
+
+import os
+from typing import Iterable, NamedTuple, Tuple
+
+from .screen import _numpy
+
+# Coarse scores run a little lower than full resolution ones.
+_COARSE_SLACK = 0.15
+# Smallest template side, in pixels, worth matching at coarse resolution.
+_COARSE_MIN = 8
+
+
+class Match(NamedTuple):
+    '''Where a template was found, in screen pixels.'''
+
+    left: int
+    top: int
+    right: int
+    bottom: int
+    score: float
+
+    @property
+    def bounds(self) -> Tuple[int, int, int, int]:
+        return self.left, self.top, self.right, self.bottom
+
+
+def load_template(path) -> 'numpy.ndarray':
+    '''Load a template saved with numpy.save, or any image Pillow can read.'''
+    numpy = _numpy()
+    if os.fspath(path).endswith('.npy'):
+        return numpy.load(path)
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ImportError(
+            'Loading image files needs Pillow, or save the template with numpy.save.') from None
+    with Image.open(path) as image:
+        return numpy.asarray(image.convert('RGB'))
+
+
+def _gray(image) -> 'numpy.ndarray':
+    '''A float64 luminance plane of an image.'''
+    numpy = _numpy()
+    image = numpy.asarray(image)
+    if image.ndim == 3:
+        return image[..., :3].mean(axis=2)
+    return image.astype(numpy.float64)
+
+
+def _downscale(image, factor: int) -> 'numpy.ndarray':
+    '''Shrink by an integer factor, averaging blocks of pixels.'''
+    if factor == 1:
+        return image
+    height, width = image.shape[0] // factor, image.shape[1] // factor
+    return image[:height * factor, :width * factor].reshape(height, factor, width, factor).mean(axis=(1, 3))
+
+
+def _resize(image, scale: float) -> 'numpy.ndarray':
+    '''Nearest neighbour resize.'''
+    if scale == 1:
+        return image
+    numpy = _numpy()
+    height, width = image.shape
+    rows = numpy.minimum((numpy.arange(max(round(height * scale), 1)) / scale).astype(int), height - 1)
+    cols = numpy.minimum((numpy.arange(max(round(width * scale), 1)) / scale).astype(int), width - 1)
+    return image[rows[:, None], cols]
+
+
+def _window_sums(image, height: int, width: int) -> 'numpy.ndarray':
+    '''Sum of every height x width window, from an integral image.'''
+    numpy = _numpy()
+    integral = numpy.zeros((image.shape[0] + 1, image.shape[1] + 1))
+    integral[1:, 1:] = image.cumsum(0).cumsum(1)
+    return (integral[height:, width:] - integral[:-height, width:]
+            - integral[height:, :-width] + integral[:-height, :-width])
+
+
+def match_scores(image, template) -> 'numpy.ndarray':
+    '''Normalized cross-correlation of template at every position inside image.
+
+    Both are 2-D luminance planes, the result has one score in [-1, 1]
+    per top-left corner, or is empty if the template does not fit.
+    '''
+    numpy = _numpy()
+    height, width = image.shape
+    h, w = template.shape
+    if h > height or w > width:
+        return numpy.empty((0, 0))
+    template = template - template.mean()
+    norm = numpy.sqrt((template * template).sum())
+    if not norm:
+        return numpy.zeros((height - h + 1, width - w + 1))
+    spectrum = numpy.fft.rfft2(image) * numpy.conj(numpy.fft.rfft2(template, s=image.shape))
+    correlation = numpy.fft.irfft2(spectrum, s=image.shape)[:height - h + 1, :width - w + 1]
+    sums = _window_sums(image, h, w)
+    variance = numpy.maximum(_window_sums(image * image, h, w) - sums * sums / (h * w), 0)
+    denominator = numpy.sqrt(variance) * norm
+    scores = numpy.zeros_like(correlation)
+    numpy.divide(correlation, denominator, out=scores, where=denominator > 1e-6)
+    return scores
+
+
+def match_template(image, template, threshold: float = 0.9, scales: Iterable[float] = (1.0,), factor: int = 4) -> Match:
+    '''Find the best match of template in image.
+
+    Every scale of the template is first matched against a factor times
+    smaller copy of the image, scales without a promising spot are dropped
+    there. The promising spots are then refined at full resolution in a
+    small window, best first, until one reaches threshold.
+
+    Args:
+        image: The screenshot, as returned by screenshot_array.
+        template: The image to look for, same pixel layout as image.
+        threshold: The lowest normalized cross-correlation accepted, from 0 to 1.
+        scales: Template sizes to try, relative to its own, e.g. (0.8, 1.0, 1.25).
+        factor: Shrink factor of the coarse pass.
+
+    Returns:
+        The Match, or None.
+    '''
+    numpy = _numpy()
+    image, template = _gray(image), _gray(template)
+    coarse_images = {}
+    candidates = []
+    for scale in scales:
+        scaled = _resize(template, scale)
+        h, w = scaled.shape
+        shrink = factor if min(h, w) // factor >= _COARSE_MIN else 1
+        if shrink not in coarse_images:
+            coarse_images[shrink] = _downscale(image, shrink)
+        scores = match_scores(coarse_images[shrink], _downscale(scaled, shrink))
+        if not scores.size:
+            continue
+        y, x = numpy.unravel_index(scores.argmax(), scores.shape)
+        if scores[y, x] >= threshold - (_COARSE_SLACK if shrink > 1 else 0):
+            candidates.append((scores[y, x], scaled, int(y) * shrink, int(x) * shrink, shrink))
+    candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+    for _, scaled, y, x, shrink in candidates:
+        h, w = scaled.shape
+        top, left = max(y - shrink, 0), max(x - shrink, 0)
+        scores = match_scores(image[top:y + h + shrink, left:x + w + shrink], scaled)
+        dy, dx = numpy.unravel_index(scores.argmax(), scores.shape)
+        if scores[dy, dx] >= threshold:
+            top, left = top + int(dy), left + int(dx)
+            return Match(left, top, left + w, top + h, float(scores[dy, dx]))
+    return None
@@ -0,0 +1,114 @@
+# Licensed to the White Turing under one or more
+# contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The SFC licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""The Locator implementation."""
+
+from functools import lru_cache
+
+from lxml import etree
+
+from .by import By
+
+
+@lru_cache(maxsize=256)
+def compile_xpath(expression: str) -> etree.XPath:
+    '''Compile an XPath expression once and reuse it.'''
+    return etree.XPath(expression)
+
+
+def literal(value: str) -> str:
+    '''Quote a string as an XPath literal.'''
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    parts = value.split("'")
+    return 'concat(' + ", \"'\", ".join(f"'{part}'" for part in parts) + ')'
+
+
+class Locator(object):
+    '''A composite element locator, compiled to a single XPath expression.
+
+    Usage:
+        locator = Locator.equals(By.ID, 'com.example:id/button') & Locator.contains(By.TEXT, 'OK') & Locator.flag(By.CLICKABLE)
+        element = driver.find_element(locator.descendant_of(Locator.equals(By.CLASS, 'android.widget.FrameLayout')))
+    '''
+
+    __slots__ = ('predicate',)
+
+    def __init__(self, predicate: str) -> None:
+        '''Creates a new instance of the Locator.
+
+        Args:
+            predicate: XPath predicate evaluated on every node, e.g. "@text='OK'".
+        '''
+
+        self.predicate = predicate
+
+    def __and__(self, other: 'Locator') -> 'Locator':
+        return Locator(f'({self.predicate}) and ({other.predicate})')
+
+    def __or__(self, other: 'Locator') -> 'Locator':
+        return Locator(f'({self.predicate}) or ({other.predicate})')
+
+    def __invert__(self) -> 'Locator':
+        return Locator(f'not({self.predicate})')
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Locator) and self.predicate == other.predicate
+
+    def __hash__(self) -> int:
+        return hash(self.predicate)
+
+    def __str__(self) -> str:
+        return self.xpath
+
+    def __repr__(self):
+        return '<{0.__module__}.{0.__name__} (xpath="{1}")>'.format(type(self), self.xpath)
+
+    @property
+    def xpath(self) -> str:
+        '''The XPath expression selecting every matching node.'''
+        return f'//node[{self.predicate}]'
+
+    @classmethod
+    def equals(cls, by: str, value: str) -> 'Locator':
+        '''Nodes whose attribute equals value.'''
+        return cls(f'@{by}={literal(value)}')
+
+    @classmethod
+    def contains(cls, by: str, value: str) -> 'Locator':
+        '''Nodes whose attribute contains value.'''
+        return cls(f'contains(@{by}, {literal(value)})')
+
+    @classmethod
+    def starts_with(cls, by: str, value: str) -> 'Locator':
+        '''Nodes whose attribute starts with value.'''
+        return cls(f'starts-with(@{by}, {literal(value)})')
+
+    @classmethod
+    def flag(cls, by: str = By.CLICKABLE, value: bool = True) -> 'Locator':
+        '''Nodes whose boolean attribute is value, e.g. Locator.flag(By.CLICKABLE).'''
+        return cls(f"@{by}='{str(value).lower()}'")
+
+    def descendant_of(self, ancestor: 'Locator') -> 'Locator':
+        '''Nodes matching this locator inside a node matching ancestor.'''
+        return Locator(f'({self.predicate}) and ancestor::node[{ancestor.predicate}]')
+
+    def child_of(self, parent: 'Locator') -> 'Locator':
+        '''Nodes matching this locator directly inside a node matching parent.'''
+        return Locator(f'({self.predicate}) and parent::node[{parent.predicate}]')
@@ -0,0 +1,270 @@
+# Licensed to the White Turing under one or more
+# contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The SFC licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+'''Typed parsers for dumpsys and /proc output.
+
+Every parser consumes one line at a time through feed(), so it works the
+same on a whole output and on lines as they stream off the device.
+'''
+
+import re
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Union
+
+_BATTERY_LINE = re.compile(r'^\s+([^:]+): (.*)$')
+_MEMINFO_LINE = re.compile(r'^([^:]+):\s+(\d+)(?: kB)?\s*$')
+_CPUINFO_LINE = re.compile(r'^([^:]+?)\s*: ?(.*)$')
+_FOCUS_WINDOW = re.compile(r'mCurrentFocus=Window\{\S+ \S+ ([^}\s]+)\}')
+_FOCUS_APP = re.compile(r'(?:mFocusedApp|mResumedActivity|topResumedActivity)=.*?ActivityRecord\{\S+ \S+ (\S+/\S+)')
+
+
+class LineParser(object):
+    '''Base of the parsers.'''
+
+    __slots__ = ()
+
+    def feed(self, line: str) -> None:
+        '''Consume one line of output.'''
+        raise NotImplementedError
+
+    @classmethod
+    def parse(cls, output: Union[str, Iterable[str]]):
+        '''Parse a whole output, or an iterable of lines.'''
+        result = cls()
+        for line in output.splitlines() if isinstance(output, str) else output:
+            result.feed(line.rstrip('\r\n'))
+        return result
+
+
+class BatteryInfo(LineParser, Mapping):
+    '''The output of dumpsys battery.
+
+    Reads like the dict of raw strings it always was, e.g. info['level'],
+    with typed properties on top.
+    '''
+
+    __slots__ = ('_values',)
+
+    def __init__(self) -> None:
+        self._values = {}
+
+    def __getitem__(self, key: str) -> str:
+        return self._values[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __repr__(self):
+        return '<{0.__module__}.{0.__name__} (level={1}, status={2})>'.format(type(self), self.level, self.status)
+
+    def feed(self, line: str) -> None:
+        match = _BATTERY_LINE.match(line)
+        if match:
+            self._values[match.group(1).strip()] = match.group(2).strip()
+
+    def _int(self, key: str) -> int:
+        value = self._values.get(key)
+        return int(value) if value and value.lstrip('-').isdigit() else None
+
+    @property
+    def level(self) -> int:
+        return self._int('level')
+
+    @property
+    def scale(self) -> int:
+        return self._int('scale')
+
+    @property
+    def percent(self) -> float:
+        '''Charge in percent of the scale.'''
+        return 100 * self.level / self.scale if self.level is not None and self.scale else None
+
+    @property
+    def status(self) -> int:
+        '''BatteryManager.BATTERY_STATUS_*, 2 is charging and 5 is full.'''
+        return self._int('status')
+
+    @property
+    def health(self) -> int:
+        return self._int('health')
+
+    @property
+    def temperature(self) -> float:
+        '''Degrees Celsius.'''
+        value = self._int('temperature')
+        return value / 10 if value is not None else None
+
+    @property
+    def voltage(self) -> int:
+        '''Millivolts.'''
+        return self._int('voltage')
+
+    @property
+    def present(self) -> bool:
+        return self._values.get('present') == 'true'
+
+    @property
+    def plugged(self) -> bool:
+        '''Whether any of AC, USB or wireless power is connected.'''
+        return any(self._values.get(f'{source} powered') == 'true' for source in ('AC', 'USB', 'Wireless'))
+
+    @property
+    def technology(self) -> str:
+        return self._values.get('technology')
+
+
+class MemInfo(LineParser, Mapping):
+    '''The content of /proc/meminfo, a mapping of field to kB.'''
+
+    __slots__ = ('_values',)
+
+    def __init__(self) -> None:
+        self._values = {}
+
+    def __getitem__(self, key: str) -> int:
+        return self._values[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __repr__(self):
+        return '<{0.__module__}.{0.__name__} (total={1}, available={2})>'.format(type(self), self.total, self.available)
+
+    def feed(self, line: str) -> None:
+        match = _MEMINFO_LINE.match(line)
+        if match:
+            self._values[match.group(1)] = int(match.group(2))
+
+    @property
+    def total(self) -> int:
+        return self._values.get('MemTotal')
+
+    @property
+    def free(self) -> int:
+        return self._values.get('MemFree')
+
+    @property
+    def available(self) -> int:
+        '''MemAvailable, estimated from free memory and caches on kernels without it.'''
+        if 'MemAvailable' in self._values:
+            return self._values['MemAvailable']
+        return sum(self._values.get(key, 0) for key in ('MemFree', 'Buffers', 'Cached')) or None
+
+    @property
+    def used(self) -> int:
+        return self.total - self.available if self.total is not None and self.available is not None else None
+
+    @property
+    def swap_total(self) -> int:
+        return self._values.get('SwapTotal')
+
+    @property
+    def swap_free(self) -> int:
+        return self._values.get('SwapFree')
+
+
+class CpuInfo(LineParser):
+    '''The content of /proc/cpuinfo.
+
+    processors holds the fields of every processor block, fields the ones
+    outside of them, e.g. Hardware on ARM.
+    '''
+
+    __slots__ = ('processors', 'fields', '_block')
+
+    def __init__(self) -> None:
+        self.processors: List[Dict[str, str]] = []
+        self.fields: Dict[str, str] = {}
+        self._block = None
+
+    def __repr__(self):
+        return '<{0.__module__}.{0.__name__} (count={1}, hardware="{2}")>'.format(type(self), self.count, self.hardware)
+
+    def feed(self, line: str) -> None:
+        match = _CPUINFO_LINE.match(line)
+        if not match:
+            # A blank line closes the current processor block.
+            self._block = None
+            return
+        key, value = match.groups()
+        if key == 'processor' and value.isdigit():
+            self._block = {key: value}
+            self.processors.append(self._block)
+        elif self._block is not None:
+            self._block[key] = value
+        else:
+            self.fields[key] = value
+
+    @property
+    def count(self) -> int:
+        '''The number of processors.'''
+        return len(self.processors)
+
+    @property
+    def hardware(self) -> str:
+        return self.fields.get('Hardware', '')
+
+    @property
+    def model_name(self) -> str:
+        for key in ('model name', 'Processor', 'CPU part'):
+            for block in self.processors + [self.fields]:
+                if key in block:
+                    return block[key]
+        return ''
+
+    @property
+    def features(self) -> List[str]:
+        for key in ('Features', 'flags'):
+            for block in self.processors + [self.fields]:
+                if key in block:
+                    return block[key].split()
+        return []
+
+
+class FocusState(LineParser):
+    '''The focused window and app, from dumpsys window or dumpsys activity.'''
+
+    __slots__ = ('window', 'activity')
+
+    def __init__(self) -> None:
+        self.window = ''
+        self.activity = ''
+
+    def __repr__(self):
+        return '<{0.__module__}.{0.__name__} (window="{1}", activity="{2}")>'.format(type(self), self.window, self.activity)
+
+    def feed(self, line: str) -> None:
+        if not self.window:
+            match = _FOCUS_WINDOW.search(line)
+            if match:
+                self.window = match.group(1)
+                return
+        if not self.activity:
+            match = _FOCUS_APP.search(line)
+            if match:
+                self.activity = match.group(1)
+
+    @property
+    def package(self) -> str:
+        '''The package of the focused activity, or of the focused window.'''
+        return (self.activity or self.window).split('/')[0]
@@ -0,0 +1,127 @@
+# Licensed to the White Turing under one or more
+# contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The SFC licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+'''The DevicePool implementation.'''
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, NamedTuple
+
+from .androiddriver import AndroidDriver
+from .service import _PATH, Service
+
+
+class PoolResult(NamedTuple):
+    '''The outcome of a pool call on one device.'''
+
+    value: Any = None
+    error: Exception = None
+
+    @property
+    def ok(self) -> bool:
+        '''Whether the call returned without raising.'''
+        return self.error is None
+
+
+class DevicePool(object):
+    '''Holds one driver per connected device and fans work out to all of them.
+
+    Usage:
+        with DevicePool(max_workers=8) as pool:
+            levels = pool.map(lambda d: d.get_battery_info()['level'])
+            pool.install('test/yyb.apk', skip_identical=True)
+    '''
+
+    _driver_cls = AndroidDriver
+
+    def __init__(self, devices: Iterable[str] = None, max_workers: int = 8, executable_path: _PATH = 'default', service_port: str or int = 5037, env: dict = None, **options: Any) -> None:
+        '''Creates a new instance of the device pool.
+
+        Args:
+            devices: Serial numbers to drive. The default drives every attached device.
+            max_workers: The maximum number of devices driven at the same time.
+            executable_path: Path to the executable. The default uses its own executable.
+            service_port: Port the service is running on.
+            env: Environment variables.
+            options: More keyword arguments for every driver.
+        '''
+
+        if devices is None:
+            service = Service(executable_path, port=service_port, env=env)
+            service.start()
+            devices = service.devices()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.drivers = {}
+        self.errors = {}
+        results = self._run(list(devices), lambda serial: self._driver_cls(
+            executable_path=executable_path, device_sn=serial, service_port=service_port, env=env, **options))
+        for serial, result in results.items():
+            if result.ok:
+                self.drivers[serial] = result.value
+            else:
+                self.errors[serial] = result.error
+
+    def __enter__(self) -> 'DevicePool':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.drivers)
+
+    def __iter__(self) -> Iterator[AndroidDriver]:
+        return iter(self.drivers.values())
+
+    def __getitem__(self, serial: str) -> AndroidDriver:
+        return self.drivers[serial]
+
+    def __getattr__(self, name: str) -> Callable[..., Dict[str, PoolResult]]:
+        '''Unknown attributes broadcast the driver method of the same name, e.g. pool.install(apk).'''
+        if name.startswith('_') or not callable(getattr(self._driver_cls, name, None)):
+            raise AttributeError(
+                f'{type(self).__name__!r} object has no attribute {name!r}')
+        return lambda *args, **kwargs: self.broadcast(name, *args, **kwargs)
+
+    def __repr__(self):
+        return '<{0.__module__}.{0.__name__} (devices="{1}")>'.format(type(self), ' | '.join(self.drivers))
+
+    def _run(self, serials: list, func: Callable[[str], Any]) -> Dict[str, PoolResult]:
+        '''Call func for every serial on the thread pool and collect the results.'''
+        def call(serial):
+            try:
+                return PoolResult(func(serial))
+            except Exception as e:
+                return PoolResult(error=e)
+        return dict(zip(serials, self._executor.map(call, serials)))
+
+    def map(self, func: Callable[[AndroidDriver], Any]) -> Dict[str, PoolResult]:
+        '''Call func with every driver in parallel.
+
+        Returns:
+            A dict of serial number to PoolResult.
+        '''
+        return self._run(list(self.drivers), lambda serial: func(self.drivers[serial]))
+
+    def broadcast(self, method: str, *args: Any, **kwargs: Any) -> Dict[str, PoolResult]:
+        '''Call a driver method on every device in parallel.'''
+        return self.map(lambda driver: getattr(driver, method)(*args, **kwargs))
+
+    def close(self) -> None:
+        '''Close the shell sessions and stop the workers.'''
+        for driver in self.drivers.values():
+            driver.close_shell_session()
+        self._executor.shutdown()
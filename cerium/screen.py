@@ -0,0 +1,273 @@
+# Licensed to the White Turing under one or more
+# contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The SFC licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+'''Raw screen capture into numpy arrays.'''
+
+import math
+import struct
+import threading
+import time
+from typing import BinaryIO, Callable, ContextManager, NamedTuple, Tuple
+
+from .exceptions import AndroidDriverException
+
+# Bytes per pixel of the android.graphics.PixelFormat values screencap emits.
+PIXEL_FORMATS = {1: 4, 2: 4, 3: 3, 4: 2, 5: 4}
+
+_HEADER = struct.Struct('<III')
+
+
+def _numpy():
+    '''Import numpy, which is only needed for screen capture.'''
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError(
+            'Screen capture needs numpy, please run: pip install cerium[image]') from None
+    return numpy
+
+
+class FrameHeader(NamedTuple):
+    '''The header screencap writes in front of the raw pixels.'''
+
+    width: int
+    height: int
+    format: int
+    size: int = 16
+
+    @property
+    def channels(self) -> int:
+        '''Bytes per pixel.'''
+        return PIXEL_FORMATS[self.format]
+
+    @property
+    def row_bytes(self) -> int:
+        return self.width * self.channels
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return self.height, self.width, self.channels
+
+
+def readinto_exactly(stream: BinaryIO, buffer) -> int:
+    '''Fill buffer from stream, returns the number of bytes read before the end of the stream.'''
+    view = memoryview(buffer).cast('B')
+    count = 0
+    while count < len(view):
+        size = stream.readinto(view[count:])
+        if not size:
+            break
+        count += size
+    return count
+
+
+def read_frame(stream: BinaryIO, head: bytes = None) -> tuple:
+    '''Read the raw output of screencap straight into a numpy array.
+
+    Args:
+        stream: The output of screencap.
+        head: The bytes of it already read, at least the width, height and format.
+
+    Returns:
+        The FrameHeader and a (height, width, channels) uint8 array
+        backed by the receive buffer itself.
+    '''
+    numpy = _numpy()
+    if head is None:
+        head = bytearray(_HEADER.size)
+        if readinto_exactly(stream, head) < len(head):
+            raise AndroidDriverException('Failed to capture the screen.')
+    width, height, format_ = _HEADER.unpack_from(head)
+    if format_ not in PIXEL_FORMATS:
+        raise AndroidDriverException(f'Unsupported pixel format {format_}.')
+    size = width * height * PIXEL_FORMATS[format_]
+    # Android 9 and higher add the color space to the header.
+    buffer = bytearray(size + 4)
+    rest = head[_HEADER.size:]
+    buffer[:len(rest)] = rest
+    count = len(rest) + readinto_exactly(stream, memoryview(buffer)[len(rest):])
+    if count not in (size, size + 4):
+        raise AndroidDriverException(
+            f'Truncated screen capture: {count} of {size} bytes.')
+    header = FrameHeader(width, height, format_, _HEADER.size + count - size)
+    return header, numpy.frombuffer(buffer, numpy.uint8, size, count - size).reshape(header.shape)
+
+
+def header_matches(stream: BinaryIO, header: FrameHeader) -> bool:
+    '''Read a screencap header from stream and check it describes the same frame layout.'''
+    head = bytearray(header.size)
+    if readinto_exactly(stream, head) < header.size:
+        raise AndroidDriverException('Failed to capture the screen.')
+    return _HEADER.unpack_from(head) == header[:3]
+
+
+def read_rows(stream: BinaryIO, header: FrameHeader, rows: int):
+    '''Read rows of headerless pixels, as cut out on the device, into a numpy array.'''
+    numpy = _numpy()
+    frame = numpy.empty((rows, header.width, header.channels), numpy.uint8)
+    count = readinto_exactly(stream, frame)
+    if count != frame.nbytes:
+        raise AndroidDriverException(
+            f'Truncated screen capture: {count} of {frame.nbytes} bytes.')
+    return frame
+
+
+def read_frame_into(stream: BinaryIO, header: FrameHeader, out) -> bytes:
+    '''Read the raw output of screencap into a preallocated array.
+
+    Returns:
+        None once out is filled, or the header bytes read if the frame does
+        not match header, e.g. after a rotation, to be passed on to read_frame.
+    '''
+    head = bytearray(header.size)
+    if readinto_exactly(stream, head) < header.size:
+        raise AndroidDriverException('Failed to capture the screen.')
+    if _HEADER.unpack_from(head) != header[:3]:
+        return head
+    count = readinto_exactly(stream, out)
+    if count != out.nbytes:
+        raise AndroidDriverException(
+            f'Truncated screen capture: {count} of {out.nbytes} bytes.')
+    return None
+
+
+class CaptureStats(NamedTuple):
+    '''Counters of a FrameRing.'''
+
+    captured: int
+    dropped: int
+    fps: float
+
+
+class FrameRing(object):
+    '''Captures frames in the background into a fixed ring of preallocated arrays.
+
+    Frames are handed out as views into the ring, without allocation, and stay
+    valid until the ring wraps around to their slot again. A tick is counted as
+    dropped when a capture overruns the next one.
+
+    Usage:
+        with driver.start_capture(fps=10, size=16) as ring:
+            timestamp, frame = ring.latest()
+    '''
+
+    def __init__(self, capture: Callable[[], ContextManager[BinaryIO]], size: int = 8, fps: float = 10.0) -> None:
+        '''Creates a new instance of the FrameRing.
+
+        Args:
+            capture: Opens the raw output of one screencap.
+            size: The number of frames kept.
+            fps: The target frame rate.
+        '''
+
+        self.size = size
+        self.fps = fps
+        self.error = None
+        self._capture = capture
+        self._header = None
+        self._frames = None
+        self._timestamps = [math.nan] * size
+        self._captured = 0
+        self._dropped = 0
+        self._started_at = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self) -> 'FrameRing':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def __repr__(self):
+        return '<{0.__module__}.{0.__name__} (size={1}, fps={2})>'.format(type(self), self.size, self.fps)
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    @property
+    def stats(self) -> CaptureStats:
+        '''Frames captured and ticks dropped so far, and the achieved frame rate.'''
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        return CaptureStats(self._captured, self._dropped, self._captured / elapsed if elapsed else 0.0)
+
+    def start(self) -> 'FrameRing':
+        '''Start capturing.'''
+        self._started_at = time.monotonic()
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        '''Stop capturing, the frames already captured stay available.'''
+        self._stop.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _read(self, stream: BinaryIO, slot: int) -> None:
+        '''Capture one frame into slot, allocating the ring on the first frame.'''
+        head = None
+        if self._header is not None:
+            head = read_frame_into(stream, self._header, self._frames[slot])
+            if head is None:
+                return
+        header, frame = read_frame(stream, head)
+        numpy = _numpy()
+        with self._lock:
+            self._header = header
+            self._frames = numpy.empty((self.size,) + header.shape, numpy.uint8)
+            self._timestamps = [math.nan] * self.size
+        self._frames[slot] = frame
+
+    def _run(self) -> None:
+        interval = 1 / self.fps
+        tick = time.monotonic()
+        while not self._stop.wait(max(tick - time.monotonic(), 0)):
+            slot = self._captured % self.size
+            timestamp = time.time()
+            self._timestamps[slot] = math.nan
+            try:
+                with self._capture() as stream:
+                    self._read(stream, slot)
+            except Exception as e:
+                self.error = e
+                return
+            self._timestamps[slot] = timestamp
+            self._captured += 1
+            missed = int((time.monotonic() - tick) / interval)
+            self._dropped += missed
+            tick += (missed + 1) * interval
+
+    def latest(self) -> tuple:
+        '''The newest frame as (timestamp, array), or None before the first one.'''
+        with self._lock:
+            if not self._captured:
+                return None
+            slot = (self._captured - 1) % self.size
+            return self._timestamps[slot], self._frames[slot]
+
+    def frame_at(self, timestamp: float) -> tuple:
+        '''The newest frame captured at or before timestamp (time.time()), or None if it was overwritten.'''
+        with self._lock:
+            best = None
+            for slot, captured_at in enumerate(self._timestamps):
+                if captured_at <= timestamp and (best is None or captured_at > self._timestamps[best]):
+                    best = slot
+            if best is None:
+                return None
+            return self._timestamps[best], self._frames[best]
@@ -25,6 +25,8 @@ from .utils import free_port, is_connectable, merge_dict
 class BaseService(Commands):
     '''Object that manages the starting and stopping of the AndroidDriver.'''
 
+    device_sn = None
+
     def __init__(self, executable: _PATH = 'default', port: Union[int, str] = 5037, env: Dict = None) -> None:
         super(BaseService, self).__init__(executable)
         self.port = port
@@ -101,7 +103,7 @@ class BaseService(Commands):
 
     def get_state(self) -> str:
         '''offline | bootloader | device'''
-        output, error = self._execute('get-state')
+        output, error = self._execute(*(('-s', self.device_sn) if self.device_sn else ()), 'get-state')
         if error:
             raise DeviceConnectionException(error.split(':', 1)[-1].strip())
         return output.strip()
@@ -0,0 +1,135 @@
+# Licensed to the White Turing under one or more
+# contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The SFC licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""The ShellSession implementation."""
+
+import re
+import threading
+import uuid
+from typing import Tuple
+
+from .adb import (SHELL_STDERR, SHELL_STDIN, SHELL_STDOUT, AdbClient,
+                  read_shell_packet, write_shell_packet)
+from .exceptions import AdbProtocolException
+
+
+def quote(command: str) -> str:
+    '''Quote a string for the device shell.'''
+    return "'" + command.replace("'", "'\\''") + "'"
+
+
+class ShellSession(object):
+    '''A long-lived shell on the device that runs commands one after another.
+
+    Every command is followed by a sentinel line carrying its exit code, so
+    the output of consecutive commands can be split on a single open channel.
+    Devices without shell protocol v2 merge stderr into stdout.
+    '''
+
+    def __init__(self, client: AdbClient, serial: str) -> None:
+        self._client = client
+        self._serial = serial
+        self._conn = None
+        self._v2 = False
+        self._marker = f'__cerium_{uuid.uuid4().hex}__'.encode('ascii')
+        self._status = re.compile(b'\n' + self._marker + b':(\\d+)\n')
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> 'ShellSession':
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __repr__(self):
+        return '<{0.__module__}.{0.__name__} (device="{1}", alive={2})>'.format(type(self), self._serial, self.alive)
+
+    @property
+    def alive(self) -> bool:
+        '''Whether the channel is open.'''
+        return self._conn is not None
+
+    def open(self) -> None:
+        '''Open the shell channel if it is not open yet.'''
+        if self._conn:
+            return
+        self._v2 = self._client.supports_shell_v2(self._serial)
+        service = 'shell,v2,raw:' if self._v2 else 'exec:sh'
+        self._conn = self._client.open_service(self._serial, service)
+
+    def close(self) -> None:
+        '''Close the shell channel.'''
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+
+    def run(self, command: str) -> Tuple[bytes, bytes, int]:
+        '''Run a command on the open channel.
+
+        Returns:
+            A tuple of (stdout, stderr, exit_code).
+        '''
+        with self._lock:
+            self.open()
+            try:
+                self._write(self._script(command))
+                return self._read()
+            except BaseException:
+                # The channel is out of step with its sentinels now.
+                self.close()
+                raise
+
+    def _script(self, command: str) -> bytes:
+        marker = self._marker.decode('ascii')
+        script = f"eval {quote(command)} </dev/null; printf '\\n%s:%d\\n' {marker} $?"
+        if self._v2:
+            script += f" ; printf '\\n%s\\n' {marker} >&2"
+        return script.encode('utf-8') + b'\n'
+
+    def _write(self, data: bytes) -> None:
+        if self._v2:
+            write_shell_packet(self._conn, SHELL_STDIN, data)
+        else:
+            self._conn.send(data)
+
+    def _read(self) -> Tuple[bytes, bytes, int]:
+        stdout, stderr = b'', b''
+        status = None
+        stderr_done = not self._v2
+        stderr_end = b'\n' + self._marker + b'\n'
+        while status is None or not stderr_done:
+            if self._v2:
+                packet_id, data = read_shell_packet(self._conn)
+                if packet_id not in (SHELL_STDOUT, SHELL_STDERR):
+                    raise AdbProtocolException('The device shell exited.')
+            else:
+                packet_id, data = SHELL_STDOUT, self._conn.socket.recv(65536)
+                if not data:
+                    raise AdbProtocolException('The device shell exited.')
+            if packet_id == SHELL_STDOUT:
+                stdout += data
+                match = self._status.search(stdout)
+                if match:
+                    status = int(match.group(1))
+                    stdout = stdout[:match.start()]
+            else:
+                stderr += data
+                if stderr.endswith(stderr_end):
+                    stderr_done = True
+                    stderr = stderr[:-len(stderr_end)]
+        return stdout, stderr, status
@@ -0,0 +1,430 @@
+# Licensed to the White Turing under one or more
+# contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The SFC licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""The adb file sync protocol.
+
+Files move as DATA packets over a ``sync:`` service connection, the same
+protocol the adb executable uses for push and pull.
+"""
+
+import hashlib
+import json
+import os
+import posixpath
+import re
+import stat
+import struct
+import time
+from typing import BinaryIO, Callable, Dict, List, NamedTuple, Union
+
+from .adb import AdbConnection
+from .exceptions import AdbProtocolException, FileTransferException
+from .shell import quote
+
+# The largest DATA packet adbd accepts.
+CHUNK_SIZE = 64 * 1024
+
+_MESSAGE = struct.Struct('<4sI')
+_STAT = struct.Struct('<4sIII')
+_DENT = struct.Struct('<4sIIII')
+
+# Called with (bytes transferred, total bytes or None) after every chunk.
+Progress = Callable[[int, int], None]
+_SOURCE = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+
+
+class SyncStat(NamedTuple):
+    '''Mode, size and modification time of a remote path, all 0 if it does not exist.'''
+
+    mode: int
+    size: int
+    mtime: int
+
+    @property
+    def exists(self) -> bool:
+        return self.mode != 0
+
+    @property
+    def is_dir(self) -> bool:
+        return stat.S_ISDIR(self.mode)
+
+
+class DirEntry(NamedTuple):
+    '''An entry of a remote directory.'''
+
+    name: str
+    mode: int
+    size: int
+    mtime: int
+
+
+class TransferStats(NamedTuple):
+    '''What a transfer moved and how long it took.'''
+
+    files: int
+    size: int
+    seconds: float
+
+    @property
+    def throughput(self) -> float:
+        '''Bytes per second.'''
+        return self.size / self.seconds if self.seconds else 0.0
+
+    def __add__(self, other: 'TransferStats') -> 'TransferStats':
+        return TransferStats(*(a + b for a, b in zip(self, other)))
+
+
+class SyncConnection(object):
+    '''A file sync session on one device.
+
+    Usage:
+        with SyncConnection(client.open_service('emulator-5554', 'sync:')) as sync:
+            sync.push('build/app.apk', '/data/local/tmp/app.apk', progress=print)
+    '''
+
+    def __init__(self, conn: AdbConnection) -> None:
+        '''Creates a new instance of the SyncConnection.
+
+        Args:
+            conn: A connection with the sync: service open.
+        '''
+
+        self._conn = conn
+
+    def __enter__(self) -> 'SyncConnection':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        '''End the session.'''
+        try:
+            self._conn.send(_MESSAGE.pack(b'QUIT', 0))
+        except OSError:
+            pass
+        self._conn.close()
+
+    def _write(self, data: bytes) -> bool:
+        '''Send data, returns False if the device stopped reading after a failure, whose reason follows.'''
+        try:
+            self._conn.send(data)
+        except OSError:
+            return False
+        return True
+
+    def _request(self, command: bytes, path: str) -> None:
+        path = path.encode('utf-8')
+        self._conn.send(_MESSAGE.pack(command, len(path)) + path)
+
+    def _read_message(self) -> tuple:
+        return _MESSAGE.unpack(self._conn.read_exactly(_MESSAGE.size))
+
+    def _fail(self, path: str, command: bytes, length: int) -> Exception:
+        if command != b'FAIL':
+            return AdbProtocolException(f'Unexpected sync reply {command!r}.')
+        message = self._conn.read_exactly(length).decode('utf-8', 'replace')
+        return FileTransferException(f'{path}: {message}')
+
+    def stat(self, path: str) -> SyncStat:
+        '''Mode, size and modification time of a remote path.'''
+        self._request(b'STAT', path)
+        command, mode, size, mtime = _STAT.unpack(self._conn.read_exactly(_STAT.size))
+        if command != b'STAT':
+            raise AdbProtocolException(f'Unexpected sync reply {command!r}.')
+        return SyncStat(mode, size, mtime)
+
+    def listdir(self, path: str) -> List[DirEntry]:
+        '''Entries of a remote directory, without . and ..'''
+        self._request(b'LIST', path)
+        entries = []
+        while True:
+            command, mode, size, mtime, length = _DENT.unpack(self._conn.read_exactly(_DENT.size))
+            if command == b'DONE':
+                return entries
+            if command != b'DENT':
+                raise AdbProtocolException(f'Unexpected sync reply {command!r}.')
+            name = self._conn.read_exactly(length).decode('utf-8', 'replace')
+            if name not in ('.', '..'):
+                entries.append(DirEntry(name, mode, size, mtime))
+
+    def send(self, source: _SOURCE, remote: str, mode: int = 0o644, mtime: int = None, progress: Progress = None) -> TransferStats:
+        '''Write a local file, a bytes-like object or a binary file object to a remote file.
+
+        Missing remote directories are created.
+        '''
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as f:
+                return self.send(f, remote, mode, mtime, progress)
+        started = time.perf_counter()
+        total, done = source_size(source), 0
+        self._request(b'SEND', f'{remote},{mode}')
+        for chunk in iter_chunks(source):
+            if not self._write(_MESSAGE.pack(b'DATA', len(chunk)) + chunk):
+                break
+            done += len(chunk)
+            if progress:
+                progress(done, total)
+        else:
+            self._write(_MESSAGE.pack(b'DONE', int(time.time() if mtime is None else mtime)))
+        command, length = self._read_message()
+        if command != b'OKAY':
+            raise self._fail(remote, command, length)
+        return TransferStats(1, done, time.perf_counter() - started)
+
+    def recv(self, remote: str, target: Union[str, os.PathLike, BinaryIO], progress: Progress = None, total: int = None) -> TransferStats:
+        '''Read a remote file into a local file or a binary file object.'''
+        if isinstance(target, (str, os.PathLike)):
+            with open(target, 'wb') as f:
+                return self.recv(remote, f, progress, total)
+        started = time.perf_counter()
+        done = 0
+        self._request(b'RECV', remote)
+        while True:
+            command, length = self._read_message()
+            if command == b'DONE':
+                return TransferStats(1, done, time.perf_counter() - started)
+            if command != b'DATA':
+                raise self._fail(remote, command, length)
+            target.write(self._conn.read_exactly(length))
+            done += length
+            if progress:
+                progress(done, total)
+
+    def push(self, local: _SOURCE, remote: str, progress: Progress = None, newer_only: bool = False) -> TransferStats:
+        '''Copy a local file or directory, like adb push.
+
+        If remote is an existing directory, local is copied into it.
+
+        Args:
+            newer_only: Skip files whose remote copy has the same size and is not older, like adb push --sync.
+        '''
+        if not isinstance(local, (str, os.PathLike)):
+            return self.send(local, remote, progress=progress)
+        target = self.stat(remote)
+        if target.is_dir:
+            remote = posixpath.join(remote, os.path.basename(os.path.normpath(local)))
+        if not os.path.isdir(local):
+            files = [(local, remote, os.stat(local))]
+        else:
+            files = []
+            for root, _, names in os.walk(local):
+                for name in names:
+                    path = os.path.join(root, name)
+                    relative = os.path.relpath(path, local).replace(os.sep, '/')
+                    files.append((path, posixpath.join(remote, relative), os.stat(path)))
+        if newer_only:
+            files = [(path, target, info) for path, target, info in files
+                     if not _up_to_date(self.stat(target), info)]
+        return self.send_many(files, progress)
+
+    def send_many(self, files: list, progress: Progress = None) -> TransferStats:
+        '''Send (local, remote, os.stat_result) triples, reporting progress over all of them.'''
+        total, base = sum(info.st_size for _, _, info in files), 0
+        stats = TransferStats(0, 0, 0.0)
+        for path, remote, info in files:
+            report = progress and (lambda done, _, base=base: progress(base + done, total))
+            stats += self.send(path, remote, stat.S_IMODE(info.st_mode), int(info.st_mtime), report)
+            base += info.st_size
+        return stats
+
+    def pull(self, remote: str, local: Union[str, os.PathLike], progress: Progress = None, preserve: bool = False) -> TransferStats:
+        '''Copy a remote file or directory, like adb pull.
+
+        If local is an existing directory, remote is copied into it.
+
+        Args:
+            preserve: Keep the modification time and mode of the remote files.
+        '''
+        source = self.stat(remote)
+        if not source.exists:
+            raise FileNotFoundError(f'Remote {remote!r} does not exist.')
+        if os.path.isdir(local):
+            local = os.path.join(local, posixpath.basename(remote.rstrip('/')))
+        if not source.is_dir:
+            files = [(remote, local, source)]
+        else:
+            files = list(self._walk(remote, local))
+        total, base = sum(info.size for _, _, info in files), 0
+        stats = TransferStats(0, 0, 0.0)
+        for path, target, info in files:
+            os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+            report = progress and (lambda done, _, base=base: progress(base + done, total))
+            stats += self.recv(path, target, report, info.size)
+            if preserve:
+                os.utime(target, (info.mtime, info.mtime))
+                os.chmod(target, stat.S_IMODE(info.mode))
+            base += info.size
+        return stats
+
+    def _walk(self, remote: str, local: str):
+        '''(remote, local, DirEntry) of every file below a remote directory.'''
+        os.makedirs(local, exist_ok=True)
+        for entry in self.listdir(remote):
+            path, target = posixpath.join(remote, entry.name), os.path.join(local, entry.name)
+            if stat.S_ISDIR(entry.mode):
+                yield from self._walk(path, target)
+            elif stat.S_ISREG(entry.mode):
+                yield path, target, entry
+
+
+def _up_to_date(remote: SyncStat, local: os.stat_result) -> bool:
+    '''Whether the remote copy of a file has the same size and is not older.'''
+    return remote.exists and remote.size == local.st_size and remote.mtime >= int(local.st_mtime)
+
+
+def source_size(source) -> int:
+    '''The number of bytes source will produce, or None if it cannot tell.'''
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return memoryview(source).nbytes
+    try:
+        return os.fstat(source.fileno()).st_size - source.tell()
+    except (AttributeError, OSError, ValueError):
+        pass
+    try:
+        if not source.seekable():
+            return None
+        position = source.tell()
+        size = source.seek(0, os.SEEK_END) - position
+        source.seek(position)
+        return size
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def iter_chunks(source):
+    '''Fixed-size chunks of a bytes-like object or a binary file object.'''
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source).cast('B')
+        for offset in range(0, len(view), CHUNK_SIZE):
+            yield view[offset:offset + CHUNK_SIZE]
+        return
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    read = getattr(source, 'readinto', None)
+    while True:
+        if read:
+            size = read(buffer)
+        else:
+            data = source.read(CHUNK_SIZE)
+            size = len(data)
+            buffer[:size] = data
+        if not size:
+            return
+        yield view[:size]
+
+
+class LocalFile(NamedTuple):
+    '''A file below the local directory of sync_dir.'''
+
+    path: str
+    size: int
+    mtime_ns: int
+    md5: str
+
+
+class SyncResult(NamedTuple):
+    '''The outcome of sync_dir, paths are relative to the synced directories.'''
+
+    sent: List[str]
+    deleted: List[str]
+    unchanged: int
+    stats: TransferStats
+
+
+def md5_file(path: str) -> str:
+    '''The md5 hex digest of a local file.'''
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def remote_stat_command(remote: str) -> str:
+    '''Shell command listing "size mtime ./path" of every file below remote.'''
+    return f"cd {quote(remote)} 2>/dev/null && find . -type f -exec stat -c '%s %Y %n' {{}} +"
+
+
+def parse_remote_stat(output: str) -> Dict[str, tuple]:
+    '''(size, mtime) by relative path, from the output of remote_stat_command.'''
+    files = {}
+    for line in output.splitlines():
+        parts = line.split(' ', 2)
+        if len(parts) == 3 and parts[2].startswith('./'):
+            files[parts[2][2:]] = (int(parts[0]), int(parts[1]))
+    return files
+
+
+def remote_batch_command(remote: str, program: str, names: List[str]) -> str:
+    '''Shell command running program once over many paths relative to remote.'''
+    return f"cd {quote(remote)} && {program} -- {' '.join(quote(name) for name in names)}"
+
+
+class Manifest(object):
+    '''What sync_dir last left in one remote directory of one device.
+
+    For every relative path it records the md5 and local size and mtime of the
+    file, so unchanged local files are not hashed again, and the size and mtime
+    the device reported, so files changed on the device are noticed.
+    '''
+
+    def __init__(self, path: str) -> None:
+        '''Creates a new instance of the Manifest, loading path if it exists.'''
+
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def __repr__(self):
+        return '<{0.__module__}.{0.__name__} (path="{1}", files={2})>'.format(type(self), self.path, len(self.entries))
+
+    @staticmethod
+    def default_path(serial: str, remote: str) -> str:
+        '''~/.cerium/manifests/<serial>/<md5 of remote>.json'''
+        return os.path.join(os.path.expanduser('~'), '.cerium', 'manifests', re.sub(r'[^\w.-]', '_', serial),
+                            hashlib.md5(remote.rstrip('/').encode('utf-8')).hexdigest() + '.json')
+
+    def scan(self, local: str) -> Dict[str, LocalFile]:
+        '''Every file below local by relative path, hashing only those changed since the last sync.'''
+        files = {}
+        for root, _, names in os.walk(local):
+            for name in names:
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, local).replace(os.sep, '/')
+                info = os.stat(path)
+                known = self.entries.get(relative)
+                if known and (known['size'], known['mtime_ns']) == (info.st_size, info.st_mtime_ns):
+                    md5 = known['md5']
+                else:
+                    md5 = md5_file(path)
+                files[relative] = LocalFile(path, info.st_size, info.st_mtime_ns, md5)
+        return files
+
+    def record(self, relative: str, local: LocalFile, remote: tuple) -> None:
+        '''Remember that local is on the device, which reports remote as (size, mtime).'''
+        self.entries[relative] = {'md5': local.md5, 'size': local.size,
+                                  'mtime_ns': local.mtime_ns, 'remote': list(remote)}
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f)
+        os.replace(temporary, self.path)
@@ -0,0 +1,206 @@
+# Licensed to the White Turing under one or more
+# contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The SFC licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+'''Explicit waits and the built-in conditions.'''
+
+import os
+import time
+from typing import Any, Callable
+
+from .by import By
+from .exceptions import (AndroidDriverException, NoSuchElementException,
+                         TimeoutException)
+from .image import load_template
+from .locator import Locator
+
+
+class Condition(object):
+    '''Base of the built-in conditions.
+
+    A condition is called with the driver and returns a truthy value once it is met.
+    Conditions with layout set are evaluated against a fresh interface layout,
+    which the wait dumps once per poll for all the conditions waiting on it and
+    passes on as the hierarchy argument.
+    '''
+
+    layout = True
+
+    def __call__(self, driver, hierarchy=None) -> Any:
+        raise NotImplementedError
+
+    def __repr__(self):
+        return '<{0.__module__}.{0.__name__}>'.format(type(self))
+
+
+class ElementPresent(Condition):
+    '''The element is in the interface layout, returns the first match.'''
+
+    def __init__(self, value, by: str = By.ID) -> None:
+        if isinstance(value, Locator):
+            by, value = By.XPATH, value.xpath
+        self.by = by
+        self.value = value
+
+    def __repr__(self):
+        return '<{0.__module__}.{0.__name__} ({1}={2!r})>'.format(type(self), self.by, self.value)
+
+    def _hierarchy(self, driver, hierarchy):
+        return driver._current_hierarchy() if hierarchy is None else hierarchy
+
+    def __call__(self, driver, hierarchy=None) -> Any:
+        hierarchy = self._hierarchy(driver, hierarchy)
+        for i in hierarchy.find(self.by, self.value):
+            return driver._element_cls(driver, hierarchy, i, self.by, self.value)
+        return False
+
+
+class ElementVisible(ElementPresent):
+    '''The element is in the interface layout and takes up some screen area.'''
+
+    def __call__(self, driver, hierarchy=None) -> Any:
+        hierarchy = self._hierarchy(driver, hierarchy)
+        for i in hierarchy.find(self.by, self.value):
+            left, top, right, bottom = hierarchy.coord(i)
+            if right > left and bottom > top:
+                return driver._element_cls(driver, hierarchy, i, self.by, self.value)
+        return False
+
+
+class ElementGone(ElementPresent):
+    '''The element is no longer in the interface layout.'''
+
+    def __call__(self, driver, hierarchy=None) -> bool:
+        return not self._hierarchy(driver, hierarchy).find(self.by, self.value)
+
+
+class ActivityFocused(Condition):
+    '''The focused window belongs to activity, e.g. 'com.example/.MainActivity' or 'com.example'.'''
+
+    layout = False
+
+    def __init__(self, activity: str) -> None:
+        self.activity = activity
+
+    def __repr__(self):
+        return '<{0.__module__}.{0.__name__} ({1!r})>'.format(type(self), self.activity)
+
+    def __call__(self, driver) -> Any:
+        window = driver.view_focused_window()
+        return window if window == self.activity or window.startswith(self.activity + '/') else False
+
+
+class ImagePresent(Condition):
+    '''The template is on the screen, returns the element, see find_element_by_image.'''
+
+    layout = False
+
+    def __init__(self, template, threshold: float = 0.9, scales: tuple = (1.0,), region: tuple = None) -> None:
+        if isinstance(template, (str, os.PathLike)):
+            template = load_template(template)
+        self.template = template
+        self.threshold = threshold
+        self.scales = scales
+        self.region = region
+
+    def __repr__(self):
+        return '<{0.__module__}.{0.__name__} (threshold={1})>'.format(type(self), self.threshold)
+
+    def __call__(self, driver) -> Any:
+        return driver.find_element_by_image(self.template, self.threshold, self.scales, self.region)
+
+
+class DriverWait(object):
+    '''Polls a condition until it is met or the timeout expires.
+
+    The interval starts at poll and grows by backoff up to max_poll while the
+    screen stays the same, then drops back to poll as soon as it changes.
+
+    Usage:
+        element = DriverWait(driver, timeout=10).until(ElementVisible('com.example:id/login'))
+        DriverWait(driver).until(ActivityFocused('com.example/.MainActivity'))
+    '''
+
+    def __init__(self, driver, timeout: float = 10.0, poll: float = 0.2, max_poll: float = 2.0, backoff: float = 1.5, ignored_exceptions: tuple = (NoSuchElementException,)) -> None:
+        '''Creates a new instance of the DriverWait.
+
+        Args:
+            driver: The AndroidDriver to poll.
+            timeout: Seconds to wait before raising TimeoutException.
+            poll: Seconds between the first polls.
+            max_poll: The longest interval between two polls.
+            backoff: Factor the interval grows by after every unchanged poll.
+            ignored_exceptions: Exceptions raised by the condition that count as not met.
+        '''
+
+        self.driver = driver
+        self.timeout = timeout
+        self.poll = poll
+        self.max_poll = max_poll
+        self.backoff = backoff
+        self.ignored_exceptions = ignored_exceptions
+
+    def __repr__(self):
+        return '<{0.__module__}.{0.__name__} (timeout={1})>'.format(type(self), self.timeout)
+
+    def _layout(self) -> str:
+        '''The digest of the interface layout last seen by the driver.'''
+        hierarchy = self.driver._hierarchy
+        return hierarchy.digest if hierarchy is not None else None
+
+    def _evaluate(self, condition: Callable) -> Any:
+        '''Refresh what the condition looks at, then call it.'''
+        try:
+            if not getattr(condition, 'layout', False):
+                return condition(self.driver)
+            # One snapshot for the whole evaluation, a concurrent refresh may replace the driver's.
+            hierarchy = self.driver._refresh_hierarchy(max_age=self.poll)
+            while True:
+                try:
+                    return condition(self.driver, hierarchy)
+                except AndroidDriverException:
+                    # A newer dump released the snapshot before XPath could read it.
+                    if hierarchy.source is not None or hierarchy is self.driver._hierarchy:
+                        raise
+                    hierarchy = self.driver._hierarchy
+        except self.ignored_exceptions:
+            return False
+
+    def until(self, condition: Callable, message: str = '') -> Any:
+        '''Wait until condition returns a truthy value, and return it.'''
+        return self._wait(condition, message, bool)
+
+    def until_not(self, condition: Callable, message: str = '') -> bool:
+        '''Wait until condition returns a falsy value.'''
+        return not self._wait(condition, message, lambda value: not value)
+
+    def _wait(self, condition: Callable, message: str, done: Callable[[Any], bool]) -> Any:
+        deadline = time.monotonic() + self.timeout
+        interval = self.poll
+        layout = self._layout()
+        while True:
+            value = self._evaluate(condition)
+            if done(value):
+                return value
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutException(
+                    message or f'Timed out after {self.timeout}s waiting for {condition!r}.')
+            if self._layout() != layout:
+                layout, interval = self._layout(), self.poll
+            else:
+                interval = min(interval * self.backoff, self.max_poll)
+            time.sleep(min(interval, remaining))
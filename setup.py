@@ -76,5 +76,6 @@ setup(
     include_package_data=True,
     python_requires='>=3.6.0',
     install_requires=requires,
+    extras_require={'image': ['numpy>=1.17']},
     platforms=["Windows"],
 )
@@ -0,0 +1,245 @@
+'''A local fake adb server speaking the smart-socket protocol, for offline tests.'''
+
+import re
+import socket
+import socketserver
+import struct
+import threading
+
+
+_SCRIPT = re.compile(r"eval '(.*)' </dev/null; printf '\\n%s:%d\\n' (\S+) \$\?( ; printf '\\n%s\\n' \S+ >&2)?\n$", re.S)
+
+
+def make_driver(port, serial='emulator-5554'):
+    '''An AndroidDriver talking to a fake server, without starting the adb executable.'''
+    from cerium import AndroidDriver
+    from cerium.adb import AdbClient
+    from cerium.cache import PackageIndex, PropertyCache
+
+    driver = AndroidDriver.__new__(AndroidDriver)
+    driver._dev = False
+    driver._client = AdbClient(port=port, timeout=5)
+    driver._uidump_remote = '/data/local/tmp/uidump.xml'
+    driver.device_sn = serial
+    driver.properties = PropertyCache(driver._load_properties)
+    driver.packages = PackageIndex(driver._load_packages)
+    driver._flight_lock = threading.Lock()
+    return driver
+
+
+class FakeAdbServer(object):
+    '''Serves canned replies for host services and device shell commands.
+
+    Shell commands are looked up in ``commands``, which maps the command
+    string to a tuple of (stdout, stderr, exit_code).
+    '''
+
+    def __init__(self, serial='emulator-5554', features='shell_v2,cmd', serials=None):
+        self.serial = serial
+        # Every attached device, all answering like serial.
+        self.serials = serials or [serial]
+        self.features = features
+        self.commands = {}
+        self.requests = []
+        # Remote files for the sync service, path -> (mode, data, mtime).
+        self.files = {}
+        # APKs streamed into pm install -S.
+        self.installed = []
+        # Commands accepted by the device whose connection then drops.
+        self.dropped = set()
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                server.handle(self.request)
+
+        self._server = socketserver.ThreadingTCPServer(('localhost', 0), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @staticmethod
+    def recv_exactly(sock, size):
+        data = b''
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise EOFError
+            data += chunk
+        return data
+
+    @staticmethod
+    def okay(sock, reply=None):
+        if reply is None:
+            sock.sendall(b'OKAY')
+        else:
+            reply = reply.encode()
+            sock.sendall(b'OKAY%04x' % len(reply) + reply)
+
+    @staticmethod
+    def fail(sock, message):
+        message = message.encode()
+        sock.sendall(b'FAIL%04x' % len(message) + message)
+
+    def lookup(self, command):
+        reply = self.commands.get(command)
+        if reply is None:
+            return b'', b'/system/bin/sh: %s: not found\n' % command.encode(), 127
+        return reply
+
+    def handle(self, sock):
+        try:
+            while True:
+                size = int(self.recv_exactly(sock, 4), 16)
+                request = self.recv_exactly(sock, size).decode()
+                self.requests.append(request)
+                if not self.dispatch(sock, request):
+                    return
+        except EOFError:
+            return
+
+    def dispatch(self, sock, request):
+        '''Answer one request, returns whether the connection stays open.'''
+        serial = None
+        if request.startswith('host-serial:'):
+            serial = request.split(':')[1]
+        elif request.startswith('host:transport:'):
+            serial = request[len('host:transport:'):]
+        if request == 'host:version':
+            self.okay(sock, '0029')
+        elif request == 'host:devices':
+            self.okay(sock, ''.join(f'{serial}\tdevice\n' for serial in self.serials))
+        elif request == 'host:get-state':
+            if len(self.serials) > 1:
+                self.fail(sock, 'more than one device/emulator')
+            else:
+                self.okay(sock, 'device')
+        elif serial in self.serials and request.endswith(':features'):
+            self.okay(sock, self.features)
+        elif serial in self.serials and request.endswith(':get-state'):
+            self.okay(sock, 'device')
+        elif serial in self.serials and request.startswith('host:transport:'):
+            self.okay(sock)
+            return True
+        elif request.split(':', 1)[-1] in self.dropped:
+            self.okay(sock)
+        elif request == 'shell,v2,raw:':
+            self.okay(sock)
+            self.interactive(sock, True)
+        elif request == 'exec:sh':
+            self.okay(sock)
+            self.interactive(sock, False)
+        elif request.startswith('shell,v2,raw:'):
+            self.okay(sock)
+            stdout, stderr, code = self.lookup(request[len('shell,v2,raw:'):])
+            for packet_id, data in ((1, stdout), (2, stderr)):
+                if data:
+                    sock.sendall(struct.pack('<BI', packet_id, len(data)) + data)
+            sock.sendall(struct.pack('<BIB', 3, 1, code))
+        elif request.startswith('shell:'):
+            self.okay(sock)
+            stdout, stderr, _ = self.lookup(request[len('shell:'):])
+            sock.sendall(stdout + stderr)
+        elif request == 'sync:':
+            self.okay(sock)
+            self.sync(sock)
+        elif request.startswith('exec:pm install ') and ' -S ' in request:
+            self.okay(sock)
+            size = int(request.rsplit(' -S ', 1)[1])
+            self.installed.append(self.recv_exactly(sock, size))
+            sock.sendall(b'Success\n')
+        elif request.startswith('exec:'):
+            self.okay(sock)
+            sock.sendall(self.lookup(request[len('exec:'):])[0])
+        else:
+            self.fail(sock, f'unknown service {request}')
+        sock.shutdown(socket.SHUT_WR)
+        return False
+
+    def interactive(self, sock, v2):
+        '''Emulate a shell reading sentinel-framed scripts from stdin.'''
+        buffer = b''
+        while True:
+            if v2:
+                packet_id, size = struct.unpack('<BI', self.recv_exactly(sock, 5))
+                data = self.recv_exactly(sock, size)
+                if packet_id != 0:
+                    continue
+            else:
+                data = sock.recv(65536)
+                if not data:
+                    return
+            buffer += data
+            while b'\n' in buffer:
+                line, buffer = buffer.split(b'\n', 1)
+                match = _SCRIPT.match(line.decode() + '\n')
+                command = match.group(1).replace("'\\''", "'")
+                self.requests.append(command)
+                stdout, stderr, code = self.lookup(command)
+                marker = match.group(2).encode()
+                stdout += b'\n%s:%d\n' % (marker, code)
+                if not v2:
+                    sock.sendall(stderr + stdout)
+                    continue
+                stderr += b'\n%s\n' % marker
+                for packet_id, data in ((1, stdout), (2, stderr)):
+                    sock.sendall(struct.pack('<BI', packet_id, len(data)) + data)
+
+    def stat(self, path):
+        path = path.rstrip('/') or '/'
+        if path in self.files:
+            mode, data, mtime = self.files[path]
+            return mode, len(data), mtime
+        if any(name.startswith(path.rstrip('/') + '/') for name in self.files):
+            return 0o40755, 4096, 0
+        return 0, 0, 0
+
+    def sync(self, sock):
+        '''Emulate the file sync service over files.'''
+        while True:
+            command, size = struct.unpack('<4sI', self.recv_exactly(sock, 8))
+            if command == b'QUIT':
+                return
+            path = self.recv_exactly(sock, size).decode()
+            self.requests.append(f'{command.decode()} {path}')
+            if command == b'STAT':
+                sock.sendall(struct.pack('<4sIII', b'STAT', *self.stat(path)))
+            elif command == b'LIST':
+                prefix = path.rstrip('/') + '/'
+                names = {name[len(prefix):].split('/')[0] for name in self.files if name.startswith(prefix)}
+                for name in sorted(names):
+                    mode, size, mtime = self.stat(prefix + name)
+                    sock.sendall(struct.pack('<4sIIII', b'DENT', mode, size, mtime, len(name)) + name.encode())
+                sock.sendall(struct.pack('<4sIIII', b'DONE', 0, 0, 0, 0))
+            elif command == b'RECV':
+                if path not in self.files:
+                    message = b'No such file or directory'
+                    sock.sendall(struct.pack('<4sI', b'FAIL', len(message)) + message)
+                    continue
+                data = self.files[path][1]
+                for offset in range(0, len(data), 65536):
+                    chunk = data[offset:offset + 65536]
+                    sock.sendall(struct.pack('<4sI', b'DATA', len(chunk)) + chunk)
+                sock.sendall(struct.pack('<4sI', b'DONE', 0))
+            elif command == b'SEND':
+                name, mode = path.rsplit(',', 1)
+                data = b''
+                while True:
+                    command, size = struct.unpack('<4sI', self.recv_exactly(sock, 8))
+                    if command == b'DONE':
+                        break
+                    data += self.recv_exactly(sock, size)
+                if name.startswith('/system/'):
+                    message = b'Read-only file system'
+                    sock.sendall(struct.pack('<4sI', b'FAIL', len(message)) + message)
+                else:
+                    self.files[name] = (0o100000 | int(mode), data, size)
+                    sock.sendall(struct.pack('<4sI', b'OKAY', 0))
@@ -0,0 +1,116 @@
+import unittest
+
+from cerium import AdbProtocolException, ServiceUnavailableException
+from cerium.adb import AdbClient
+from cerium.shell import ShellSession
+
+from fakeadb import FakeAdbServer, make_driver
+
+
+class _Finished(object):
+    args = ()
+
+    def communicate(self):
+        return '', ''
+
+
+class TestAdbClient(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeAdbServer().__enter__()
+        self.client = AdbClient(port=self.server.port, timeout=5)
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+
+    def test_host_services(self):
+        self.assertEqual(self.client.version(), 41)
+        self.assertEqual(self.client.devices(), ['emulator-5554'])
+        self.assertEqual(self.client.get_state('emulator-5554'), 'device')
+
+    def test_shell_v2(self):
+        self.server.commands['getprop ro.build.version.sdk'] = (b'29\n', b'', 0)
+        self.assertEqual(self.client.shell('emulator-5554', 'getprop ro.build.version.sdk'), (b'29\n', b'', 0))
+        self.assertIn('host:transport:emulator-5554', self.server.requests)
+        self.assertIn('shell,v2,raw:getprop ro.build.version.sdk', self.server.requests)
+
+    def test_shell_v1(self):
+        self.server.features = 'cmd'
+        self.server.commands['am start -n foo'] = (b'Starting\n', b'Error: bad\n', 1)
+        self.assertEqual(self.client.shell('emulator-5554', 'am start -n foo'), (b'Starting\nError: bad\n', b'', None))
+
+    def test_exec_out(self):
+        self.server.commands['screencap -p'] = (b'\x89PNG\r\n\x1a\n', b'', 0)
+        self.assertEqual(self.client.exec_out('emulator-5554', 'screencap -p'), b'\x89PNG\r\n\x1a\n')
+
+    def test_fail(self):
+        with self.assertRaises(AdbProtocolException):
+            self.client.host_command('host:unknown')
+        with self.assertRaises(ServiceUnavailableException):
+            self.client.exec_out('emulator-5555', 'true')
+
+    def test_fallback(self):
+        driver = make_driver(self.server.port)
+        spawned = []
+        driver.execute = lambda args, options: spawned.append(args)
+        self.server.dropped.add('input tap 1 2')
+        # The device already got the tap, running it again would tap twice.
+        with self.assertRaises(AdbProtocolException):
+            driver._execute('-s', 'emulator-5554', 'shell', 'input tap 1 2')
+        self.assertEqual(spawned, [])
+        # Without a server nothing ran, the executable takes over.
+        self.server.__exit__(None, None, None)
+        driver.options = {}
+        driver.execute = lambda args, options: spawned.append(args) or _Finished()
+        driver._execute('-s', 'emulator-5554', 'shell', 'input tap 1 2')
+        self.assertEqual(spawned, [('-s', 'emulator-5554', 'shell', 'input tap 1 2')])
+
+    def test_driver_routing(self):
+        driver = make_driver(self.server.port)
+        self.server.commands['cat /sys/class/net/wlan0/address'] = (b'02:00:00:00:00:00\r\n', b'', 0)
+        self.assertEqual(driver.get_device_mac(), '02:00:00:00:00:00')
+        self.assertIsNone(driver._execute_native(('-s', 'emulator-5554', 'reboot')))
+
+
+class TestShellSession(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeAdbServer().__enter__()
+        self.server.commands['input tap 1 2'] = (b'', b'', 0)
+        self.server.commands["echo 'it''s'"] = (b"it's", b'', 0)
+        self.server.commands['am start -n foo'] = (b'Starting\n', b'Error: bad\n', 1)
+        self.client = AdbClient(port=self.server.port, timeout=5)
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+
+    def test_run_v2(self):
+        with ShellSession(self.client, 'emulator-5554') as session:
+            self.assertEqual(session.run('input tap 1 2'), (b'', b'', 0))
+            self.assertEqual(session.run("echo 'it''s'"), (b"it's", b'', 0))
+            self.assertEqual(session.run('am start -n foo'), (b'Starting\n', b'Error: bad\n', 1))
+        self.assertEqual(self.server.requests.count('shell,v2,raw:'), 1)
+
+    def test_run_merged(self):
+        self.server.features = 'cmd'
+        with ShellSession(self.client, 'emulator-5554') as session:
+            self.assertEqual(session.run('am start -n foo'), (b'Error: bad\nStarting\n', b'', 1))
+            self.assertEqual(session.run('missing')[2], 127)
+
+    def test_driver_session(self):
+        driver = make_driver(self.server.port)
+        self.assertIsNone(driver.shell_session)
+        self.assertEqual(self.server.requests, [])
+        session = driver.open_shell_session()
+        self.assertIs(driver.open_shell_session(), session)
+        self.assertIs(driver.shell_session, session)
+        driver.click(1, 2)
+        driver.click(1, 2)
+        driver.close_shell_session()
+        self.assertIsNone(driver.shell_session)
+        self.assertEqual(self.server.requests.count('input tap 1 2'), 2)
+        self.assertEqual(self.server.requests.count('shell,v2,raw:'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import io
+import os
+import struct
+import tempfile
+import unittest
+import zipfile
+
+from cerium.apk import apk_info, read_manifest
+
+from fakeadb import FakeAdbServer, make_driver
+
+PACKAGES = 'pm list packages -f --show-versioncode 2>/dev/null || pm list packages -f'
+
+
+def binary_manifest(package, version_code, version_name):
+    '''A minimal binary AndroidManifest.xml with UTF-16 strings.'''
+    strings = ['versionCode', 'versionName', 'package', 'manifest', package, version_name]
+    data = b''
+    offsets = []
+    for string in strings:
+        offsets.append(len(data))
+        data += struct.pack('<H', len(string)) + string.encode('utf-16-le') + b'\0\0'
+    data += b'\0' * (-len(data) % 4)
+    pool = struct.pack('<IIIII', len(strings), 0, 0, 28 + 4 * len(strings), 0)
+    pool = struct.pack('<HHI', 1, 28, 28 + 4 * len(strings) + len(data)) + pool + struct.pack(f'<{len(strings)}I', *offsets) + data
+    resources = struct.pack('<HHI', 0x180, 8, 16) + struct.pack('<II', 0x0101021b, 0x0101021c)
+    attributes = [(0, 0xffffffff, 0x10, version_code), (1, 5, 0x03, 5), (2, 4, 0x03, 4)]
+    element = struct.pack('<IIIIHHHHHH', 0xffffffff, 0xffffffff, 0xffffffff, 3, 20, 20, len(attributes), 0, 0, 0)
+    for name, raw, value_type, value in attributes:
+        element += struct.pack('<IIIHBBI', 0xffffffff, name, raw, 8, 0, value_type, value)
+    element = struct.pack('<HHI', 0x102, 16, 8 + len(element)) + element
+    body = pool + resources + element
+    return struct.pack('<HHI', 3, 8, 8 + len(body)) + body
+
+
+def apk_bytes(package='com.example', version_code=42, version_name='1.2'):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as apk:
+        apk.writestr('AndroidManifest.xml', binary_manifest(package, version_code, version_name))
+        apk.writestr('classes.dex', b'dex\n035\0')
+    return buffer.getvalue()
+
+
+class TestApk(unittest.TestCase):
+
+    def test_read_manifest(self):
+        self.assertEqual(read_manifest(binary_manifest('com.example', 42, '1.2')), ('com.example', 42, '1.2'))
+
+    def test_skip_identical(self):
+        data = apk_bytes()
+        path = os.path.join(tempfile.mkdtemp(), 'app.apk')
+        with open(path, 'wb') as f:
+            f.write(data)
+        info = apk_info(path)
+        self.assertIs(apk_info(path), info)
+        self.assertEqual((info.package, info.version_code, info.size), ('com.example', 42, len(data)))
+        with FakeAdbServer() as server:
+            server.commands[PACKAGES] = (b'package:/data/app/com.example-1/base.apk=com.example versionCode:42\n', b'', 0)
+            server.commands["md5sum '/data/app/com.example-1/base.apk'"] = (
+                f'{info.md5}  /data/app/com.example-1/base.apk\n'.encode(), b'', 0)
+            driver = make_driver(server.port)
+            self.assertFalse(driver.install(path, skip_identical=True))
+            self.assertFalse(driver.has_build(apk_info(apk_bytes(version_code=43))))
+            server.commands["md5sum '/data/app/com.example-1/base.apk'"] = (b'0' * 32 + b'  x\n', b'', 0)
+            self.assertFalse(driver.has_build(path))
+
+
+class TestStreamInstall(unittest.TestCase):
+
+    def test_install_from_memory(self):
+        data = apk_bytes(version_code=7)
+        with FakeAdbServer() as server:
+            server.commands[PACKAGES] = (b'', b'', 0)
+            driver = make_driver(server.port)
+            self.assertTrue(driver.install(io.BytesIO(data)))
+            self.assertTrue(driver.install(data, option='-r', skip_identical=True))
+            self.assertEqual(server.installed, [data, data])
+            self.assertIn(f'exec:pm install -r -S {len(data)}', server.requests)
+            self.assertEqual(driver.packages['com.example'].version_code, 7)
+            self.assertEqual(sum(PACKAGES in r for r in server.requests), 1)
+
+    def test_install_streams_file_objects(self):
+        data = apk_bytes(version_code=7)
+        reads = []
+
+        class Source(io.BytesIO):
+            def read(self, size=-1):
+                reads.append(size)
+                return super().read(size)
+
+        with FakeAdbServer() as server:
+            server.commands[PACKAGES] = (b'', b'', 0)
+            driver = make_driver(server.port)
+            self.assertNotIn('com.example', driver.packages)
+            self.assertTrue(driver.install(Source(data)))
+            self.assertEqual(server.installed, [data])
+            self.assertNotIn(-1, reads)
+            # The package of a stream is unknown, the index reloads on the next lookup.
+            server.commands[PACKAGES] = (b'package:/data/app/base.apk=com.example versionCode:7\n', b'', 0)
+            self.assertIn('com.example', driver.packages)
@@ -0,0 +1,38 @@
+import asyncio
+import unittest
+
+from cerium import AsyncAndroidDriver
+from cerium.androiddriver import uidump_command
+
+from fakeadb import FakeAdbServer
+
+UIDUMP = (b"<?xml version='1.0' encoding='UTF-8' standalone='yes' ?><hierarchy rotation=\"0\">"
+          b"<node index=\"0\" text=\"OK\" resource-id=\"android:id/button1\" class=\"android.widget.Button\" "
+          b"package=\"android\" content-desc=\"\" bounds=\"[0,0][100,50]\" /></hierarchy>")
+
+
+class TestAsyncAndroidDriver(unittest.TestCase):
+
+    def test_drive(self):
+        async def drive(driver):
+            async with driver:
+                self.assertEqual(driver.device_sn, 'emulator-5554')
+                self.assertEqual(await driver.get_sdk_version(), '29')
+                element = await driver.find_element_by_id('android:id/button1')
+                self.assertEqual(element.text, 'OK')
+                await element.click()
+                await asyncio.gather(*(driver.click(1, 2) for _ in range(3)))
+
+        with FakeAdbServer() as server:
+            server.commands['getprop ro.build.version.sdk'] = (b'29\n', b'', 0)
+            server.commands['input tap 50.0 25.0'] = (b'', b'', 0)
+            server.commands['input tap 1 2'] = (b'', b'', 0)
+            driver = AsyncAndroidDriver(service_port=server.port)
+            server.commands[uidump_command(driver._uidump_remote)] = (UIDUMP, b'', 0)
+            asyncio.run(drive(driver))
+            self.assertIn('shell,v2,raw:input tap 50.0 25.0', server.requests)
+            self.assertEqual(server.requests.count('shell,v2,raw:input tap 1 2'), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
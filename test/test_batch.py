@@ -0,0 +1,35 @@
+import unittest
+
+from cerium import Keys
+from cerium.batch import ActionBatch
+
+from fakeadb import FakeAdbServer, make_driver
+
+
+class TestActionBatch(unittest.TestCase):
+
+    def test_merge_keyevents(self):
+        batch = ActionBatch()
+        batch.add('tap', '1', '2')
+        batch.add('keyevent', '67')
+        batch.add('keyevent', '67')
+        batch.add('keyevent', '--longpress', '26')
+        batch.add('keyevent', '3')
+        self.assertEqual(batch.commands(), [
+            'input tap 1 2', 'input keyevent 67 67', 'input keyevent --longpress 26', 'input keyevent 3'])
+
+    def test_driver_batch(self):
+        with FakeAdbServer() as server:
+            driver = make_driver(server.port)
+            with driver.batch():
+                driver.click(1, 2)
+                with driver.batch():
+                    for _ in range(3):
+                        driver.send_keyevents(Keys.DEL)
+                driver.send_keys('a b')
+            shells = [r for r in server.requests if r.startswith('shell,v2,raw:')]
+            self.assertEqual(shells, ['shell,v2,raw:input tap 1 2 ; input keyevent 67 67 67 ; input text a\\ b'])
+
+
+if __name__ == '__main__':
+    unittest.main()
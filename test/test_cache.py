@@ -0,0 +1,91 @@
+import unittest
+
+from cerium import NoSuchPackageException
+from cerium.cache import DisplayInfo, PackageInfo, PropertyCache
+
+from fakeadb import FakeAdbServer, make_driver
+
+PACKAGES = 'pm list packages -f --show-versioncode 2>/dev/null || pm list packages -f'
+PROPERTIES = ('getprop ; echo __cerium_section__:wm.size ; wm size ; echo __cerium_section__:wm.density ; '
+              'wm density ; echo __cerium_section__:android_id ; settings get secure android_id')
+
+
+class TestPropertyCache(unittest.TestCase):
+
+    def test_ttl_and_invalidate(self):
+        loads = []
+        cache = PropertyCache(lambda: loads.append(1) or {'a': str(len(loads))}, ttl=None)
+        self.assertEqual(cache['a'], '1')
+        self.assertEqual(cache.get('a'), '1')
+        cache.invalidate()
+        self.assertEqual(cache['a'], '2')
+        cache.ttl = 0
+        self.assertEqual(cache['a'], '3')
+
+    def test_driver_properties(self):
+        with FakeAdbServer() as server:
+            server.commands[PROPERTIES] = (
+                b'[ro.build.version.release]: [10]\n[ro.build.version.sdk]: [29]\n'
+                b'[ro.product.model]: [Pixel 3]\n'
+                b'__cerium_section__:wm.size\nPhysical size: 1080x2160\nOverride size: 720x1440\n'
+                b'__cerium_section__:wm.density\nPhysical density: 440\n'
+                b'__cerium_section__:android_id\n9774d56d682e549c\n', b'', 0)
+            driver = make_driver(server.port)
+            self.assertEqual(driver.get_device_model(), 'Pixel 3')
+            self.assertEqual(driver.get_android_version(), '10')
+            self.assertEqual(driver.get_sdk_version(), '29')
+            self.assertEqual(driver.get_resolution(), ['1080', '2160'])
+            self.assertEqual(driver.get_screen_density(), '440')
+            self.assertEqual(driver.get_android_id(), '9774d56d682e549c')
+            self.assertEqual(server.requests.count('shell,v2,raw:' + PROPERTIES), 1)
+
+
+class TestDisplayInfo(unittest.TestCase):
+
+    def test_parse(self):
+        output = ('  Display: mDisplayId=0\n'
+                  '    init=1080x2160 440dpi cur=2160x1080 app=2028x1080 rng=1080x1017-2028x1965\n'
+                  '    mCurrentRotation=ROTATION_90\n')
+        display = DisplayInfo.parse(output)
+        self.assertEqual(display, DisplayInfo(1080, 2160, 440, 1))
+        self.assertEqual(display.size, (2160, 1080))
+        self.assertEqual(DisplayInfo.parse(output.replace('    mCurrentRotation=ROTATION_90\n', '')).rotation, 1)
+        self.assertEqual(DisplayInfo.parse('    init=1080x1920 480dpi\n    mRotation=0\n').size, (1080, 1920))
+        self.assertIsNone(DisplayInfo.parse(''))
+
+    def test_swipe_cached_display(self):
+        with FakeAdbServer() as server:
+            driver = make_driver(server.port)
+            driver._display = DisplayInfo(1080, 1920, 480, 1)
+            driver.swipe_left()
+            self.assertIn('shell,v2,raw:input swipe 1536.0 540.0 384.0 540.0 100', server.requests)
+            self.assertFalse(any('dumpsys' in request for request in server.requests))
+
+
+class TestPackageIndex(unittest.TestCase):
+
+    def test_parse_list(self):
+        packages = PackageInfo.parse_list(
+            'package:/data/app/com.example-1/base.apk=com.example versionCode:42\n'
+            'package:/system/app/Settings/Settings.apk=com.android.settings\n')
+        self.assertEqual(packages['com.example'], PackageInfo('com.example', '/data/app/com.example-1/base.apk', 42))
+        self.assertIsNone(packages['com.android.settings'].version_code)
+
+    def test_driver_index(self):
+        with FakeAdbServer() as server:
+            server.commands[PACKAGES] = (b'package:/data/app/a/base.apk=com.a versionCode:1\n'
+                                         b'package:/data/app/b/base.apk=com.b versionCode:2\n', b'', 0)
+            driver = make_driver(server.port)
+            for _ in range(3):
+                driver.clear_app_data('com.a')
+            self.assertEqual(driver.view_package_path('com.b'), '/data/app/b/base.apk')
+            self.assertEqual(sum(PACKAGES in r for r in server.requests), 1)
+            driver.packages.discard('com.a')
+            driver.clear_app_data('com.a')
+            self.assertEqual(sum(PACKAGES in r for r in server.requests), 2)
+            with self.assertRaises(NoSuchPackageException):
+                driver.clear_app_data('com.missing')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+import io
+import os
+import tempfile
+import unittest
+
+from cerium import By, Locator, NoSuchElementException
+from cerium.androiddriver import (SCREEN_STATE_COMMAND, screen_state_command,
+                                  uidump_command)
+from cerium.cache import DisplayInfo
+from cerium.elements import Elements
+from cerium.hierarchy import Hierarchy
+from cerium.locator import compile_xpath
+
+from fakeadb import FakeAdbServer, make_driver
+
+UIDUMP = b'''<?xml version='1.0' encoding='UTF-8' standalone='yes' ?><hierarchy rotation="0">
+<node index="0" text="" resource-id="" class="android.widget.FrameLayout" package="com.example" content-desc="" checkable="false" checked="false" clickable="false" enabled="true" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[0,0][1080,1920]">
+<node index="0" text="Name" resource-id="com.example:id/name" class="android.widget.EditText" package="com.example" content-desc="" checkable="false" checked="false" clickable="true" enabled="true" focusable="true" focused="true" scrollable="false" long-clickable="true" password="false" selected="false" bounds="[40,100][1040,200]" />
+<node index="1" text="OK" resource-id="com.example:id/button" class="android.widget.Button" package="com.example" content-desc="Confirm" checkable="false" checked="false" clickable="true" enabled="true" focusable="true" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[40,300][540,400]" />
+<node index="2" text="Cancel" resource-id="com.example:id/button" class="android.widget.Button" package="com.example" content-desc="" checkable="false" checked="false" clickable="true" enabled="false" focusable="true" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[540,300][1040,400]" />
+</node>
+</hierarchy>'''
+
+
+class TestHierarchy(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeAdbServer().__enter__()
+        self.driver = make_driver(self.server.port)
+        self.server.commands[uidump_command(self.driver._uidump_remote)] = (UIDUMP, b'', 0)
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+
+    def test_uidump_in_memory(self):
+        local = os.path.join(tempfile.mkdtemp(), 'uidump.xml')
+        self.driver.uidump(local)
+        with open(local, 'rb') as f:
+            self.assertEqual(f.read(), UIDUMP)
+        self.assertEqual(len([r for r in self.server.requests if r.startswith('exec:')]), 1)
+
+    def test_previous_dump_released(self):
+        first = self.driver.uidump()
+        second = self.driver.uidump()
+        self.assertIsNone(first.source)
+        self.assertEqual(second.source, UIDUMP)
+        self.assertEqual(first.digest, second.digest)
+        self.assertEqual(first.find(By.TEXT, 'OK'), second.find(By.TEXT, 'OK'))
+
+    def test_find_element(self):
+        element = self.driver.find_element('com.example:id/name')
+        self.assertEqual(element.text, 'Name')
+        self.assertEqual(element.coord, [40, 100, 1040, 200])
+        element = self.driver.find_element('Cancel', by=By.TEXT)
+        self.assertEqual(element.resource_id, 'com.example:id/button')
+        element = self.driver.find_element('Name', by=By.TEXT)
+        self.assertEqual(element.class_, 'android.widget.EditText')
+        self.assertEqual(len([r for r in self.server.requests if r.startswith('exec:')]), 1)
+
+    def test_find_elements(self):
+        elements = self.driver.find_elements('com.example:id/button')
+        self.assertEqual([e.text for e in elements], ['OK', 'Cancel'])
+        elements = self.driver.find_elements('true', by=By.ENABLED)
+        self.assertEqual(len(elements), 3)
+        with self.assertRaises(NoSuchElementException):
+            self.driver.find_elements('nothing', by=By.TEXT)
+
+    def test_stream_find(self):
+        element = self.driver.find_element('Cancel', by=By.TEXT, stream=True)
+        self.assertEqual(element.coord, [540, 300, 1040, 400])
+        self.assertIsNone(self.driver._hierarchy)
+        with self.assertRaises(NoSuchElementException):
+            self.driver.find_element('Nothing', by=By.TEXT, stream=True)
+        self.assertIsNone(Hierarchy.stream_find(io.BytesIO(UIDUMP), By.ID, 'nothing'))
+
+    def test_auto_update(self):
+        focus = b'  mCurrentFocus=Window{42 u0 com.example/.MainActivity}\n'
+        digest = b'd41d8cd98f00b204e9800998ecf8427e  -\n'
+        self.server.commands[SCREEN_STATE_COMMAND] = (focus + digest, b'', 0)
+        dumps = lambda: len([r for r in self.server.requests if r.startswith('exec:')])
+        self.driver.find_element('OK', by=By.TEXT)
+        self.driver.find_element('Cancel', by=By.TEXT)
+        self.assertEqual(dumps(), 1)
+        self.server.commands[SCREEN_STATE_COMMAND] = (focus + digest.replace(b'd4', b'e5'), b'', 0)
+        self.driver.find_element('OK', by=By.TEXT)
+        self.assertEqual(dumps(), 2)
+        self.driver.auto_update = False
+        self.server.commands[SCREEN_STATE_COMMAND] = (focus + digest, b'', 0)
+        self.driver.find_element('OK', by=By.TEXT)
+        self.assertEqual(dumps(), 2)
+
+    def test_fingerprint_skips_status_bar(self):
+        self.driver._display = DisplayInfo(1080, 1920, 480, 1)
+        # 48dp at 480dpi is 144 rows of the 1920 pixels wide landscape frame.
+        command = screen_state_command(16 + 144 * 1920 * 4)
+        self.assertIn('screencap | tail -c +1105937 | md5sum', command)
+        self.server.commands[command] = (b'd41d8cd98f00b204e9800998ecf8427e  -\n', b'', 0)
+        self.assertEqual(self.driver.screen_state(), 'd41d8cd98f00b204e9800998ecf8427e -')
+
+    def test_compact_table(self):
+        hierarchy = Hierarchy.from_bytes(UIDUMP)
+        self.assertEqual(len(hierarchy), 4)
+        self.assertEqual(list(hierarchy.parents), [-1, 0, 0, 0])
+        self.assertIs(hierarchy.columns[By.ID][2], hierarchy.columns[By.ID][3])
+        element = Elements(self.driver, hierarchy, 3, By.TEXT, 'Cancel')
+        self.assertFalse(element.is_enabled())
+        self.assertTrue(element.is_clickable())
+        self.assertEqual(element.click_point, (790, 350))
+        self.assertEqual(hierarchy.find(By.BOUNDS, '[40,300][540,400]'), [2])
+        with self.assertRaises(AttributeError):
+            element.foo = 1
+
+
+class TestLocator(unittest.TestCase):
+
+    def setUp(self):
+        self.hierarchy = Hierarchy.from_bytes(UIDUMP)
+
+    def test_composite(self):
+        locator = Locator.equals(By.ID, 'com.example:id/button') & Locator.contains(By.TEXT, 'an') & Locator.flag(By.CLICKABLE)
+        self.assertEqual(self.hierarchy.find(By.ID, locator), [3])
+        self.assertEqual(self.hierarchy.select(~Locator.flag(By.ENABLED)), [3])
+        self.assertEqual(self.hierarchy.select(Locator.equals(By.TEXT, 'OK') | Locator.equals(By.TEXT, 'Name')), [1, 2])
+
+    def test_relationships(self):
+        frame = Locator.equals(By.CLASS, 'android.widget.FrameLayout')
+        self.assertEqual(self.hierarchy.select(Locator.flag(By.FOCUSABLE).descendant_of(frame)), [1, 2, 3])
+        self.assertEqual(self.hierarchy.select(Locator.flag(By.FOCUSABLE).child_of(Locator.equals(By.TEXT, 'OK'))), [])
+
+    def test_xpath(self):
+        self.assertEqual(self.hierarchy.find(By.XPATH, '//node[@content-desc="Confirm"]'), [2])
+        self.assertIs(compile_xpath('//node'), compile_xpath('//node'))
+        self.assertEqual(self.hierarchy.select(Locator.equals(By.TEXT, 'it\'s "quoted"')), [])
+
+    def test_driver(self):
+        with FakeAdbServer() as server:
+            driver = make_driver(server.port)
+            server.commands[uidump_command(driver._uidump_remote)] = (UIDUMP, b'', 0)
+            element = driver.find_element(Locator.equals(By.TEXT, 'OK'))
+            self.assertEqual(element.content_desc, 'Confirm')
+            self.assertEqual(driver.find_element_by_name('Name').class_, 'android.widget.EditText')
+            self.assertEqual(len(driver.find_elements_by_xpath('//node[@clickable="true"]')), 3)
+
+    def test_find_many(self):
+        found = self.hierarchy.find_many({
+            'name': (By.ID, 'com.example:id/name'),
+            'button': (By.ID, 'com.example:id/button'),
+            'disabled': (By.ENABLED, 'false'),
+            'confirm': (By.XPATH, '//node[@content-desc="Confirm"]'),
+            'missing': (By.TEXT, 'Nothing'),
+        })
+        self.assertEqual(found, {'name': 1, 'button': 2, 'disabled': 3, 'confirm': 2, 'missing': None})
+        with FakeAdbServer() as server:
+            driver = make_driver(server.port)
+            server.commands[uidump_command(driver._uidump_remote)] = (UIDUMP, b'', 0)
+            page = driver.find_many({'ok': Locator.equals(By.TEXT, 'OK'), 'cancel': (By.TEXT, 'Cancel'), 'frame': (By.TEXT, '')})
+            self.assertEqual(page['ok'].content_desc, 'Confirm')
+            self.assertFalse(page['cancel'].is_enabled())
+            self.assertEqual(page['frame'].class_, 'android.widget.FrameLayout')
+
+
+if __name__ == '__main__':
+    unittest.main()
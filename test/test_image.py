@@ -0,0 +1,56 @@
+import struct
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    # The image extra is not installed.
+    numpy = None
+
+from cerium import By, ImagePresent, NoSuchElementException
+from cerium.image import _resize, match_template
+
+from fakeadb import FakeAdbServer, make_driver
+
+
+def screen(height=240, width=320, seed=7):
+    image = numpy.random.default_rng(seed).integers(0, 256, (height // 8, width // 8, 4), numpy.uint8)
+    return image.repeat(8, axis=0).repeat(8, axis=1)
+
+
+@unittest.skipUnless(numpy, 'needs the image extra (numpy)')
+class TestMatchTemplate(unittest.TestCase):
+
+    def test_exact_and_scaled(self):
+        image = screen()
+        template = image[64:112, 96:160]
+        match = match_template(image, template)
+        self.assertEqual(match.bounds, (96, 64, 160, 112))
+        self.assertGreater(match.score, 0.99)
+        smaller = numpy.stack([_resize(template[..., i].astype(float), 0.5) for i in range(3)], axis=2)
+        self.assertIsNone(match_template(image, smaller))
+        match = match_template(image, smaller, scales=(1.0, 2.0))
+        self.assertEqual(match.bounds, (96, 64, 160, 112))
+
+    def test_no_match(self):
+        self.assertIsNone(match_template(screen(), screen(48, 64, seed=1)))
+
+
+@unittest.skipUnless(numpy, 'needs the image extra (numpy)')
+class TestFindElementByImage(unittest.TestCase):
+
+    def test_find_element_by_image(self):
+        image = screen()
+        with FakeAdbServer() as server:
+            driver = make_driver(server.port)
+            server.commands['screencap'] = (struct.pack('<IIII', 320, 240, 1, 0) + image.tobytes(), b'', 0)
+            element = driver.find_element_by_image(image[64:112, 96:160])
+            self.assertEqual(element.coord, [96, 64, 160, 112])
+            self.assertEqual(element.click_point, (128, 88))
+            self.assertIn(By.IMAGE, repr(element))
+            server.commands['screencap | { dd bs=1 count=16 2>/dev/null ; tail -c +51201 | head -c 153600 ; }'] = (
+                struct.pack('<IIII', 320, 240, 1, 0) + image[40:160].tobytes(), b'', 0)
+            element = driver.wait_until(ImagePresent(image[64:112, 96:160], region=(80, 40, 200, 160)), timeout=1)
+            self.assertEqual(element.coord, [96, 64, 160, 112])
+            with self.assertRaises(NoSuchElementException):
+                driver.find_element_by_image(screen(48, 64, seed=1))
@@ -0,0 +1,110 @@
+import unittest
+
+from cerium.androiddriver import dumpsys_command
+from cerium.parsers import BatteryInfo, CpuInfo, FocusState, MemInfo
+
+from fakeadb import FakeAdbServer, make_driver
+
+BATTERY = b'''Current Battery Service state:
+  AC powered: false
+  USB powered: true
+  Wireless powered: false
+  Max charging current: 500000
+  status: 2
+  health: 2
+  present: true
+  level: 67
+  scale: 100
+  voltage: 3965
+  temperature: 310
+  technology: Li-poly
+'''
+
+MEMINFO = b'''MemTotal:        3809036 kB
+MemFree:          154736 kB
+MemAvailable:    1520040 kB
+Buffers:           52300 kB
+Cached:          1344292 kB
+SwapTotal:        524284 kB
+SwapFree:         261428 kB
+'''
+
+CPUINFO = b'''Processor\t: AArch64 Processor rev 4 (aarch64)
+processor\t: 0
+BogoMIPS\t: 38.40
+Features\t: fp asimd evtstrm aes
+CPU part\t: 0x803
+
+processor\t: 1
+BogoMIPS\t: 38.40
+Features\t: fp asimd evtstrm aes
+CPU part\t: 0x803
+
+Hardware\t: Qualcomm Technologies, Inc SDM845
+'''
+
+FOCUS = (b'  mCurrentFocus=Window{5e1f u0 com.example/com.example.MainActivity}\n'
+         b'  mFocusedApp=AppWindowToken{9a2 token=Token{4c1 ActivityRecord{7d3 u0 com.example/.MainActivity t12}}}\n')
+
+
+class TestParsers(unittest.TestCase):
+
+    def test_battery(self):
+        info = BatteryInfo.parse(BATTERY.decode())
+        self.assertEqual(info['level'], '67')
+        self.assertEqual(dict(info)['USB powered'], 'true')
+        self.assertNotIn('Current Battery Service state', info)
+        self.assertEqual((info.level, info.percent, info.status), (67, 67.0, 2))
+        self.assertEqual((info.temperature, info.voltage), (31.0, 3965))
+        self.assertTrue(info.present and info.plugged)
+
+    def test_meminfo(self):
+        info = MemInfo.parse(MEMINFO.decode())
+        self.assertEqual(info['MemTotal'], 3809036)
+        self.assertEqual((info.total, info.available, info.used), (3809036, 1520040, 2288996))
+        del info._values['MemAvailable']
+        self.assertEqual(info.available, 154736 + 52300 + 1344292)
+
+    def test_cpuinfo(self):
+        info = CpuInfo.parse(CPUINFO.decode())
+        self.assertEqual(info.count, 2)
+        self.assertEqual(info.processors[1]['CPU part'], '0x803')
+        self.assertEqual(info.hardware, 'Qualcomm Technologies, Inc SDM845')
+        self.assertEqual(info.model_name, 'AArch64 Processor rev 4 (aarch64)')
+        self.assertEqual(info.features, ['fp', 'asimd', 'evtstrm', 'aes'])
+
+    def test_incremental(self):
+        state = FocusState()
+        for line in FOCUS.decode().splitlines():
+            state.feed(line)
+        self.assertEqual(state.window, 'com.example/com.example.MainActivity')
+        self.assertEqual(state.activity, 'com.example/.MainActivity')
+        self.assertEqual(state.package, 'com.example')
+
+    def test_driver(self):
+        with FakeAdbServer() as server:
+            server.commands['dumpsys battery'] = (BATTERY, b'', 0)
+            server.commands['cat /proc/meminfo'] = (MEMINFO, b'', 0)
+            server.commands["dumpsys window windows | grep -E 'mCurrentFocus|mFocusedApp'"] = (FOCUS, b'', 0)
+            driver = make_driver(server.port)
+            self.assertEqual(driver.get_battery_info().level, 67)
+            self.assertEqual(driver.get_memory_info().total, 3809036)
+            self.assertEqual(driver.view_focused_activity(), 'com.example/.MainActivity')
+            self.assertIn('exec:dumpsys battery', server.requests)
+
+    def test_dumpsys_select(self):
+        self.assertEqual(dumpsys_command('window', 'windows'), 'dumpsys window windows')
+        self.assertEqual(dumpsys_command('window', 'w', select="it's"), "dumpsys window w | grep -E 'it'\\''s'")
+        with FakeAdbServer() as server:
+            server.commands["dumpsys window windows | grep -E 'mCurrentFocus'"] = (FOCUS.splitlines(True)[0], b'', 0)
+            server.commands["dumpsys window w | grep -E 'name=[a-zA-Z0-9.]+/'"] = (
+                b'    name=com.example/.MainActivity\n', b'', 0)
+            driver = make_driver(server.port)
+            self.assertEqual(driver.view_current_app_behavior(), 'com.example/com.example.MainActivity')
+            self.assertEqual(driver.view_surface_app_activity(), ['com.example/.MainActivity'])
+            self.assertEqual(driver.dumpsys('window', 'windows', select=['mCurrentFocus']).strip(),
+                             FOCUS.decode().splitlines()[0].strip())
+
+
+if __name__ == '__main__':
+    unittest.main()
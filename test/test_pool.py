@@ -0,0 +1,64 @@
+import os
+import stat
+import tempfile
+import unittest
+
+from cerium import AndroidDriver, DevicePool
+
+from fakeadb import FakeAdbServer
+
+
+class FakeDriver(AndroidDriver):
+
+    def __init__(self, device_sn=None, **options):
+        if device_sn == 'offline':
+            raise ConnectionError(device_sn)
+        self.device_sn = device_sn
+        self._session = None
+
+    def get_sdk_version(self):
+        return self.device_sn.upper()
+
+
+class FakePool(DevicePool):
+    _driver_cls = FakeDriver
+
+
+class TestDevicePool(unittest.TestCase):
+
+    def test_fan_out(self):
+        with FakePool(['a', 'b', 'offline'], max_workers=2) as pool:
+            self.assertEqual(sorted(pool.drivers), ['a', 'b'])
+            self.assertIsInstance(pool.errors['offline'], ConnectionError)
+            results = pool.get_sdk_version()
+            self.assertEqual({k: v.value for k, v in results.items()}, {'a': 'A', 'b': 'B'})
+            results = pool.map(lambda d: 1 / (d.device_sn == 'a'))
+            self.assertTrue(results['a'].ok)
+            self.assertIsInstance(results['b'].error, ZeroDivisionError)
+            with self.assertRaises(AttributeError):
+                pool.no_such_method
+
+
+@unittest.skipIf(os.name == 'nt', 'needs a POSIX shell script as the executable')
+class TestDevicePoolDrivers(unittest.TestCase):
+
+    def test_several_devices(self):
+        # Stands in for adb start-server, devices and get-state, native drivers talk to the fake server.
+        executable = os.path.join(tempfile.mkdtemp(), 'adb.exe')
+        with open(executable, 'w') as f:
+            f.write('#!/bin/sh\n'
+                    'case "$*" in\n'
+                    '  *devices) printf "List of devices attached\\na\\tdevice\\nb\\tdevice\\n\\n" ;;\n'
+                    '  *-s\\ *get-state) echo device ;;\n'
+                    '  *get-state) echo "error: more than one device/emulator" >&2 ;;\n'
+                    'esac\n')
+        os.chmod(executable, os.stat(executable).st_mode | stat.S_IEXEC)
+        with FakeAdbServer(serials=['a', 'b']) as server:
+            for native in (True, False):
+                with DevicePool(executable_path=executable, service_port=server.port, native=native) as pool:
+                    self.assertEqual(pool.errors, {})
+                    self.assertEqual(sorted(pool.drivers), ['a', 'b'])
+            self.assertIn('host-serial:b:get-state', server.requests)
+
+if __name__ == '__main__':
+    unittest.main()
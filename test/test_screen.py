@@ -0,0 +1,103 @@
+import io
+import os
+import struct
+import tempfile
+import time
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    # The image extra is not installed.
+    numpy = None
+
+from cerium.screen import FrameHeader, FrameRing
+
+from fakeadb import FakeAdbServer, make_driver
+
+WIDTH, HEIGHT = 4, 3
+PIXELS = bytes(range(WIDTH * HEIGHT * 4))
+
+
+@unittest.skipUnless(numpy, 'needs the image extra (numpy)')
+class TestScreenshot(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeAdbServer().__enter__()
+        self.driver = make_driver(self.server.port)
+        # Android 9 and higher: width, height, format and color space.
+        self.server.commands['screencap'] = (struct.pack('<IIII', WIDTH, HEIGHT, 1, 0) + PIXELS, b'', 0)
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+
+    def test_screenshot_array(self):
+        frame = self.driver.screenshot_array()
+        self.assertEqual(frame.shape, (HEIGHT, WIDTH, 4))
+        self.assertEqual(frame.tobytes(), PIXELS)
+        self.assertTrue(frame.flags.writeable)
+        self.assertIsInstance(frame.base.base.obj, bytearray)
+        self.assertEqual(self.driver._frame_header, FrameHeader(WIDTH, HEIGHT, 1, 16))
+
+    def test_region_cropped_on_device(self):
+        expected = numpy.frombuffer(PIXELS, numpy.uint8).reshape(HEIGHT, WIDTH, 4)[1:3, 1:3]
+        numpy.testing.assert_array_equal(self.driver.screenshot_array((1, 1, 3, 3)), expected)
+        rows = 'screencap | { dd bs=1 count=16 2>/dev/null ; tail -c +17 | head -c 32 ; }'
+        self.server.commands[rows] = (struct.pack('<IIII', WIDTH, HEIGHT, 1, 0) + PIXELS[16:48], b'', 0)
+        numpy.testing.assert_array_equal(self.driver.screenshot_array((1, 1, 3, 3)), expected)
+        self.assertIn(f'exec:{rows}', self.server.requests)
+
+    def test_region_after_rotation(self):
+        self.driver.screenshot_array()
+        rotated = struct.pack('<IIII', HEIGHT, WIDTH, 1, 0) + PIXELS[::-1]
+        self.server.commands['screencap'] = (rotated, b'', 0)
+        self.server.commands['screencap | { dd bs=1 count=16 2>/dev/null ; tail -c +17 | head -c 32 ; }'] = (
+            rotated[:16] + PIXELS[:32], b'', 0)
+        expected = numpy.frombuffer(PIXELS[::-1], numpy.uint8).reshape(WIDTH, HEIGHT, 4)[1:3, 1:3]
+        numpy.testing.assert_array_equal(self.driver.screenshot_array((1, 1, 3, 3)), expected)
+        self.assertEqual(self.driver._frame_header, FrameHeader(HEIGHT, WIDTH, 1, 16))
+
+    def test_screencap_exec_is_binary(self):
+        self.server.commands['screencap -p'] = (b'\x89PNG\r\n\x1a\n\x00\xff', b'', 0)
+        filename = os.path.join(tempfile.mkdtemp(), 'screencap.png')
+        self.driver.screencap_exec(filename)
+        with open(filename, 'rb') as f:
+            self.assertEqual(f.read(), b'\x89PNG\r\n\x1a\n\x00\xff')
+
+
+@unittest.skipUnless(numpy, 'needs the image extra (numpy)')
+class TestFrameRing(unittest.TestCase):
+
+    def test_capture(self):
+        with FakeAdbServer() as server:
+            driver = make_driver(server.port)
+            server.commands['screencap'] = (struct.pack('<III', WIDTH, HEIGHT, 1) + PIXELS, b'', 0)
+            ring = driver.start_capture(fps=50, size=3)
+            deadline = time.time() + 5
+            while ring.stats.captured < 5 and time.time() < deadline:
+                time.sleep(0.02)
+            driver.stop_capture()
+            self.assertIsNone(ring.error)
+            self.assertFalse(ring.running)
+            stats = ring.stats
+            self.assertGreaterEqual(stats.captured, 5)
+            timestamp, frame = ring.latest()
+            self.assertEqual(frame.tobytes(), PIXELS)
+            self.assertIs(frame.base, ring.latest()[1].base)
+            self.assertEqual(ring.frame_at(timestamp)[0], timestamp)
+            self.assertIsNone(ring.frame_at(timestamp - 60))
+
+    def test_size_change(self):
+        frames = [struct.pack('<IIII', WIDTH, HEIGHT, 1, 0) + PIXELS,
+                  struct.pack('<IIII', HEIGHT, WIDTH, 1, 0) + PIXELS[::-1]]
+        captures = iter(frames * 3)
+        ring = FrameRing(lambda: io.BytesIO(next(captures)), size=2, fps=100).start()
+        deadline = time.time() + 5
+        while ring.running and time.time() < deadline:
+            time.sleep(0.02)
+        ring.stop()
+        self.assertIsInstance(ring.error, StopIteration)
+        self.assertEqual(ring.stats.captured, 6)
+        timestamp, frame = ring.latest()
+        self.assertEqual(frame.shape, (WIDTH, HEIGHT, 4))
+        self.assertEqual(frame.tobytes(), PIXELS[::-1])
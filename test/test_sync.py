@@ -0,0 +1,76 @@
+import io
+import os
+import tempfile
+import unittest
+
+from cerium import FileTransferException
+
+from fakeadb import FakeAdbServer, make_driver
+
+
+class TestSync(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeAdbServer().__enter__()
+        self.driver = make_driver(self.server.port)
+        self.local = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+
+    def test_push_file_and_buffer(self):
+        path = os.path.join(self.local, 'data.bin')
+        with open(path, 'wb') as f:
+            f.write(os.urandom(200000))
+        os.utime(path, (1500000000, 1500000000))
+        progress = []
+        stats = self.driver.push(path, '/sdcard/data.bin', progress=lambda done, total: progress.append((done, total)))
+        mode, data, mtime = self.server.files['/sdcard/data.bin']
+        with open(path, 'rb') as f:
+            self.assertEqual(data, f.read())
+        self.assertEqual(mtime, 1500000000)
+        self.assertEqual((stats.files, stats.size), (1, 200000))
+        self.assertEqual(progress[-1], (200000, 200000))
+        self.assertEqual(len(progress), 4)
+        self.driver.push(b'in memory', '/sdcard/memory.txt')
+        self.driver.push(io.BytesIO(b'file object'), '/sdcard/stream.txt')
+        self.assertEqual(self.server.files['/sdcard/memory.txt'][1], b'in memory')
+        self.assertEqual(self.server.files['/sdcard/stream.txt'][1], b'file object')
+
+    def test_push_into_directory(self):
+        self.server.files['/sdcard/dir/old.txt'] = (0o100644, b'old', 0)
+        os.makedirs(os.path.join(self.local, 'tree', 'sub'))
+        for name in ('a.txt', os.path.join('sub', 'b.txt')):
+            with open(os.path.join(self.local, 'tree', name), 'w') as f:
+                f.write(name)
+        stats = self.driver.push(os.path.join(self.local, 'tree'), '/sdcard/dir')
+        self.assertEqual(stats.files, 2)
+        self.assertIn('/sdcard/dir/tree/sub/b.txt', self.server.files)
+        self.assertEqual(self.driver.push_sync(os.path.join(self.local, 'tree'), '/sdcard/dir').files, 0)
+
+    def test_pull(self):
+        self.server.files['/sdcard/tree/a.txt'] = (0o100600, b'a' * 70000, 1500000000)
+        self.server.files['/sdcard/tree/sub/b.txt'] = (0o100644, b'b', 1500000000)
+        stats = self.driver.pull_a('/sdcard/tree', self.local)
+        self.assertEqual((stats.files, stats.size), (2, 70001))
+        path = os.path.join(self.local, 'tree', 'a.txt')
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b'a' * 70000)
+        self.assertEqual(os.stat(path).st_mtime, 1500000000)
+        with self.assertRaises(FileNotFoundError):
+            self.driver.pull('/sdcard/missing', self.local)
+
+    def test_refused(self):
+        with self.assertRaises(FileTransferException) as cm:
+            self.driver.push(b'x', '/system/x')
+        self.assertIn('Read-only file system', str(cm.exception))
+
+    def test_local_errors_propagate(self):
+        def progress(done, total):
+            raise PermissionError(13, 'Permission denied')
+
+        self.server.files['/sdcard/a.txt'] = (0o100644, b'a', 0)
+        with self.assertRaises(PermissionError):
+            self.driver.pull('/sdcard/a.txt', self.local, progress=progress)
+        with self.assertRaises(PermissionError):
+            self.driver.push(b'b', '/sdcard/b.txt', progress=progress)
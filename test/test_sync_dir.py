@@ -0,0 +1,74 @@
+import hashlib
+import os
+import tempfile
+import unittest
+
+from cerium.sync import remote_batch_command, remote_stat_command
+
+from fakeadb import FakeAdbServer, make_driver
+
+REMOTE = '/sdcard/data'
+
+
+class TestSyncDir(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeAdbServer().__enter__()
+        self.driver = make_driver(self.server.port)
+        self.local = tempfile.mkdtemp()
+        self.manifest = os.path.join(tempfile.mkdtemp(), 'manifest.json')
+        os.makedirs(os.path.join(self.local, 'sub'))
+        for name in ('a.txt', 'b.txt', 'sub/c.txt'):
+            self.write(name, name * 100)
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+
+    def write(self, name, text):
+        with open(os.path.join(self.local, name), 'w') as f:
+            f.write(text)
+
+    def refresh_remote(self):
+        '''Answer the stat query from the fake device files.'''
+        lines = [f'{len(data)} {mtime} .{path[len(REMOTE):]}'
+                 for path, (_, data, mtime) in sorted(self.server.files.items()) if path.startswith(REMOTE + '/')]
+        self.server.commands[remote_stat_command(REMOTE)] = ('\n'.join(lines).encode(), b'', 0)
+
+    def sync(self, **kwargs):
+        self.refresh_remote()
+        return self.driver.sync_dir(self.local, REMOTE, manifest=self.manifest, **kwargs)
+
+    def test_delta(self):
+        result = self.sync(workers=2)
+        self.assertEqual(result.sent, ['a.txt', 'b.txt', 'sub/c.txt'])
+        self.assertEqual(result.stats.files, 3)
+        self.assertEqual(self.server.files[REMOTE + '/sub/c.txt'][1], b'sub/c.txt' * 100)
+
+        result = self.sync()
+        self.assertEqual((result.sent, result.deleted, result.unchanged), ([], [], 3))
+
+        self.write('a.txt', 'changed')
+        os.remove(os.path.join(self.local, 'b.txt'))
+        result = self.sync()
+        self.assertEqual((result.sent, result.deleted, result.unchanged), (['a.txt'], [], 1))
+        self.assertIn(REMOTE + '/b.txt', self.server.files)
+        result = self.sync(delete=True)
+        self.assertEqual((result.sent, result.deleted, result.unchanged), ([], ['b.txt'], 2))
+        self.assertIn('shell,v2,raw:' + remote_batch_command(REMOTE, 'rm -f', ['b.txt']), self.server.requests)
+
+    def test_refuse_root(self):
+        for remote in ('/', '//', '/sdcard/..'):
+            with self.assertRaises(ValueError):
+                self.driver.sync_dir(self.local, remote, manifest=self.manifest)
+        self.assertEqual(self.server.requests, [])
+
+    def test_unknown_remote_files_are_hashed_on_device(self):
+        for name in ('a.txt', 'b.txt', 'sub/c.txt'):
+            self.server.files[f'{REMOTE}/{name}'] = (0o100644, (name * 100).encode(), 0)
+        self.server.files[f'{REMOTE}/b.txt'] = (0o100644, b'B' * 500, 0)
+        names = ['a.txt', 'b.txt', 'sub/c.txt']
+        output = ''.join(f'{hashlib.md5(self.server.files[REMOTE + "/" + name][1]).hexdigest()}  {name}\n'
+                         for name in names)
+        self.server.commands[remote_batch_command(REMOTE, 'md5sum', names)] = (output.encode(), b'', 0)
+        result = self.sync()
+        self.assertEqual((result.sent, result.unchanged), (['b.txt'], 2))
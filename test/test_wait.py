@@ -0,0 +1,72 @@
+import threading
+import unittest
+
+from cerium import (ActivityFocused, By, DriverWait, ElementGone,
+                    ElementPresent, ElementVisible, TimeoutException)
+from cerium.androiddriver import uidump_command
+
+from fakeadb import FakeAdbServer, make_driver
+from test_hierarchy import UIDUMP
+
+FOCUS = "dumpsys window windows | grep -E 'mCurrentFocus|mFocusedApp'"
+
+
+class TestWait(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeAdbServer().__enter__()
+        self.driver = make_driver(self.server.port)
+        self.server.commands[uidump_command(self.driver._uidump_remote)] = (UIDUMP, b'', 0)
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+
+    def dumps(self):
+        return len([r for r in self.server.requests if r.startswith('exec:')])
+
+    def test_conditions(self):
+        element = self.driver.wait_until(ElementPresent('OK', by=By.TEXT), timeout=1)
+        self.assertEqual(element.resource_id, 'com.example:id/button')
+        self.assertEqual(self.driver.wait_until(ElementVisible('com.example:id/name')).text, 'Name')
+        self.assertTrue(self.driver.wait_until(ElementGone('com.example:id/gone')))
+        self.server.commands[FOCUS] = (b'  mCurrentFocus=Window{42 u0 com.example/.MainActivity}\n', b'', 0)
+        self.assertEqual(self.driver.wait_until(ActivityFocused('com.example')), 'com.example/.MainActivity')
+
+    def test_timeout_backs_off(self):
+        with self.assertRaises(TimeoutException):
+            self.driver.wait_until(ElementPresent('Missing', by=By.TEXT), timeout=0.5, poll=0.05)
+        # 0.05, 0.075, 0.11, 0.17... instead of a dump every 0.05s.
+        self.assertLess(self.dumps(), 8)
+
+    def test_shared_refresh(self):
+        self.driver._refresh_hierarchy(max_age=5)
+        threads = [threading.Thread(target=self.driver._refresh_hierarchy, kwargs={'max_age': 5})
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.dumps(), 1)
+
+    def test_one_snapshot(self):
+        stale = self.driver._refresh_hierarchy()
+        self.driver.uidump()
+        self.assertIsNone(stale.source)
+        # The refresh handed out a snapshot which a concurrent dump replaced and released.
+        self.driver._refresh_hierarchy = lambda max_age=0: stale
+        element = DriverWait(self.driver, timeout=1).until(ElementVisible("//node[@text='OK']", by=By.XPATH))
+        self.assertIs(element._hierarchy, self.driver._hierarchy)
+        self.assertEqual(element.resource_id, 'com.example:id/button')
+        # A dump swapping the layout while the condition runs shifts the positions.
+        current = self.driver._hierarchy
+        find, name = current.find, UIDUMP.splitlines(True)[2]
+
+        def racing_find(by, value):
+            positions = find(by, value)
+            self.server.commands[uidump_command(self.driver._uidump_remote)] = (UIDUMP.replace(name, b''), b'', 0)
+            self.driver.uidump()
+            return positions
+
+        current.find = racing_find
+        self.driver._refresh_hierarchy = lambda max_age=0: current
+        self.assertEqual(DriverWait(self.driver, timeout=1).until(ElementPresent('OK', by=By.TEXT)).text, 'OK')